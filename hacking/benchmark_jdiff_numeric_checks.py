@@ -0,0 +1,44 @@
+"""Compare jdiff with the numeric engine of the jdiff action plugin on operator checks.
+
+Run from the repository root: ``PYTHONPATH=. python hacking/benchmark_jdiff_numeric_checks.py [ports]``.
+"""
+import random
+import sys
+import time
+
+from jdiff import CheckType
+
+from plugins.action.jdiff import HAS_NUMPY, main
+
+
+def optics(count):
+    """Anchored RX power of ``count`` ports, as ``ports[*].[$name$,RxPower]`` extracts it."""
+    rnd = random.Random(0)
+    return [{"Ethernet{0}".format(index): {"RxPower": rnd.uniform(-9, -1)}} for index in range(count)]
+
+
+def timed(function):
+    """Result of ``function`` and seconds it took."""
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def compare(name, check_type, evaluate_args):
+    """Print the time of jdiff and of the action plugin for one check, after checking they agree."""
+    expected, baseline = timed(lambda: CheckType.create(check_type).evaluate(**evaluate_args))
+    result, bulk = timed(lambda: main({"check_type": check_type, "evaluate_args": dict(evaluate_args)}))
+    assert result == {"success": expected[1], "fail_details": expected[0]}
+    print("{0}: jdiff {1:.3f}s, action plugin {2:.3f}s ({3:.1f}x faster)".format(name, baseline, bulk, baseline / bulk))
+
+
+def main_benchmark():
+    """Print the evaluation time of an in-range operator check."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print("{0} ports, {1}".format(count, "NumPy" if HAS_NUMPY else "array module"))
+    params = {"params": {"mode": "in-range", "operator_data": [-8, -2]}}
+    compare("operator in-range", "operator", {"params": params, "value_to_compare": optics(count)})
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,65 @@
+"""Compare jdiff exact_match with the subtree hash pruning of the jdiff action plugin on a large document.
+
+Run from the repository root: ``PYTHONPATH=. python hacking/benchmark_jdiff_subtree_hashes.py [keys] [changes]``.
+"""
+import copy
+import sys
+import time
+
+from jdiff import CheckType
+
+from plugins.action.jdiff import HashCache, main, subtree_hashes
+
+
+def routes(count):
+    """RIB-like document with ``count`` prefixes."""
+    return {
+        "vrfs": {
+            "default": {
+                "routes": {
+                    "10.{0}.{1}.0/24".format(index // 256, index % 256): {
+                        "protocol": "bgp",
+                        "preference": 200,
+                        "nexthops": [{"address": "192.0.2.{0}".format(index % 254 + 1), "interface": "Ethernet1"}],
+                    }
+                    for index in range(count)
+                }
+            }
+        }
+    }
+
+
+def timed(function):
+    """Result of ``function`` and seconds it took."""
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main_benchmark():
+    """Print the time of a full diff, and of pruned diffs with and without cached reference hashes."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    changes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    reference = routes(count)
+    value = copy.deepcopy(reference)
+    table = value["vrfs"]["default"]["routes"]
+    for prefix in list(table)[:: max(count // changes, 1)][:changes]:
+        table[prefix]["nexthops"][0]["interface"] = "Ethernet2"
+
+    def args():
+        return {"check_type": "exact_match", "evaluate_args": {"reference_data": reference, "value_to_compare": value}}
+
+    expected, baseline = timed(lambda: CheckType.create("exact_match").evaluate(reference, value))
+    result, pruned = timed(lambda: main(args()))
+    assert result == {"success": expected[1], "fail_details": expected[0]}
+    cached = HashCache({'["*", []]': subtree_hashes(reference)})
+    result, warm = timed(lambda: main(args(), reference_hashes=cached))
+    assert result == {"success": expected[1], "fail_details": expected[0]}
+    print("{0} prefixes, {1} changed".format(count, changes))
+    print("jdiff exact_match:        {0:.3f}s".format(baseline))
+    print("pruned:                   {0:.3f}s ({1:.0f}x faster)".format(pruned, baseline / pruned))
+    print("pruned, cached reference: {0:.3f}s ({1:.0f}x faster)".format(warm, baseline / warm))
+
+
+if __name__ == "__main__":
+    main_benchmark()
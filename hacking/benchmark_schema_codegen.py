@@ -0,0 +1,66 @@
+"""Compare the jsonschema and codegen engines of ntc_validate_schema on a large interface list.
+
+Run from the repository root: ``PYTHONPATH=. python hacking/benchmark_schema_codegen.py [elements]``.
+"""
+import sys
+import time
+
+from plugins.module_utils.schema_validation import ValidatorCache, validate_schema
+
+INTERFACES = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "required": ["name", "mtu", "enabled"],
+        "additionalProperties": False,
+        "properties": {
+            "name": {"type": "string", "pattern": "^Ethernet[0-9/]+$"},
+            "description": {"type": "string", "maxLength": 240},
+            "mtu": {"type": "integer", "minimum": 576, "maximum": 9216},
+            "enabled": {"type": "boolean"},
+            "mode": {"enum": ["access", "trunk", "routed"]},
+            "vlans": {"type": "array", "items": {"type": "integer", "minimum": 1, "maximum": 4094}},
+        },
+    },
+}
+
+
+def interfaces(count):
+    """``count`` valid interfaces."""
+    return [
+        {
+            "name": "Ethernet{0}/{1}".format(index // 48 + 1, index % 48 + 1),
+            "description": "uplink {0}".format(index),
+            "mtu": 9000,
+            "enabled": True,
+            "mode": "trunk",
+            "vlans": [10, 20, 30, 40],
+        }
+        for index in range(count)
+    ]
+
+
+def timed(engine, data):
+    """Seconds taken by one validation of ``data`` with a warm cache of ``engine``."""
+    cache = ValidatorCache(engine=engine)
+    validate_schema(INTERFACES, data[:1], cache)
+    start = time.perf_counter()
+    status, msg = validate_schema(INTERFACES, data, cache)
+    elapsed = time.perf_counter() - start
+    assert status, msg
+    return elapsed
+
+
+def main():
+    """Print the validation time of both engines."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    data = interfaces(count)
+    baseline = timed("jsonschema", data)
+    codegen = timed("codegen", data)
+    print("{0} interfaces".format(count))
+    print("jsonschema: {0:.3f}s".format(baseline))
+    print("codegen:    {0:.3f}s ({1:.0f}x faster)".format(codegen, baseline / codegen))
+
+
+if __name__ == "__main__":
+    main()
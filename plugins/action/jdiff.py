@@ -5,25 +5,581 @@
 
 from __future__ import absolute_import, division, print_function
 
+import array
+import copy
+import hashlib
+import inspect
+import json
+import math
+import mmap
+import operator
+import os
+import re
+import warnings
+from collections import OrderedDict
+from itertools import chain, compress, repeat
+
 from ansible.errors import AnsibleError
 from ansible.module_utils.six import raise_from
 from ansible.plugins.action import ActionBase
 
 try:
-    from jdiff import CheckType, extract_data_from_json
+    import jmespath
+    from jdiff import CheckType
+    from jdiff import extract_data_from_json as jdiff_extract_data_from_json
 except ImportError as imp_exc:
     JDIFF_IMPORT_ERROR = imp_exc
 else:
     JDIFF_IMPORT_ERROR = None
 
+# Internals of jdiff >= 0.0.3 that ``CompiledPath`` reuses; older jdiff extracts data itself, uncached.
+try:
+    from jdiff.utils.data_normalization import exclude_filter, flatten_list
+    from jdiff.utils.jmespath_parsers import (
+        associate_key_of_my_value,
+        jmespath_refkey_parser,
+        jmespath_value_parser,
+        keys_values_zipper,
+        multi_reference_keys,
+    )
+except ImportError:
+    HAS_JDIFF_PARSERS = False
+else:
+    HAS_JDIFF_PARSERS = True
+
+try:
+    from deepdiff import DeepDiff
+except ImportError:
+    DIFF_DEEPER_THRESHOLD = 0
+else:
+    # Share of common keys under which DeepDiff reports two dicts as one changed value, none before DeepDiff 8.
+    DIFF_DEEPER_THRESHOLD = getattr(
+        inspect.signature(DeepDiff).parameters.get('threshold_to_diff_deeper'), 'default', 0
+    )
+
+try:
+    from ansible_collections.networktocode.netauto.plugins.module_utils.snapshot_store import SnapshotStore
+except ImportError as imp_exc:
+    SNAPSHOT_IMPORT_ERROR = imp_exc
+else:
+    SNAPSHOT_IMPORT_ERROR = None
+
+try:
+    import orjson
+except ImportError:
+    HAS_ORJSON = False
+else:
+    HAS_ORJSON = True
+
+try:
+    import numpy
+except ImportError:
+    HAS_NUMPY = False
+else:
+    HAS_NUMPY = True
+
 
 __metaclass__ = type
 
+JMESPATH_CACHE_SIZE = 512
+# Files from this size on are memory-mapped instead of read, when orjson can parse the mapping.
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
+
+class CompiledPath:
+    """A jdiff jmespath, with its ``$anchor$`` reference keys, rewritten and compiled once."""
+
+    def __init__(self, path):
+        """Parse ``path``."""
+        self.path = path
+        self.multi_reference = len(re.findall(r"\$.*?\$", path)) > 1
+        self.refkey = None
+        if self.multi_reference:
+            self.clean_path = path.replace("$", "")
+            self.values = jmespath.compile(f"{self.clean_path}{' | []' * (path.count('*') - 1)}")
+            return
+        self.value_path = jmespath_value_parser(path)
+        self.values = jmespath.compile(self.value_path)
+        if re.search(r"\$.*\$", path):
+            self.refkey = jmespath.compile(jmespath_refkey_parser(path))
+
+    def extract(self, data):
+        """Values selected in ``data``, as jdiff ``extract_data_from_json`` returns them."""
+        if self.multi_reference:
+            return keys_values_zipper(
+                multi_reference_keys(self.path, data),
+                associate_key_of_my_value(self.clean_path, self.values.search(data)),
+            )
+
+        values = self.values.search(data)
+        if values is None:
+            raise TypeError("JMSPath returned 'None'. Please, verify your JMSPath regex.")
+
+        # check for multi-nested lists
+        if any(isinstance(i, list) for i in values):
+            for element in values:
+                for item in element:
+                    if isinstance(item, dict):
+                        raise TypeError(
+                            f'Must be list of lists i.e. [["Idle", 75759616], ["Idle", 75759620]]. You have "{values}".'
+                        )
+                    if isinstance(item, list):
+                        values = flatten_list(values)
+                        break
+
+        if self.refkey is None:
+            return values
+
+        paired_key_value = associate_key_of_my_value(self.value_path, values)
+        wanted_reference_keys = self.refkey.search(data)
+        if isinstance(wanted_reference_keys, dict):
+            list_of_reference_keys = list(wanted_reference_keys.keys())
+        elif any(isinstance(element, list) for element in wanted_reference_keys):
+            list_of_reference_keys = flatten_list(wanted_reference_keys)[0]
+        elif isinstance(wanted_reference_keys, list):
+            list_of_reference_keys = wanted_reference_keys
+        else:
+            raise ValueError("Reference Key normalization failure. Please verify data type returned.")
+        normalized = keys_values_zipper(list_of_reference_keys, paired_key_value)
+        # Data between pre and post may come in different order, so it needs to be sorted.
+        return sorted(normalized, key=lambda arg: list(arg.keys()))
+
+
+class PathCache:
+    """Process-wide LRU cache of compiled jmespath, with hit and miss counters."""
+
+    def __init__(self, size=JMESPATH_CACHE_SIZE):
+        """Create an empty cache keeping at most ``size`` paths."""
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._paths = OrderedDict()
+
+    def get(self, path):
+        """Compiled ``path``."""
+        compiled = self._paths.get(path)
+        if compiled is not None:
+            self.hits += 1
+            self._paths.move_to_end(path)
+            return compiled
+        self.misses += 1
+        compiled = self._paths[path] = CompiledPath(path)
+        if len(self._paths) > self.size:
+            self._paths.popitem(last=False)
+        return compiled
+
+    def stats(self):
+        """Hit and miss counters, and number of cached paths."""
+        return dict(hits=self.hits, misses=self.misses, size=len(self._paths))
+
+
+JMESPATH_CACHE = PathCache()
+
+
+def extract_data_from_json(data, path="*", exclude=None):
+    """Drop-in for jdiff ``extract_data_from_json`` using compiled paths from ``JMESPATH_CACHE``."""
+    if not HAS_JDIFF_PARSERS:
+        return jdiff_extract_data_from_json(data, path, exclude)
+    if exclude and isinstance(data, (dict, list)):
+        if not isinstance(exclude, list):
+            raise ValueError(f"Exclude list must be defined as a list. You have {type(exclude)}")
+        exclude_filter(data, exclude)
+
+    if not path:
+        warnings.warn("JMSPath cannot be empty string or type 'None'. Path argument reverted to default value '*'")
+        path = "*"
+
+    if path == "*":
+        return data
+    return JMESPATH_CACHE.get(path).extract(data)
+
+
+# Check types whose result is the diff of reference_data and value_to_compare.
+DIFF_CHECK_TYPES = ("exact_match", "tolerance")
+
+
+# NaN in the repr of data, which never equals itself, so data holding it must never hash like its copies.
+NAN = re.compile(r"\bnan\b")
+
+
+def _digest(text):
+    if NAN.search(text):
+        return os.urandom(16).hex()
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def subtree_hashes(data):
+    """Hash tree of ``data``: ``[digest, children]`` for a dict or list holding dicts or lists, else None.
+
+    ``children`` holds the hash trees of the values, by key for a dict and by position for a list,
+    skipping (or None for) the values without one. Such values are compared directly. The digest
+    covers keys in their order, so equal dicts with a different key order only hash differently,
+    which makes them compared in detail. Data holding NaN gets a random digest.
+    """
+    if isinstance(data, dict):
+        nested = {key: subtree_hashes(value) for key, value in data.items() if isinstance(value, (dict, list))}
+        if not nested:
+            return None
+        children = {key: child for key, child in nested.items() if child is not None}
+        data = {**data, **{key: ("#", child[0]) for key, child in children.items()}}
+        return [_digest(repr(data)), children]
+    if isinstance(data, list):
+        if not any(isinstance(value, (dict, list)) for value in data):
+            return None
+        children = [subtree_hashes(value) if isinstance(value, (dict, list)) else None for value in data]
+        data = [value if child is None else ("#", child[0]) for value, child in zip(data, children)]
+        return [_digest(repr(data)), children]
+    return None
+
+
+def _equal(reference, value, reference_node, value_node):
+    if reference_node is not None and value_node is not None:
+        return reference_node[0] == value_node[0]
+    if reference_node is not None or value_node is not None or type(reference) is not type(value):
+        return False
+    if isinstance(reference, dict):
+        # Containers compare their items by identity first, which would match a NaN with itself.
+        return reference == value and all(item == item for item in reference.values())
+    if isinstance(reference, list):
+        return reference == value and all(item == item for item in reference)
+    return reference == value
+
+
+def _reported_whole(common, union):
+    """Whether DeepDiff reports two dicts with ``common`` of their ``union`` keys as one changed value."""
+    return bool(DIFF_DEEPER_THRESHOLD) and union > 1 and common / union < DIFF_DEEPER_THRESHOLD
+
+
+def _droppable(common, union, equal):
+    """How many of the ``equal`` common keys of two dicts can be dropped with DeepDiff reporting them the same."""
+    if _reported_whole(common, union):
+        return 0
+    keep = 0
+    if DIFF_DEEPER_THRESHOLD:
+        needed = DIFF_DEEPER_THRESHOLD * (union - equal) - (common - equal)
+        keep = min(equal, max(0, int(math.ceil(needed / (1 - DIFF_DEEPER_THRESHOLD)))))
+        while keep < equal and _reported_whole(common - equal + keep, union - equal + keep):
+            keep += 1
+        while keep > 0 and not _reported_whole(common - equal + keep - 1, union - equal + keep - 1):
+            keep -= 1
+    return equal - keep
+
+
+def prune_equal_subtrees(reference, value, reference_node, value_node):
+    """``reference`` and ``value`` without the branches their hash trees show are equal.
+
+    Equal dict items are dropped from both sides, except those DeepDiff needs to still diff the
+    dicts key by key. Equal list items are replaced by an empty dict on both sides instead, keeping
+    the positions the diff reports; lists holding only scalars have no hash tree and are left whole,
+    as the diff compares them as sequences. The diff of the pruned data is the diff of the original.
+    """
+    if reference_node is None or value_node is None:
+        return reference, value
+    reference_children, value_children = reference_node[1], value_node[1]
+    if isinstance(reference, dict) and isinstance(value, dict):
+        if not isinstance(reference_children, dict) or not isinstance(value_children, dict):
+            return reference, value
+        common = [key for key in reference if key in value]
+        union = len(reference) + len(value) - len(common)
+        if _reported_whole(len(common), union):
+            return reference, value
+        pruned, equal = {}, []
+        for key in common:
+            item_node, other_node = reference_children.get(key), value_children.get(key)
+            if _equal(reference[key], value[key], item_node, other_node):
+                equal.append(key)
+            else:
+                pruned[key] = prune_equal_subtrees(reference[key], value[key], item_node, other_node)
+        dropped = set(equal[len(equal) - _droppable(len(common), union, len(equal)):])
+        pruned_reference = {}
+        for key, item in reference.items():
+            if key in pruned:
+                pruned_reference[key] = pruned[key][0]
+            elif key not in dropped:
+                pruned_reference[key] = item
+        pruned_value = {}
+        for key, item in value.items():
+            if key in pruned:
+                pruned_value[key] = pruned[key][1]
+            elif key not in dropped:
+                pruned_value[key] = item
+        return pruned_reference, pruned_value
+    if isinstance(reference, list) and isinstance(value, list):
+        if not isinstance(reference_children, list) or not isinstance(value_children, list):
+            return reference, value
+        if len(reference_children) != len(reference) or len(value_children) != len(value):
+            return reference, value
+        pruned_reference, pruned_value = list(reference), list(value)
+        for index, item_node, other_node in zip(range(len(value)), reference_children, value_children):
+            if _equal(reference[index], value[index], item_node, other_node):
+                pruned_reference[index], pruned_value[index] = {}, {}
+            else:
+                pruned_reference[index], pruned_value[index] = prune_equal_subtrees(
+                    reference[index], value[index], item_node, other_node
+                )
+        return pruned_reference, pruned_value
+    return reference, value
+
+
+def list_key_name(list_key):
+    """Key named by ``list_key``, given as ``ip`` or as the ``$ip$`` anchor, or None."""
+    if list_key is None:
+        return None
+    if not isinstance(list_key, str) or not list_key.strip('$'):
+        raise AnsibleError(f"'list_key' must be a key name, got {list_key!r}")
+    return list_key.strip('$')
+
+
+def _keyed(items, key):
+    return bool(items) and all(isinstance(item, dict) and key in item for item in items)
+
+
+def _index(items, key):
+    indexed = {}
+    for item in items:
+        try:
+            duplicate = item[key] in indexed
+        except TypeError:
+            raise AnsibleError(f"Unhashable '{key}' {item[key]!r} in a list indexed by 'list_key'.")
+        if duplicate:
+            raise AnsibleError(f"Duplicate '{key}' {item[key]!r} in a list indexed by 'list_key'.")
+        indexed[item[key]] = item
+    return indexed
 
-def main(args):
-    """Module function."""
+
+def index_lists(reference, value, key):
+    """``reference`` and ``value`` with their lists of dicts holding ``key`` turned into dicts by the value of ``key``.
+
+    Lists are indexed in pairs, so an empty list compared with an indexed one is indexed too, and
+    lists of which only one holds ``key`` in each item are left as they are. Items of indexed lists
+    are then matched by their ``key`` instead of their position, whatever the order of the lists.
+    """
+    if isinstance(reference, list) and isinstance(value, list):
+        reference_keyed, value_keyed = _keyed(reference, key), _keyed(value, key)
+        if reference_keyed and (value_keyed or not value) or value_keyed and not reference:
+            reference, value = _index(reference, key), _index(value, key)
+        else:
+            pairs = [index_lists(item, other, key) for item, other in zip(reference, value)]
+            count = len(pairs)
+            return (
+                [pair[0] for pair in pairs] + [index_lists(item, item, key)[0] for item in reference[count:]],
+                [pair[1] for pair in pairs] + [index_lists(item, item, key)[1] for item in value[count:]],
+            )
+    if isinstance(reference, dict) and isinstance(value, dict):
+        indexed_reference, indexed_value = {}, {}
+        for name, item in reference.items():
+            if name in value:
+                other = value[name]
+                if isinstance(item, (dict, list)) or isinstance(other, (dict, list)):
+                    item, other = index_lists(item, other, key)
+                indexed_value[name] = other
+            elif isinstance(item, (dict, list)):
+                item = index_lists(item, item, key)[0]
+            indexed_reference[name] = item
+        for name, item in value.items():
+            if name not in reference:
+                indexed_value[name] = index_lists(item, item, key)[1] if isinstance(item, (dict, list)) else item
+        return indexed_reference, indexed_value
+    return reference, value
+
+
+class HashCache:
+    """Hash trees of extracted data by jmespath and exclude list.
+
+    ``trees`` can come from, and be saved back to, the snapshot the data was loaded from.
+    """
+
+    def __init__(self, trees=None):
+        """Create a cache holding ``trees``."""
+        self.trees = dict(trees or {})
+        self.changed = False
+
+    def get(self, jpath, exclude, data, list_key=None):
+        """Hash tree of ``data``, extracted with ``jpath`` and ``exclude`` and indexed by ``list_key``."""
+        key = json.dumps([jpath, list(exclude or [])] + ([list_key] if list_key else []))
+        node = self.trees.get(key)
+        if node is None:
+            node = self.trees[key] = subtree_hashes(data)
+            self.changed = True
+        return node
+
+
+def diff_inputs(reference, value, reference_hashes, value_hashes, jpath, exclude, list_key=None):
+    """``reference`` and ``value`` indexed by ``list_key`` and pruned of the subtrees they share, for diff check types."""
+    if list_key:
+        reference, value = index_lists(reference, value, list_key)
+    reference_node = reference_hashes.get(jpath, exclude, reference, list_key)
+    value_node = value_hashes.get(jpath, exclude, value, list_key)
+    if reference_node is not None and value_node is not None and reference_node[0] == value_node[0]:
+        return None, None
+    return prune_equal_subtrees(reference, value, reference_node, value_node)
+
+
+# Largest integer magnitude converted to a float without rounding, for the numeric check engine.
+EXACT_FLOAT_INT = 2 ** 53
+
+# Operator modes evaluated by the numeric engine, as the comparison each value must pass.
+NUMERIC_OPERATORS = {
+    "is-gt": operator.gt,
+    "is-ge": operator.ge,
+    "is-lt": operator.lt,
+    "is-le": operator.le,
+}
+
+
+def _exact_float(value):
+    """Whether ``value`` compares and computes the same once converted to a float."""
+    kind = type(value)
+    return kind is float or kind is bool or kind is int and -EXACT_FLOAT_INT <= value <= EXACT_FLOAT_INT
+
+
+def _exact_floats(values):
+    """Whether every one of ``values`` compares and computes the same once converted to a float."""
+    kinds = set(map(type, values))
+    if not kinds <= {float, int, bool}:
+        return False
+    # A NaN can hide larger integers from max() and min(), but then fails the comparisons itself.
+    return int not in kinds or not values or -EXACT_FLOAT_INT <= min(values) and max(values) <= EXACT_FLOAT_INT
+
+
+def numbers(values):
+    """``values`` as a float array, with NumPy when it is installed."""
+    if HAS_NUMPY:
+        return numpy.array(values, dtype=numpy.float64)
+    return array.array('d', values)
+
+
+def failing_positions(values, mode, operator_data):
+    """Positions of the ``values`` failing the numeric operator ``mode`` with ``operator_data``, in order."""
+    if mode in ("in-range", "not-in-range"):
+        low, high = operator_data
+        if HAS_NUMPY:
+            inside = (low < values) & (values < high)
+            return numpy.flatnonzero(inside if mode == "not-in-range" else ~inside).tolist()
+        if mode == "not-in-range":
+            return [position for position, value in enumerate(values) if low < value < high]
+        return [position for position, value in enumerate(values) if not low < value < high]
+    if HAS_NUMPY:
+        return numpy.flatnonzero(~NUMERIC_OPERATORS[mode](values, operator_data)).tolist()
+    # Not the opposite comparison, which a NaN would pass too.
+    failed = map(operator.not_, map(NUMERIC_OPERATORS[mode], values, repeat(operator_data)))
+    return list(compress(range(len(values)), failed))
+
+
+def evaluate_numeric_operator(check, evaluate_args):
+    """Result of a numeric ``operator`` check evaluated in bulk, or None when the check is not one.
+
+    The values of ``value_to_compare`` are compared as one array, then each failing value reports
+    its item, like jdiff does. Checks with other modes, other values or other shapes are left to jdiff.
+    """
+    if set(evaluate_args) != {"params", "value_to_compare"}:
+        return None
+    params = evaluate_args['params']
+    check._validate(params)
+    mode, operator_data = params['params']['mode'], params['params']['operator_data']
+    if mode not in NUMERIC_OPERATORS and mode not in ("in-range", "not-in-range"):
+        return None
+    bounds = operator_data if isinstance(operator_data, (list, tuple)) else [operator_data]
+    items = evaluate_args['value_to_compare']
+    if not isinstance(items, list) or not all(_exact_float(bound) for bound in bounds):
+        return None
+    try:
+        groups = list(chain.from_iterable(map(dict.values, items)))
+        values = list(chain.from_iterable(map(dict.values, groups)))
+    except TypeError:
+        return None
+    if not _exact_floats(values):
+        return None
+    positions = failing_positions(numbers(values), mode, operator_data)
+    if not (len(items) == len(groups) == len(values) and all(items) and all(groups)):
+        # Values of items not holding one value each are mapped back to their item.
+        owners = [index for index, item in enumerate(items) for group in item.values() for _value in group]
+        positions = map(owners.__getitem__, positions)
+    failed = list(map(items.__getitem__, positions))
+    return failed, not failed
+
+
+def evaluate_check(check, check_type, evaluate_args):
+    """``check.evaluate(**evaluate_args)``, with numeric operator checks evaluated in bulk."""
+    if check_type == "operator":
+        result = evaluate_numeric_operator(check, evaluate_args)
+        if result is not None:
+            return result
+    return check.evaluate(**evaluate_args)
+
+
+def load_json_file(path):
+    """Parse the JSON file at ``path``, with orjson when available."""
+    with open(path, "rb") as handle:
+        if HAS_ORJSON and os.fstat(handle.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    return orjson.loads(view)
+        content = handle.read()
+    return orjson.loads(content) if HAS_ORJSON else json.loads(content)
+
+
+def load_inputs(args):
+    """``args`` with ``value_file`` and ``reference_file`` loaded into ``evaluate_args``."""
+    files = {"value_to_compare": args.get('value_file'), "reference_data": args.get('reference_file')}
+    if not any(files.values()):
+        return args
+    evaluate_args = args.get('evaluate_args', {})
+    if not isinstance(evaluate_args, dict):
+        raise AnsibleError(f"'evaluate_args' invalid type, expected <class 'dict'>, got {type(evaluate_args)}")
+    evaluate_args = dict(evaluate_args)
+    for key, path in files.items():
+        if not path:
+            continue
+        try:
+            evaluate_args[key] = load_json_file(path)
+        except (IOError, OSError, ValueError) as e:
+            raise AnsibleError(f"Unable to load JSON from '{path}': {e}")
+    return dict(args, evaluate_args=evaluate_args)
+
+
+def load_snapshots(args, store, device):
+    """``args`` with ``value_snapshot`` and ``reference_snapshot`` loaded into ``evaluate_args``.
+
+    Only the top-level keys the ``jmespath`` of the task, or of its checks, can select are decoded.
+    """
+    labels = {"value_to_compare": args.get('value_snapshot'), "reference_data": args.get('reference_snapshot')}
+    if not any(labels.values()):
+        return args
+    command = args.get('snapshot_command')
+    if not command:
+        raise AnsibleError("'snapshot_command' is required to load snapshots.")
+    evaluate_args = args.get('evaluate_args', {})
+    if not isinstance(evaluate_args, dict):
+        raise AnsibleError(f"'evaluate_args' invalid type, expected <class 'dict'>, got {type(evaluate_args)}")
+    jpath = args.get('jmespath', '*')
+    if args.get('checks') is not None:
+        paths = [check.get('jmespath', jpath) for check in args['checks'] if isinstance(check, dict)]
+    else:
+        paths = [jpath]
+    evaluate_args = dict(evaluate_args)
+    for key, label in labels.items():
+        if not label:
+            continue
+        try:
+            evaluate_args[key] = store.load_selected(device, command, label, paths)
+        except (KeyError, ValueError) as e:
+            raise AnsibleError(f"Unable to load snapshot: {e}")
+    return dict(args, evaluate_args=evaluate_args)
+
+
+def main(args, reference_hashes=None):
+    """Module function.
+
+    ``reference_hashes`` is a ``HashCache`` of the reference data, such as one saved with its snapshot.
+    """
+    args = load_inputs(args)
     if "evaluate_args" not in args:
         raise AnsibleError("Invalid arguments, 'evaluate_args' not found.")
+    if reference_hashes is None:
+        reference_hashes = HashCache()
+    if args.get('checks') is not None:
+        return run_checks(args, reference_hashes)
     check_type = args.get('check_type')
     evaluate_args = args.get('evaluate_args')
     if not isinstance(evaluate_args, dict):
@@ -34,15 +590,23 @@ def main(args):
     value = evaluate_args['value_to_compare']
     jpath = args.get('jmespath', '*')
     exclude = args.get('exclude')
+    list_key = list_key_name(args.get('list_key'))
 
     try:
         check = CheckType.create(check_type)
         evaluate_args['value_to_compare'] = extract_data_from_json(value, jpath, exclude)
         if reference_data:
             evaluate_args['reference_data'] = extract_data_from_json(reference_data, jpath, exclude)
-        eval_results, passed = check.evaluate(**evaluate_args)
+            if check_type in DIFF_CHECK_TYPES:
+                evaluate_args['reference_data'], evaluate_args['value_to_compare'] = diff_inputs(
+                    evaluate_args['reference_data'], evaluate_args['value_to_compare'],
+                    reference_hashes, HashCache(), jpath, exclude, list_key,
+                )
+        eval_results, passed = evaluate_check(check, check_type, evaluate_args)
     except NotImplementedError:
         raise AnsibleError(f"CheckType '{check_type}' not supported by jdiff")
+    except AnsibleError:
+        raise
     except Exception as e:
         raise AnsibleError(f"Exception in backend jdiff library: {e}")
 
@@ -52,6 +616,88 @@ def main(args):
     )
 
 
+class Extractor:
+    """Extract data once per distinct jmespath and exclude list.
+
+    ``exclude`` filtering modifies the data in place, so each distinct exclude list works on its own copy.
+    """
+
+    def __init__(self, data):
+        """Extract from ``data``."""
+        self.data = data
+        self._filtered = {}
+        self._extracted = {}
+
+    def extract(self, jpath, exclude):
+        """Data selected by ``jpath`` once ``exclude`` keys are removed."""
+        exclude_key = tuple(exclude) if exclude else ()
+        key = (jpath, exclude_key)
+        if key not in self._extracted:
+            data = self._filtered.get(exclude_key)
+            if data is None:
+                data = self.data if not exclude_key else copy.deepcopy(self.data)
+                self._filtered[exclude_key] = data
+            self._extracted[key] = extract_data_from_json(data, jpath, exclude if exclude_key else None)
+        return self._extracted[key]
+
+
+def run_checks(args, reference_hashes):
+    """Run every check of ``args['checks']`` against the data of ``evaluate_args``.
+
+    Each check has its own ``check_type``, ``evaluate_args``, ``jmespath`` and ``exclude``;
+    ``jmespath`` and ``exclude`` default to the task ones. Data selected by the same
+    ``jmespath`` and ``exclude`` is extracted and hashed once for all the checks using it.
+    """
+    evaluate_args = args.get('evaluate_args')
+    if not isinstance(evaluate_args, dict):
+        raise AnsibleError(f"'evaluate_args' invalid type, expected <class 'dict'>, got {type(evaluate_args)}")
+    if "value_to_compare" not in evaluate_args:
+        raise AnsibleError("Key 'value_to_compare' missing in 'evaluate_arguments'.")
+    checks = args['checks']
+    if not isinstance(checks, list):
+        raise AnsibleError(f"'checks' invalid type, expected <class 'list'>, got {type(checks)}")
+
+    values = Extractor(evaluate_args['value_to_compare'])
+    reference_data = evaluate_args.get("reference_data")
+    references = Extractor(reference_data) if reference_data else None
+    value_hashes = HashCache()
+    results = {}
+    for index, check_args in enumerate(checks):
+        if not isinstance(check_args, dict) or "check_type" not in check_args:
+            raise AnsibleError(f"Check {index} must be a dict with a 'check_type' key.")
+        check_type = check_args['check_type']
+        name = check_args.get('name', f"{index}_{check_type}")
+        if name in results:
+            raise AnsibleError(f"Duplicate check name '{name}'.")
+        jpath = check_args.get('jmespath', args.get('jmespath', '*'))
+        exclude = check_args.get('exclude', args.get('exclude'))
+        list_key = list_key_name(check_args.get('list_key', args.get('list_key')))
+        check_evaluate_args = dict(check_args.get('evaluate_args') or {})
+        try:
+            check = CheckType.create(check_type)
+            check_evaluate_args['value_to_compare'] = values.extract(jpath, exclude)
+            # Only the diff check types compare against reference data; the others take no such argument.
+            if references is not None and check_type in DIFF_CHECK_TYPES:
+                check_evaluate_args['reference_data'], check_evaluate_args['value_to_compare'] = diff_inputs(
+                    references.extract(jpath, exclude), check_evaluate_args['value_to_compare'],
+                    reference_hashes, value_hashes, jpath, exclude, list_key,
+                )
+            eval_results, passed = evaluate_check(check, check_type, check_evaluate_args)
+        except NotImplementedError:
+            raise AnsibleError(f"CheckType '{check_type}' not supported by jdiff")
+        except AnsibleError:
+            raise
+        except Exception as e:
+            raise AnsibleError(f"Exception in backend jdiff library for check '{name}': {e}")
+        results[name] = dict(success=passed, fail_details=eval_results)
+
+    return dict(
+        success=all(result['success'] for result in results.values()),
+        fail_details={name: result['fail_details'] for name, result in results.items() if not result['success']},
+        checks=results,
+    )
+
+
 class ActionModule(ActionBase):
     """Ansible Action Module to interact with jdiff.
 
@@ -86,5 +732,27 @@ class ActionModule(ActionBase):
             # should not be set anymore but here for backwards compatibility
             del result["invocation"]["module_args"]
 
-        args = self._task.args
-        return main(args=args)
+        args = dict(self._task.args)
+        for option in ('value_file', 'reference_file'):
+            if args.get(option):
+                args[option] = self._find_needle('files', args[option])
+        if args.get('value_snapshot') or args.get('reference_snapshot'):
+            if SNAPSHOT_IMPORT_ERROR:
+                raise AnsibleError(f"Unable to load the snapshot store: {SNAPSHOT_IMPORT_ERROR}")
+            for option in ('snapshot_dir', 'snapshot_device'):
+                if not args.get(option):
+                    raise AnsibleError(f"'{option}' is required to load snapshots.")
+            store = SnapshotStore(os.path.expanduser(args['snapshot_dir']))
+            device = args['snapshot_device']
+            args = load_snapshots(args, store, device)
+        reference_hashes = HashCache()
+        if args.get('reference_snapshot'):
+            reference_hashes = HashCache(store.load_hashes(device, args['snapshot_command'], args['reference_snapshot']))
+        result = main(args=args, reference_hashes=reference_hashes)
+        if args.get('reference_snapshot') and reference_hashes.changed:
+            try:
+                store.save_hashes(device, args['snapshot_command'], args['reference_snapshot'], reference_hashes.trees)
+            except (IOError, OSError) as e:
+                result.setdefault('warnings', []).append(f"Unable to save snapshot hashes: {e}")
+        result["jmespath_cache"] = JMESPATH_CACHE.stats()
+        return result
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2022, Network to Code (@networktocode) <info@networktocode.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+"""Action plugin validating the hostvars of many hosts on the controller for ntc_validate_schema."""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+
+from ansible.errors import AnsibleError
+from ansible.parsing.ajson import AnsibleJSONEncoder
+from ansible.plugins.action import ActionBase
+
+try:
+    from ansible_collections.networktocode.netauto.plugins.module_utils.schema_registry import load_registry
+    from ansible_collections.networktocode.netauto.plugins.module_utils.schema_validation import (
+        HAS_JSONSCHEMA,
+        MALFORMED_SCOPE,
+        ResultCache,
+        malformed_scope_item,
+        summarize_hosts,
+        validate_hosts,
+    )
+except ImportError as imp_exc:
+    SCHEMA_IMPORT_ERROR = imp_exc
+else:
+    SCHEMA_IMPORT_ERROR = None
+
+
+__metaclass__ = type
+
+MODULE_NAME = "networktocode.netauto.ntc_validate_schema"
+
+
+def batch_data(hostvars, hosts, scope):
+    """Plain data of the scoped features of every host in ``hosts``, keyed by host."""
+    features = [item["name"] for item in scope]
+    data = {}
+    for host in hosts:
+        host_vars = hostvars[host]
+        data[host] = {feature: host_vars[feature] for feature in features if feature in host_vars}
+    # Templated values are tagged or unsafe types; hand plain JSON types to the worker processes.
+    return json.loads(json.dumps(data, cls=AnsibleJSONEncoder))
+
+
+class ActionModule(ActionBase):
+    """Validate ``batch_hosts`` from hostvars on the controller, run the module for everything else.
+
+    Args:
+        ActionBase (ActionBase): Ansible Action Plugin
+    """
+
+    def run(self, tmp=None, task_vars=None):
+        """Run of action plugin for ntc_validate_schema.
+
+        Args:
+            tmp ([type], optional): [description]. Defaults to None.
+            task_vars ([type], optional): [description]. Defaults to None.
+        """
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        args = self._task.args
+        if args.get("batch_hosts") is None:
+            result.update(self._execute_module(module_name=MODULE_NAME, module_args=args, task_vars=task_vars))
+            return result
+
+        if SCHEMA_IMPORT_ERROR:
+            raise AnsibleError("Unable to load schema validation: {0}".format(SCHEMA_IMPORT_ERROR))
+        if not HAS_JSONSCHEMA:
+            raise AnsibleError("jsonschema is required for this module.")
+
+        schema = args.get("schema")
+        scope = args.get("scope")
+        schema_dir = os.path.expanduser(args["schema_dir"]) if args.get("schema_dir") else None
+        if not (isinstance(schema, dict) or schema is None and schema_dir) or not isinstance(scope, list):
+            raise AnsibleError("'schema' (dict) or 'schema_dir', and 'scope' (list) are required.")
+        malformed = malformed_scope_item(scope)
+        if malformed is not None:
+            raise AnsibleError(MALFORMED_SCOPE.format(malformed))
+        salt = ""
+        if schema_dir:
+            if not os.path.isdir(schema_dir):
+                raise AnsibleError("schema_dir {0} is not a directory.".format(schema_dir))
+            registry = load_registry(schema_dir)
+            schema = registry.complete(schema, scope)
+            salt = registry.digest
+
+        data = batch_data(task_vars["hostvars"], args["batch_hosts"], scope)
+        result_cache = None
+        if args.get("result_cache"):
+            result_cache = ResultCache(os.path.expanduser(args["result_cache"]), salt=salt)
+        results = validate_hosts(
+            schema,
+            scope,
+            data,
+            workers=args.get("workers"),
+            cache_dir=os.path.expanduser(args["cache_dir"]) if args.get("cache_dir") else None,
+            engine=args.get("engine", "jsonschema"),
+            result_cache=result_cache,
+            schema_dir=schema_dir,
+        )
+        errors_file = os.path.expanduser(args["errors_file"]) if args.get("errors_file") else None
+        result.update(summarize_hosts(results, errors_file))
+        if result_cache is not None:
+            result_cache.save()
+            result["skipped_features"] = result_cache.hits
+        result["changed"] = False
+        if result["failed_hosts"]:
+            result["failed"] = True
+            result["msg"] = "{0} of {1} hosts failed schema validation".format(
+                len(result["failed_hosts"]), result["hosts"]
+            )
+        return result
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# Copyright: (c) 2022, Network to Code (@networktocode) <info@networktocode.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+"""Lookup plugin querying the ntc_save_config backup store."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+DOCUMENTATION = r"""
+---
+name: ntc_backup
+author: Network to Code (@networktocode)
+short_description: Search and diff configuration backups taken with ntc_save_config
+description:
+    - Query the backup store written by M(networktocode.netauto.ntc_save_config) with C(backup_dir).
+    - Answers come from an index kept in C(search.sqlite) inside the store. It is refreshed on every lookup,
+      which only reads backups taken since the previous lookup.
+options:
+    _terms:
+        description:
+            - Config lines to search for with C(query=search), device names for the other queries.
+        required: true
+    backup_dir:
+        description:
+            - Directory of the backup store.
+        required: true
+        type: str
+    query:
+        description:
+            - C(search) returns the devices whose configuration has the line.
+            - C(diff) returns the unified diff of the device configuration between C(since) and C(at).
+            - C(config) returns the device configuration at C(at).
+            - C(history) returns the backups of the device as a list of timestamp and hash.
+        default: search
+        choices: [search, diff, config, history]
+        type: str
+    at:
+        description:
+            - Point in time to query, as epoch seconds or an ISO 8601 date or datetime (UTC unless an offset is given).
+              Defaults to now.
+        type: str
+    since:
+        description:
+            - Start of the diff with C(query=diff), in the same formats as C(at).
+        type: str
+    contains:
+        description:
+            - With C(query=search), match lines that contain the term instead of lines equal to it.
+        default: false
+        type: bool
+notes:
+    - Use C(query) (or C(wantlist=true)) with C(query=search) or C(query=history) to get lists back.
+"""
+
+EXAMPLES = r"""
+- name: "DEVICES THAT HAVE THE HTTP SERVER ENABLED TODAY"
+  ansible.builtin.debug:
+    msg: "{{ query('networktocode.netauto.ntc_backup', 'ip http server', backup_dir='/srv/backups') }}"
+
+- name: "WHAT CHANGED ON LEAF01 SINCE MARCH"
+  ansible.builtin.debug:
+    msg: "{{ lookup('networktocode.netauto.ntc_backup', 'leaf01', backup_dir='/srv/backups', query='diff', since='2022-03-01') }}"
+
+- name: "DEVICES THAT HAD ANY SNMP COMMUNITY ON JUNE 1ST"
+  ansible.builtin.debug:
+    msg: "{{ query('networktocode.netauto.ntc_backup', 'snmp-server community', backup_dir='/srv/backups',
+                   contains=true, at='2022-06-01T00:00:00') }}"
+"""
+
+RETURN = r"""
+_list:
+    description:
+        - One entry per term. A list of device names for C(search), the diff or configuration text for C(diff)
+          and C(config) (null when the device had no backup at that time), a list of timestamp and hash for C(history).
+    type: list
+"""
+
+import datetime  # noqa E402
+
+from ansible.errors import AnsibleError  # noqa E402
+from ansible.plugins.lookup import LookupBase  # noqa E402
+
+try:
+    from ansible_collections.networktocode.netauto.plugins.module_utils.backup_index import BackupIndex
+except ImportError as imp_exc:
+    INDEX_IMPORT_ERROR = imp_exc
+else:
+    INDEX_IMPORT_ERROR = None
+
+
+def parse_time(value):
+    """Epoch seconds of ``value``, given as a number or an ISO 8601 date or datetime; None stays None."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise AnsibleError("Invalid time {0!r}, expected epoch seconds or an ISO 8601 date".format(value)) from None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+class LookupModule(LookupBase):
+    """Lookup plugin answering searches and diffs from the backup store index."""
+
+    def run(self, terms, variables=None, **kwargs):
+        """Run the query for every term."""
+        if INDEX_IMPORT_ERROR:
+            raise AnsibleError("Unable to load the backup index: {0}".format(INDEX_IMPORT_ERROR))
+
+        self.set_options(var_options=variables, direct=kwargs)
+        query = self.get_option("query")
+        when = parse_time(self.get_option("at"))
+        since = parse_time(self.get_option("since"))
+        if query == "diff" and since is None:
+            raise AnsibleError("since is required with query=diff")
+
+        results = []
+        with BackupIndex(self.get_option("backup_dir")) as index:
+            for term in terms:
+                if query == "search":
+                    results.append(index.search(term, when=when, contains=self.get_option("contains")))
+                elif query == "diff":
+                    results.append(index.diff(term, since, when))
+                elif query == "config":
+                    results.append(index.config(term, when))
+                else:
+                    results.append(index.history(term))
+        return results
@@ -0,0 +1,175 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Searchable index of a backup store: device timelines and an inverted index of config lines."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import difflib
+import json
+import os
+import sqlite3
+import time
+
+from .backup_store import BackupStore
+
+INDEX_FILE = "search.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS index_files (filename TEXT PRIMARY KEY, device TEXT, index_mtime REAL, index_size INTEGER);
+CREATE TABLE IF NOT EXISTS timeline (device TEXT, timestamp REAL, hash TEXT);
+CREATE INDEX IF NOT EXISTS timeline_device ON timeline (device, timestamp);
+CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS lines (id INTEGER PRIMARY KEY, text TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS postings (line_id INTEGER, hash TEXT, PRIMARY KEY (line_id, hash)) WITHOUT ROWID;
+"""
+
+
+class BackupIndex:
+    """Index over a ``BackupStore``, kept in a SQLite file inside the store.
+
+    ``refresh`` only reads device indexes that changed since the last refresh and blobs that
+    were never indexed, so keeping the index current costs little more than the new backups.
+    Lines are indexed stripped of surrounding whitespace.
+    """
+
+    def __init__(self, root):
+        """Open (and create) the index of the store at ``root``."""
+        self.store = BackupStore(root)
+        self.path = os.path.join(root, INDEX_FILE)
+        self._db = sqlite3.connect(self.path)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        """Close the index database."""
+        self._db.close()
+
+    def __enter__(self):
+        """Refresh and return the index."""
+        self.refresh()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the index database."""
+        self.close()
+
+    def refresh(self):
+        """Index device indexes and blobs added, changed or removed since the last refresh."""
+        known = {
+            filename: (device, (mtime, size))
+            for filename, device, mtime, size in self._db.execute(
+                "SELECT filename, device, index_mtime, index_size FROM index_files"
+            )
+        }
+        filenames = [filename for filename in os.listdir(self.store.index_dir) if filename.endswith(".json")]
+        with self._db:
+            for filename in set(known) - set(filenames):
+                self._db.execute("DELETE FROM timeline WHERE device = ?", (known[filename][0],))
+                self._db.execute("DELETE FROM index_files WHERE filename = ?", (filename,))
+            for filename in filenames:
+                path = os.path.join(self.store.index_dir, filename)
+                stat = os.stat(path)
+                # The size catches a rewrite within the timestamp resolution of the file system.
+                if known.get(filename, (None, None))[1] == (stat.st_mtime, stat.st_size):
+                    continue
+                with open(path, "r") as index_file:
+                    index = json.load(index_file)
+                device = index["device"]
+                self._db.execute("DELETE FROM timeline WHERE device = ?", (device,))
+                self._db.executemany(
+                    "INSERT INTO timeline (device, timestamp, hash) VALUES (?, ?, ?)",
+                    [(device, entry["timestamp"], entry["hash"]) for entry in index["backups"]],
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO index_files (filename, device, index_mtime, index_size) VALUES (?, ?, ?, ?)",
+                    (filename, device, stat.st_mtime, stat.st_size),
+                )
+
+            missing = self._db.execute(
+                "SELECT DISTINCT t.hash FROM timeline t LEFT JOIN blobs b ON b.hash = t.hash WHERE b.hash IS NULL"
+            ).fetchall()
+            for (digest,) in missing:
+                self._index_blob(digest)
+
+    def _index_blob(self, digest):
+        lines = set(line.strip() for line in self.store.read(digest).splitlines())
+        lines.discard("")
+        self._db.executemany("INSERT OR IGNORE INTO lines (text) VALUES (?)", [(line,) for line in lines])
+        self._db.executemany(
+            "INSERT OR IGNORE INTO postings (line_id, hash) SELECT id, ? FROM lines WHERE text = ?",
+            [(digest, line) for line in lines],
+        )
+        self._db.execute("INSERT INTO blobs (hash) VALUES (?)", (digest,))
+
+    def devices(self):
+        """Names of every indexed device."""
+        return [row[0] for row in self._db.execute("SELECT device FROM index_files ORDER BY device")]
+
+    def history(self, device):
+        """Backups of ``device`` as a list of ``{"timestamp", "hash"}``, oldest first."""
+        rows = self._db.execute("SELECT timestamp, hash FROM timeline WHERE device = ? ORDER BY timestamp", (device,))
+        return [{"timestamp": timestamp, "hash": digest} for timestamp, digest in rows]
+
+    def at(self, device, when=None):
+        """Digest of the configuration ``device`` had at ``when`` (epoch seconds, default now), or None."""
+        row = self._db.execute(
+            "SELECT hash FROM timeline WHERE device = ? AND timestamp <= ? ORDER BY timestamp DESC LIMIT 1",
+            (device, time.time() if when is None else when),
+        ).fetchone()
+        return row[0] if row else None
+
+    def config(self, device, when=None):
+        """Configuration text ``device`` had at ``when``, or None."""
+        digest = self.at(device, when)
+        return self.store.read(digest) if digest else None
+
+    def diff(self, device, since, until=None):
+        """Unified diff of the configuration of ``device`` between ``since`` and ``until`` (default now)."""
+        old_hash, new_hash = self.at(device, since), self.at(device, until)
+        if old_hash == new_hash:
+            return ""
+        old = self.store.read(old_hash).splitlines(True) if old_hash else []
+        new = self.store.read(new_hash).splitlines(True) if new_hash else []
+        return "".join(
+            difflib.unified_diff(
+                old, new, fromfile="{0}@{1}".format(device, since), tofile="{0}@{1}".format(device, until)
+            )
+        )
+
+    def search(self, line, when=None, contains=False):
+        """Devices whose configuration at ``when`` (default now) has ``line``.
+
+        Lines are compared stripped; with ``contains`` any line holding ``line`` as a substring matches.
+        """
+        line_filter = "instr(l.text, ?) > 0" if contains else "l.text = ?"
+        rows = self._db.execute(
+            """
+            SELECT DISTINCT current.device FROM (
+                SELECT t.device, t.hash FROM timeline t
+                WHERE t.timestamp = (
+                    SELECT MAX(timestamp) FROM timeline WHERE device = t.device AND timestamp <= ?
+                )
+            ) current
+            JOIN postings p ON p.hash = current.hash
+            JOIN lines l ON l.id = p.line_id
+            WHERE {0}
+            ORDER BY current.device
+            """.format(
+                line_filter
+            ),
+            (time.time() if when is None else when, line.strip()),
+        )
+        return [row[0] for row in rows]
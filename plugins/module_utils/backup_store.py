@@ -0,0 +1,161 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Content addressed store of configuration backups with a history index per device."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+# Lines that change on every show of an otherwise identical configuration.
+VOLATILE_LINES = re.compile(
+    r"^(?:"
+    r"Building configuration\.\.\."
+    r"|Current configuration : \d+ bytes"
+    r"|Using \d+ out of \d+ bytes(?:, uncompressed size = \d+ bytes)?"
+    r"|Uncompressed configuration from \d+ bytes to \d+ bytes"
+    r"|! Last configuration change at .*"
+    r"|! NVRAM config last updated at .*"
+    r"|! No configuration change since last restart"
+    r"|! ?Time: .*"
+    r"|!Running configuration last done at: .*"
+    r"|!Startup config saved at: .*"
+    r"|! Startup-config last modified at .*"
+    r"|! ?Command: show .*"
+    r")\s*$"
+)
+
+
+def normalize_config(text):
+    """Drop volatile header lines and trailing whitespace so equal configs compare equal."""
+    lines = [line.rstrip() for line in text.replace("\r\n", "\n").split("\n")]
+    lines = [line for line in lines if not VOLATILE_LINES.match(line)]
+    return "\n".join(lines).strip("\n") + "\n"
+
+
+def content_hash(text):
+    """SHA-256 of ``text`` as hex."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def write_atomic(path, data):
+    """Write ``data`` (bytes) to ``path`` through a temporary file, so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class BackupStore:
+    """Configuration backups stored once per distinct content.
+
+    Blobs are gzip files under ``objects/`` named by the SHA-256 of their text, shared between
+    devices. Each device has a JSON index under ``index/`` listing when each new content was
+    first seen. When the configuration was last checked is kept next to it in a ``.checked``
+    file, so the index itself only changes with the content.
+    """
+
+    def __init__(self, root):
+        """Use (and create) the store at ``root``."""
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_dir = os.path.join(root, "index")
+        for directory in (self.objects_dir, self.index_dir):
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+
+    def blob_path(self, digest):
+        """Path of the blob holding ``digest``."""
+        return os.path.join(self.objects_dir, digest[:2], "{0}.gz".format(digest[2:]))
+
+    def has(self, digest):
+        """Whether a blob with ``digest`` is stored."""
+        return os.path.isfile(self.blob_path(digest))
+
+    def read(self, digest):
+        """Text of the blob ``digest``."""
+        with gzip.open(self.blob_path(digest), "rb") as blob:
+            return blob.read().decode("utf-8")
+
+    def write_blob(self, text):
+        """Store ``text`` unless an identical blob exists and return its digest."""
+        digest = content_hash(text)
+        path = self.blob_path(digest)
+        if not os.path.isfile(path):
+            directory = os.path.dirname(path)
+            if not os.path.isdir(directory):
+                os.makedirs(directory, exist_ok=True)
+            # mtime=0 keeps the compressed bytes identical for identical text.
+            write_atomic(path, gzip.compress(text.encode("utf-8"), mtime=0))
+        return digest
+
+    def index_path(self, device):
+        """Path of the history index of ``device``."""
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", device)
+        return os.path.join(self.index_dir, "{0}.json".format(name))
+
+    def checked_path(self, device):
+        """Path of the file holding when ``device`` was last checked."""
+        return self.index_path(device)[: -len(".json")] + ".checked"
+
+    def index(self, device):
+        """History index of ``device``, empty when it was never backed up."""
+        path = self.index_path(device)
+        if not os.path.isfile(path):
+            return {"device": device, "backups": [], "checked_at": None}
+        with open(path, "r") as index_file:
+            index = json.load(index_file)
+        if os.path.isfile(self.checked_path(device)):
+            with open(self.checked_path(device), "r") as checked_file:
+                index["checked_at"] = float(checked_file.read())
+        return index
+
+    def history(self, device):
+        """Backups of ``device`` as a list of ``{"timestamp", "hash"}``, oldest first."""
+        return self.index(device)["backups"]
+
+    def latest(self, device):
+        """Digest of the last backup of ``device``, or None."""
+        backups = self.history(device)
+        return backups[-1]["hash"] if backups else None
+
+    def put(self, device, text, timestamp=None):
+        """Back up ``text`` for ``device``.
+
+        Returns:
+            tuple: The digest of ``text`` and whether it differs from the previous backup of the device.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        digest = self.write_blob(text)
+        index = self.index(device)
+        new = not index["backups"] or index["backups"][-1]["hash"] != digest
+        index["checked_at"] = timestamp
+        if new:
+            index["backups"].append({"timestamp": timestamp, "hash": digest})
+            write_atomic(self.index_path(device), json.dumps(index, indent=2, sort_keys=True).encode("utf-8"))
+        write_atomic(self.checked_path(device), repr(float(timestamp)).encode("utf-8"))
+        return digest, new
@@ -0,0 +1,131 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Bounded worker pool with per-job timeouts and an append-only manifest of results."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import os
+import queue
+import threading
+import time
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+
+
+class Manifest:
+    """JSON lines file with one record per finished job, flushed as each job completes.
+
+    Records are only ever appended, so a crash loses at most the line being written; a
+    truncated last line is ignored on load.
+    """
+
+    def __init__(self, path):
+        """Load the records already written to ``path``."""
+        self.path = path
+        self.records = {}
+        self._lock = threading.Lock()
+        self._partial_line = False
+        if path and os.path.isfile(path):
+            with open(path, "r") as manifest:
+                for line in manifest:
+                    self._partial_line = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.records[record["device"]] = record
+
+    def done(self, device):
+        """Whether ``device`` already finished successfully."""
+        return self.records.get(device, {}).get("status") == STATUS_OK
+
+    def append(self, record):
+        """Append ``record`` (which must have a ``device`` key) and flush it to disk."""
+        with self._lock:
+            self.records[record["device"]] = record
+            if not self.path:
+                return
+            with open(self.path, "a") as manifest:
+                if self._partial_line:
+                    # Terminate the line a crash cut short instead of appending to it.
+                    manifest.write("\n")
+                    self._partial_line = False
+                manifest.write(json.dumps(record, sort_keys=True) + "\n")
+                manifest.flush()
+                os.fsync(manifest.fileno())
+
+
+def run_pool(names, func, workers, timeout, on_result, clock=time.monotonic):  # pylint: disable=too-many-arguments
+    """Call ``func(name)`` for every name with at most ``workers`` calls running at once.
+
+    Each call runs in a daemon thread. A call still running ``timeout`` seconds after it started is
+    reported as timed out and its eventual result ignored, so a hung device never holds up the
+    report of the others. Its thread still counts against ``workers`` until it exits; when no
+    slot frees up within ``timeout`` seconds, the names left are reported as timed out as well.
+
+    ``on_result(name, status, value, duration)`` is called from the calling thread for every name,
+    with ``value`` being the return value of ``func`` or the error message.
+    """
+    pending = list(names)
+    pending.reverse()
+    results = queue.Queue()
+    running = {}
+    abandoned = set()
+
+    def work(name, token):
+        try:
+            results.put((token, STATUS_OK, func(name)))
+        except Exception as err:  # pylint: disable=broad-except
+            results.put((token, STATUS_FAILED, getattr(err, "message", str(err))))
+
+    while pending or running:
+        while pending and len(running) + len(abandoned) < workers:
+            name = pending.pop()
+            token = object()
+            running[token] = (name, clock())
+            threading.Thread(target=work, args=(name, token), name="bulk-{0}".format(name), daemon=True).start()
+
+        now = clock()
+        if running:
+            wait = max(min(started for _, started in running.values()) + timeout - now, 0)
+        else:
+            # Every slot is held by a timed out call: wait for one of them to exit.
+            wait = timeout
+        try:
+            token, status, value = results.get(timeout=wait)
+        except queue.Empty:
+            token = None
+            if not running:
+                while pending:
+                    message = "No worker free after {0} seconds, {1} timed out calls still running".format(
+                        timeout, len(abandoned)
+                    )
+                    on_result(pending.pop(), STATUS_TIMEOUT, message, 0)
+        abandoned.discard(token)
+        if token in running:
+            name, started = running.pop(token)
+            on_result(name, status, value, clock() - started)
+
+        now = clock()
+        for token, (name, started) in list(running.items()):
+            if now - started >= timeout:
+                del running[token]
+                abandoned.add(token)
+                on_result(name, STATUS_TIMEOUT, "Timed out after {0} seconds".format(timeout), now - started)
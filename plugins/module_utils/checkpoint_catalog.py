@@ -0,0 +1,121 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Local catalog of the checkpoints taken on each device, with config snapshots and diffs."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import difflib
+import json
+import os
+import re
+import time
+
+from .backup_store import BackupStore, write_atomic
+
+
+def config_diff(old, new, fromfile="", tofile=""):
+    """Unified diff between two configuration texts."""
+    return "".join(difflib.unified_diff(old.splitlines(True), new.splitlines(True), fromfile=fromfile, tofile=tofile))
+
+
+class CheckpointCatalog:
+    """Checkpoints recorded per device as ``{"name", "timestamp", "hash", "previous", "diff_hash"}``.
+
+    Config snapshots and the diff of each checkpoint against the previous one of the same device
+    are kept as blobs of a ``BackupStore`` in the same directory, so a catalog can share the
+    directory (and the blobs) of the configuration backups.
+    """
+
+    def __init__(self, root):
+        """Use (and create) the catalog at ``root``."""
+        self.store = BackupStore(root)
+        self.catalog_dir = os.path.join(root, "checkpoints")
+        if not os.path.isdir(self.catalog_dir):
+            os.makedirs(self.catalog_dir)
+
+    def _path(self, device):
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", device)
+        return os.path.join(self.catalog_dir, "{0}.json".format(name))
+
+    def checkpoints(self, device):
+        """Checkpoints of ``device``, oldest first."""
+        path = self._path(device)
+        if not os.path.isfile(path):
+            return []
+        with open(path, "r") as catalog_file:
+            return json.load(catalog_file)["checkpoints"]
+
+    def _save(self, device, checkpoints):
+        data = {"device": device, "checkpoints": checkpoints}
+        write_atomic(self._path(device), json.dumps(data, indent=2, sort_keys=True).encode("utf-8"))
+
+    def get(self, device, name):
+        """Checkpoint ``name`` of ``device``, or None."""
+        for checkpoint in self.checkpoints(device):
+            if checkpoint["name"] == name:
+                return checkpoint
+        return None
+
+    def config(self, checkpoint):
+        """Configuration snapshot of ``checkpoint``."""
+        return self.store.read(checkpoint["hash"])
+
+    def diff(self, checkpoint):
+        """Precomputed diff of ``checkpoint`` against the previous checkpoint, empty for the first one."""
+        return self.store.read(checkpoint["diff_hash"]) if checkpoint["diff_hash"] else ""
+
+    def record(self, device, name, config, timestamp=None):
+        """Record checkpoint ``name`` of ``device`` with its ``config``, replacing one of the same name."""
+        checkpoints = [checkpoint for checkpoint in self.checkpoints(device) if checkpoint["name"] != name]
+        digest = self.store.write_blob(config)
+        entry = {
+            "name": name,
+            "timestamp": time.time() if timestamp is None else timestamp,
+            "hash": digest,
+            "previous": None,
+            "diff_hash": None,
+        }
+        if checkpoints:
+            previous = checkpoints[-1]
+            entry["previous"] = previous["name"]
+            diff = config_diff(self.config(previous), config, previous["name"], name)
+            entry["diff_hash"] = self.store.write_blob(diff) if diff else None
+        checkpoints.append(entry)
+        self._save(device, checkpoints)
+        return entry
+
+    def prune(self, device, keep=None, older_than=None, now=None, dry_run=False):  # pylint: disable=too-many-arguments
+        """Forget checkpoints of ``device`` beyond the ``keep`` newest or taken before ``older_than`` seconds ago.
+
+        Blobs are left in place since backups or other checkpoints may share them. With ``dry_run``
+        the catalog is not changed.
+
+        Returns:
+            list: The pruned checkpoints.
+        """
+        checkpoints = self.checkpoints(device)
+        now = time.time() if now is None else now
+        kept, pruned = [], []
+        for position, checkpoint in enumerate(reversed(checkpoints)):
+            too_many = keep is not None and position >= keep
+            too_old = older_than is not None and now - checkpoint["timestamp"] > older_than
+            (pruned if too_many or too_old else kept).append(checkpoint)
+        kept.reverse()
+        pruned.reverse()
+        if pruned and not dry_run:
+            self._save(device, kept)
+        return pruned
@@ -0,0 +1,80 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Helpers for modules that act on a list of devices in a single invocation."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+try:
+    from pyntc import ntc_device, ntc_device_by_name
+
+    HAS_PYNTC = True
+except ImportError:
+    HAS_PYNTC = False
+
+
+def _device_errors():
+    """Exceptions raised when a device cannot be reached or refuses a session, for the installed drivers."""
+    errors = [OSError, EOFError]
+    for module_name, class_name in (
+        ("pyntc.errors", "NTCError"),
+        ("paramiko.ssh_exception", "SSHException"),
+        ("jnpr.junos.exception", "ConnectError"),
+    ):
+        try:
+            errors.append(getattr(__import__(module_name, fromlist=[class_name]), class_name))
+        except (ImportError, AttributeError):
+            pass
+    return tuple(errors)
+
+
+# Raised while a device reboots or is unreachable; anything else is a bug, not a device state.
+DEVICE_ERRORS = _device_errors()
+
+CONNECTION_KEYS = [
+    "platform",
+    "host",
+    "port",
+    "username",
+    "password",
+    "secret",
+    "transport",
+    "ntc_host",
+    "ntc_conf_file",
+]
+
+
+def device_params(entry, defaults):
+    """Merge the connection arguments of a device entry over the module level ``defaults``.
+
+    An entry only has to carry what differs per device, usually ``name`` and ``host``.
+    """
+    params = {key: defaults.get(key) for key in CONNECTION_KEYS}
+    for key, value in entry.items():
+        if value is not None:
+            params[key] = value
+    if not params.get("name"):
+        params["name"] = params.get("ntc_host") or params.get("host")
+    return params
+
+
+def device_from_params(params, **extra):
+    """Build a pyntc device from merged connection arguments."""
+    if params.get("ntc_host") is not None:
+        return ntc_device_by_name(params["ntc_host"], params.get("ntc_conf_file"))
+    kwargs = {key: params[key] for key in ("transport", "port", "secret") if params.get(key) is not None}
+    kwargs.update(extra)
+    return ntc_device(params["platform"], params["host"], params["username"], params["password"], **kwargs)
@@ -0,0 +1,87 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Progress state file for long running modules driven with async or split across tasks."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import os
+import time
+
+PHASE_DONE = "done"
+
+
+class ProgressFile:
+    """Phase, timestamps and final result of one module invocation, persisted as JSON.
+
+    ``identity`` holds the arguments that define the operation, for example host and image.
+    A state file written for a different identity is ignored, so reusing a path for another
+    operation starts from scratch instead of resuming the wrong one.
+    """
+
+    def __init__(self, path, identity):
+        """Load the state stored at ``path`` when it belongs to ``identity``."""
+        self.path = path
+        self.identity = identity
+        self.state = {}
+        if path and os.path.isfile(path):
+            with open(path, "r") as state_file:
+                state = json.load(state_file)
+            if state.get("identity") == identity:
+                self.state = state
+
+    @property
+    def phase(self):
+        """Last recorded phase, None when nothing was recorded yet."""
+        return self.state.get("phase")
+
+    @property
+    def result(self):
+        """Final module result once the operation completed, otherwise None."""
+        if self.phase == PHASE_DONE:
+            return self.state.get("result")
+        return None
+
+    def get(self, key, default=None):
+        """Value recorded with an earlier phase."""
+        return self.state.get(key, default)
+
+    def update(self, phase, **details):
+        """Record ``phase`` with extra ``details`` and write the file."""
+        self.state.update(details)
+        self.state["identity"] = self.identity
+        self.state["phase"] = phase
+        self.state["updated_at"] = time.time()
+        self._save()
+
+    def finish(self, result):
+        """Record the final module result."""
+        self.update(PHASE_DONE, result=result)
+
+    def reset(self):
+        """Forget the recorded progress, so the next run starts from scratch."""
+        self.state = {}
+        if self.path and os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = "{0}.tmp".format(self.path)
+        with open(tmp_path, "w") as state_file:
+            json.dump(self.state, state_file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,153 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Local syslog and SNMP trap receiver that reports when rebooting devices are ready."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import re
+import selectors
+import socket
+import threading
+
+# Messages logged once a platform has finished booting, keyed by pyntc platform.
+READY_PATTERNS = {
+    "arista_eos_eapi": r"%SYS-5-SYSTEM_RESTARTED",
+    "cisco_asa_ssh": r"%ASA-\d-199002",
+    "cisco_ios_ssh": r"%SYS-5-RESTART",
+    "cisco_nxos_nxapi": r"%VDC_MGR-2-VDC_ONLINE",
+    "juniper_junos_netconf": r"SNMPD_TRAP_COLD_START",
+}
+
+# BER encoded snmpTrapOID values of the coldStart and warmStart notifications (SNMPv2c).
+TRAP_OIDS = {
+    bytes(bytearray([0x2B, 0x06, 0x01, 0x06, 0x03, 0x01, 0x01, 0x05, 0x01])): "coldStart",
+    bytes(bytearray([0x2B, 0x06, 0x01, 0x06, 0x03, 0x01, 0x01, 0x05, 0x02])): "warmStart",
+}
+
+KIND_SYSLOG = "syslog"
+KIND_TRAP = "trap"
+
+
+class _Watch:
+    def __init__(self, pattern):
+        self.pattern = re.compile(pattern) if pattern else None
+        self.event = threading.Event()
+        self.message = None
+
+
+class ReadyListener:
+    """Receive syslog messages and SNMP traps on UDP and flag the devices that announced they are ready.
+
+    Devices are matched on the source address of the datagram. Syslog messages must match the
+    ready pattern of the device, while any coldStart or warmStart trap marks the device ready.
+    """
+
+    def __init__(self, bind="0.0.0.0", syslog_port=514, trap_port=None):  # nosec
+        """Prepare a listener; ports set to None are not opened and 0 picks a free port."""
+        self.bind = bind
+        self.syslog_port = syslog_port
+        self.trap_port = trap_port
+        self.addresses = {}
+        self._watches = {}
+        self._lock = threading.Lock()
+        self._selector = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def watch(self, host, platform=None, pattern=None):
+        """Start watching ``host``; ``pattern`` overrides the platform ready pattern.
+
+        Returns:
+            str: The address messages from ``host`` are expected to come from.
+        """
+        address = socket.gethostbyname(host)
+        with self._lock:
+            self._watches[address] = _Watch(pattern or READY_PATTERNS.get(platform))
+        return address
+
+    def start(self):
+        """Open the sockets and start receiving in a background thread."""
+        self._selector = selectors.DefaultSelector()
+        for kind, port in ((KIND_SYSLOG, self.syslog_port), (KIND_TRAP, self.trap_port)):
+            if port is None:
+                continue
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind((self.bind, port))
+            sock.setblocking(False)
+            self.addresses[kind] = sock.getsockname()
+            self._selector.register(sock, selectors.EVENT_READ, kind)
+        self._thread = threading.Thread(target=self._run, name="ready-listener", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the background thread and close the sockets."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._selector is not None:
+            for key in list(self._selector.get_map().values()):
+                self._selector.unregister(key.fileobj)
+                key.fileobj.close()
+            self._selector.close()
+
+    def __enter__(self):
+        """Start the listener."""
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        """Stop the listener."""
+        self.stop()
+
+    def ready(self, address):
+        """Whether ``address`` announced it is ready."""
+        return self._watches[address].event.is_set()
+
+    def message(self, address):
+        """The syslog message or trap name that marked ``address`` ready."""
+        return self._watches[address].message
+
+    def wait(self, address, timeout):
+        """Block until ``address`` is ready or ``timeout`` seconds elapsed, return whether it is ready."""
+        return self._watches[address].event.wait(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            for key, _ in self._selector.select(timeout=0.2):
+                try:
+                    data, source = key.fileobj.recvfrom(65535)
+                except OSError:
+                    continue
+                self.handle(key.data, source[0], data)
+
+    def handle(self, kind, address, data):
+        """Process one datagram of ``kind`` received from ``address``."""
+        with self._lock:
+            watch = self._watches.get(address)
+        if watch is None or watch.event.is_set():
+            return
+        if kind == KIND_TRAP:
+            for oid, name in TRAP_OIDS.items():
+                if oid in data:
+                    watch.message = name
+                    watch.event.set()
+                    return
+        elif watch.pattern is not None:
+            text = data.decode("utf-8", "replace")
+            if watch.pattern.search(text):
+                watch.message = text.strip()
+                watch.event.set()
@@ -0,0 +1,300 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Reboot many devices in waves and track their readiness from a single loop."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import errno
+import math
+import selectors
+import socket
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .wait import backoff
+
+STATE_SHUTDOWN = "shutdown"
+STATE_BOOT = "boot"
+STATE_UP = "up"
+
+SHUTDOWN_PROBE_INTERVAL = 1.0
+VERIFY_RETRY_DELAY = 5.0
+
+_IN_PROGRESS = (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN)
+
+
+class _Probe:
+    def __init__(self, name, address, port, wait_down, ready, now):
+        self.name = name
+        self.address = address
+        self.port = port
+        self.ready = ready
+        self.state = STATE_SHUTDOWN if wait_down else STATE_BOOT
+        self.added_at = now
+        self.next_probe = now
+        self.delays = backoff()
+        self.sock = None
+        self.started = None
+
+
+class ReadinessTracker:
+    """Probe the management port of many devices with non-blocking connects on one selector.
+
+    A device first has to stop answering (unless ``wait_down`` is false), then it is reported
+    once as soon as its port accepts connections again or its ``ready`` callable returns True.
+    """
+
+    def __init__(self, connect_timeout=2.0, shutdown_timeout=60, clock=time.monotonic):
+        """Create an empty tracker."""
+        self.connect_timeout = connect_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self._clock = clock
+        self._selector = selectors.DefaultSelector()
+        self._probes = {}
+        self._became_up = []
+
+    def add(self, name, host, port, wait_down=True, ready=None):
+        """Start tracking device ``name``.
+
+        Without a host or port only ``ready`` is consulted, and without either the device is reported up right away.
+        """
+        address = socket.gethostbyname(host) if host and port else None
+        self._probes[name] = _Probe(name, address, port, wait_down, ready, self._clock())
+
+    def remove(self, name):
+        """Stop tracking device ``name``."""
+        probe = self._probes.pop(name, None)
+        if probe is not None and probe.sock is not None:
+            self._close(probe)
+
+    def close(self):
+        """Stop tracking every device and release the selector."""
+        for name in list(self._probes):
+            self.remove(name)
+        self._selector.close()
+
+    def poll(self, timeout):
+        """Probe devices for up to ``timeout`` seconds and return the names that came up.
+
+        Returns as soon as at least one device came up.
+        """
+        end = self._clock() + timeout
+        while True:
+            now = self._clock()
+            for probe in list(self._probes.values()):
+                self._step(probe, now)
+            if self._became_up:
+                break
+            remaining = end - self._clock()
+            if remaining <= 0:
+                break
+            for key, _ in self._selector.select(timeout=min(remaining, 0.2)):
+                probe = key.data
+                error = probe.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                self._finish(probe, error == 0, self._clock())
+        became_up, self._became_up = self._became_up, []
+        return became_up
+
+    def _step(self, probe, now):
+        if probe.state == STATE_UP:
+            return
+        if probe.ready is not None and probe.ready():
+            self._mark_up(probe)
+            return
+        if probe.address is None:
+            if probe.ready is None:
+                self._mark_up(probe)
+            return
+        if probe.state == STATE_SHUTDOWN and now - probe.added_at >= self.shutdown_timeout:
+            # The port never closed; stop waiting for it and look for the device coming back instead.
+            probe.state = STATE_BOOT
+        if probe.sock is None and now >= probe.next_probe:
+            self._connect(probe, now)
+        elif probe.sock is not None and now - probe.started >= self.connect_timeout:
+            self._finish(probe, False, now)
+
+    def _connect(self, probe, now):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        error = sock.connect_ex((probe.address, int(probe.port)))
+        probe.sock = sock
+        probe.started = now
+        if error in _IN_PROGRESS:
+            self._selector.register(sock, selectors.EVENT_WRITE, probe)
+        else:
+            self._finish(probe, error == 0, now, registered=False)
+
+    def _close(self, probe, registered=True):
+        if registered:
+            try:
+                self._selector.unregister(probe.sock)
+            except (KeyError, ValueError):
+                pass
+        probe.sock.close()
+        probe.sock = None
+
+    def _finish(self, probe, is_open, now, registered=True):
+        self._close(probe, registered)
+        if probe.state == STATE_SHUTDOWN:
+            if not is_open:
+                probe.state = STATE_BOOT
+                probe.next_probe = now + next(probe.delays)
+            else:
+                probe.next_probe = now + SHUTDOWN_PROBE_INTERVAL
+        elif is_open:
+            self._mark_up(probe)
+        else:
+            probe.next_probe = now + next(probe.delays)
+
+    def _mark_up(self, probe):
+        probe.state = STATE_UP
+        if probe.sock is not None:
+            self._close(probe)
+        self._became_up.append(probe.name)
+
+
+def wave_device(name, host, port, ready=None):
+    """Device entry of ``run_waves`` for ``name``, tracked by ``ready`` alone when it is given.
+
+    The management port still answers right after the reboot command, so probing it alongside
+    a ``ready`` callable would report the device up before it went down.
+    """
+    if ready is not None:
+        return {"name": name, "ready": ready}
+    return {"name": name, "host": host, "port": port, "wait_down": True}
+
+
+def run_waves(  # pylint: disable=too-many-arguments,too-many-locals,too-many-branches,too-many-statements
+    devices, reboot, verify, tracker, wave_size, ready_fraction, timeout, workers=32, clock=time.monotonic
+):
+    """Reboot ``devices`` in waves, starting the next wave once enough of the current one is ready.
+
+    Args:
+        devices (list): Dicts with ``name`` and optionally ``host``, ``port``, ``wait_down`` and ``ready``
+            as accepted by ``ReadinessTracker.add``. A device tracked by ``ready`` alone is verified once
+            when its timeout expires, as a missed ready message would otherwise leave it unreachable.
+        reboot (callable): Sends the reboot to a device name, raising on failure.
+        verify (callable): Logs in to a device name and returns whether it worked.
+        tracker (ReadinessTracker): Tracker used for every device of every wave.
+        wave_size (int): Number of devices rebooted together.
+        ready_fraction (float): Share of a wave that must be verified before the next wave starts.
+        timeout (int): Seconds each device gets to come back after its reboot was sent.
+        workers (int): Threads used to send reboots and verify logins.
+        clock (callable): Monotonic clock, replaceable in tests.
+
+    Returns:
+        tuple: Per-device results, number of waves started and whether remaining waves were cancelled.
+    """
+    results = {device["name"]: {"rebooted": False, "reachable": False} for device in devices}
+    pending = deque(devices)
+    deadlines = {}
+    rebooted_at = {}
+    verifying = {}
+    retry_at = {}
+    # Devices without a port to probe, which get a single verify when their deadline expires.
+    last_chance = {device["name"] for device in devices if device.get("ready") is not None and not device.get("port")}
+    waves = 0
+    aborted = False
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+
+        def start_wave():
+            batch = [pending.popleft() for _ in range(min(wave_size, len(pending)))]
+            futures = {pool.submit(reboot, device["name"]): device for device in batch}
+            for future in as_completed(futures):
+                device = futures[future]
+                name = device["name"]
+                try:
+                    future.result()
+                except Exception as err:  # pylint: disable=broad-except
+                    results[name]["error"] = getattr(err, "message", str(err))
+                    continue
+                now = clock()
+                results[name]["rebooted"] = True
+                rebooted_at[name] = now
+                deadlines[name] = now + timeout
+                tracker.add(
+                    name,
+                    device.get("host"),
+                    device.get("port"),
+                    wait_down=device.get("wait_down", True),
+                    ready=device.get("ready"),
+                )
+            return [device["name"] for device in batch]
+
+        current = start_wave()
+        waves = 1
+        while True:
+            now = clock()
+            busy = set(verifying.values())
+            if current is not None:
+                ready = sum(1 for name in current if results[name]["reachable"])
+                possible = ready + sum(
+                    1
+                    for name in current
+                    if name in deadlines and (now < deadlines[name] or name in busy or name in last_chance)
+                )
+                needed = math.ceil(ready_fraction * len(current))
+                if ready >= needed:
+                    if pending:
+                        current = start_wave()
+                        waves += 1
+                        continue
+                    current = None
+                elif possible < needed:
+                    aborted = bool(pending)
+                    current = None
+
+            for name in list(deadlines):
+                if now >= deadlines[name] and name not in busy:
+                    tracker.remove(name)
+                    retry_at.pop(name, None)
+                    if name in last_chance:
+                        last_chance.discard(name)
+                        verifying[pool.submit(verify, name)] = name
+                        continue
+                    del deadlines[name]
+            if current is None and not deadlines:
+                break
+
+            for name in tracker.poll(0.5):
+                last_chance.discard(name)
+                retry_at[name] = clock()
+
+            now = clock()
+            for name, when in list(retry_at.items()):
+                if when <= now:
+                    del retry_at[name]
+                    verifying[pool.submit(verify, name)] = name
+
+            for future in [future for future in verifying if future.done()]:
+                name = verifying.pop(future)
+                try:
+                    verified = future.result()
+                except Exception:  # pylint: disable=broad-except
+                    verified = False
+                if verified:
+                    results[name]["reachable"] = True
+                    results[name]["downtime"] = round(clock() - rebooted_at[name], 3)
+                    tracker.remove(name)
+                    del deadlines[name]
+                elif name in deadlines:
+                    retry_at[name] = clock() + VERIFY_RETRY_DELAY
+
+    tracker.close()
+    return results, waves, aborted
@@ -0,0 +1,315 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Translate JSON schemas into specialized Python functions that tell whether data is valid."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+import re
+
+# Version of the generated code, part of the cache file names: bump it whenever the generator
+# emits different code or supports other keywords, so files cached by earlier versions are not reused.
+GENERATOR_VERSION = 1
+
+# Keywords without effect on validity.
+ANNOTATIONS = frozenset(["$comment", "$id", "$schema", "default", "description", "examples", "title"])
+
+SUPPORTED = ANNOTATIONS | frozenset(
+    [
+        "additionalProperties",
+        "const",
+        "enum",
+        "exclusiveMaximum",
+        "exclusiveMinimum",
+        "items",
+        "maxItems",
+        "maxLength",
+        "maxProperties",
+        "maximum",
+        "minItems",
+        "minLength",
+        "minProperties",
+        "minimum",
+        "pattern",
+        "properties",
+        "required",
+        "type",
+        "uniqueItems",
+    ]
+)
+
+# Drafts whose rules the generated code follows, as ``$schema`` without scheme nor empty fragment.
+DRAFTS = frozenset(
+    [
+        "json-schema.org/draft-06/schema",
+        "json-schema.org/draft-07/schema",
+        "json-schema.org/draft/2019-09/schema",
+        "json-schema.org/draft/2020-12/schema",
+    ]
+)
+
+TYPE_CHECKS = {
+    "array": "isinstance({0}, list)",
+    "boolean": "isinstance({0}, bool)",
+    "integer": "(isinstance({0}, int) and not isinstance({0}, bool)" " or isinstance({0}, float) and {0}.is_integer())",
+    "null": "{0} is None",
+    "number": "isinstance({0}, (int, float)) and not isinstance({0}, bool)",
+    "object": "isinstance({0}, dict)",
+    "string": "isinstance({0}, str)",
+}
+
+
+class UnsupportedSchema(Exception):
+    """The schema uses a keyword the generator does not translate."""
+
+
+def freeze(value):
+    """Hashable form of a JSON value that compares like JSON schema compares values.
+
+    Booleans differ from numbers, while ``1`` and ``1.0`` are equal.
+    """
+    if isinstance(value, bool):
+        return ("bool", value)
+    if isinstance(value, (int, float)):
+        return ("number", value)
+    if isinstance(value, dict):
+        return ("object", frozenset((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return ("array", tuple(freeze(item) for item in value))
+    return value
+
+
+def _draft(uri):
+    if not isinstance(uri, str):
+        return None
+    return re.sub(r"^https?://", "", uri).rstrip("#")
+
+
+class _Generator:
+    def __init__(self):
+        self.lines = []
+        self.constants = {}
+        self.functions = 0
+
+    def constant(self, value):
+        name = "_c{0}".format(len(self.constants))
+        self.constants[name] = value
+        return name
+
+    def function(self, schema):
+        """Emit a function validating ``schema`` and return its name."""
+        if schema is True or schema == {}:
+            return "_true"
+        if schema is False:
+            return "_false"
+        if not isinstance(schema, dict):
+            raise UnsupportedSchema("schema {0!r}".format(schema))
+        unsupported = sorted(set(schema) - SUPPORTED)
+        if unsupported:
+            raise UnsupportedSchema("keywords {0}".format(", ".join(unsupported)))
+        if "$schema" in schema and _draft(schema["$schema"]) not in DRAFTS:
+            raise UnsupportedSchema("$schema {0!r}".format(schema["$schema"]))
+        if not isinstance(schema.get("required", []), list):
+            raise UnsupportedSchema("required {0!r}".format(schema["required"]))
+
+        name = "_v{0}".format(self.functions)
+        self.functions += 1
+        body = []
+        self._type(schema, body)
+        self._enum(schema, body)
+        self._number(schema, body)
+        self._string(schema, body)
+        self._array(schema, body)
+        self._object(schema, body)
+        self.lines.append("def {0}(data):".format(name))
+        self.lines.extend("    " + line for line in body)
+        self.lines.append("    return True")
+        self.lines.append("")
+        return name
+
+    def _type(self, schema, body):
+        if "type" not in schema:
+            return
+        types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        if any(kind not in TYPE_CHECKS for kind in types):
+            raise UnsupportedSchema("type {0!r}".format(schema["type"]))
+        checks = " or ".join("({0})".format(TYPE_CHECKS[kind].format("data")) for kind in types)
+        body.append("if not ({0}):".format(checks))
+        body.append("    return False")
+
+    def _enum(self, schema, body):
+        if "enum" in schema:
+            values = self.constant(frozenset(freeze(value) for value in schema["enum"]))
+            body.append("if _freeze(data) not in {0}:".format(values))
+            body.append("    return False")
+        if "const" in schema:
+            value = self.constant(freeze(schema["const"]))
+            body.append("if _freeze(data) != {0}:".format(value))
+            body.append("    return False")
+
+    def _number(self, schema, body):
+        checks = []
+        for keyword, operator in (
+            ("minimum", "<"),
+            ("maximum", ">"),
+            ("exclusiveMinimum", "<="),
+            ("exclusiveMaximum", ">="),
+        ):
+            if keyword in schema:
+                limit = schema[keyword]
+                if isinstance(limit, bool) or not isinstance(limit, (int, float)):
+                    raise UnsupportedSchema("{0} {1!r}".format(keyword, limit))
+                checks.append("data {0} {1!r}".format(operator, limit))
+        if checks:
+            body.append("if isinstance(data, (int, float)) and not isinstance(data, bool):")
+            body.append("    if {0}:".format(" or ".join(checks)))
+            body.append("        return False")
+
+    def _string(self, schema, body):
+        checks = []
+        if "minLength" in schema:
+            checks.append("len(data) < {0!r}".format(schema["minLength"]))
+        if "maxLength" in schema:
+            checks.append("len(data) > {0!r}".format(schema["maxLength"]))
+        if "pattern" in schema:
+            pattern = self.constant(re.compile(schema["pattern"]))
+            checks.append("{0}.search(data) is None".format(pattern))
+        if checks:
+            body.append("if isinstance(data, str):")
+            body.append("    if {0}:".format(" or ".join(checks)))
+            body.append("        return False")
+
+    def _array(self, schema, body):
+        checks = []
+        if "minItems" in schema:
+            checks.append("len(data) < {0!r}".format(schema["minItems"]))
+        if "maxItems" in schema:
+            checks.append("len(data) > {0!r}".format(schema["maxItems"]))
+        if schema.get("uniqueItems"):
+            checks.append("len(set(_freeze(item) for item in data)) != len(data)")
+        items = schema.get("items")
+        if isinstance(items, list):
+            raise UnsupportedSchema("items as a list")
+        item_function = None if items is None or items is True or items == {} else self.function(items)
+        if not checks and item_function is None:
+            return
+        body.append("if isinstance(data, list):")
+        if checks:
+            body.append("    if {0}:".format(" or ".join(checks)))
+            body.append("        return False")
+        if item_function is not None:
+            body.append("    for item in data:")
+            body.append("        if not {0}(item):".format(item_function))
+            body.append("            return False")
+
+    def _object(self, schema, body):
+        properties = schema.get("properties", {})
+        additional = schema.get("additionalProperties", True)
+        lines = []
+        if "minProperties" in schema:
+            lines.append("if len(data) < {0!r}:".format(schema["minProperties"]))
+            lines.append("    return False")
+        if "maxProperties" in schema:
+            lines.append("if len(data) > {0!r}:".format(schema["maxProperties"]))
+            lines.append("    return False")
+        for key in schema.get("required", []):
+            lines.append("if {0!r} not in data:".format(key))
+            lines.append("    return False")
+        for key, subschema in sorted(properties.items()):
+            function = self.function(subschema)
+            if function == "_true":
+                continue
+            lines.append("if {0!r} in data and not {1}(data[{0!r}]):".format(key, function))
+            lines.append("    return False")
+        if additional is not True and additional != {}:
+            function = self.function(additional)
+            known = self.constant(frozenset(properties))
+            lines.append("for key, value in data.items():")
+            lines.append("    if key not in {0} and not {1}(value):".format(known, function))
+            lines.append("        return False")
+        if lines:
+            body.append("if isinstance(data, dict):")
+            body.extend("    " + line for line in lines)
+
+
+def generate(schema):
+    """Python source of a module defining ``validate(data)`` for ``schema``.
+
+    Raises:
+        UnsupportedSchema: When the schema uses keywords that are not translated, such as ``$ref``,
+            combinators or ``format``, or a ``$schema`` older than draft 6; callers fall back to jsonschema then.
+    """
+    generator = _Generator()
+    root = generator.function(schema)
+    header = ["import re", "", "", "def _true(data):", "    return True", "", "", "def _false(data):"]
+    header += ["    return False", ""]
+    for name, value in sorted(generator.constants.items()):
+        if hasattr(value, "pattern"):
+            header.append("{0} = re.compile({1!r})".format(name, value.pattern))
+        else:
+            header.append("{0} = {1!r}".format(name, value))
+    header.append("")
+    return "\n".join(header + generator.lines + ["validate = {0}".format(root), ""])
+
+
+def load(source, filename="<generated schema>"):
+    """Compile generated ``source`` and return its ``validate`` function."""
+    namespace = {"_freeze": freeze}
+    exec(compile(source, filename, "exec"), namespace)  # nosec  # pylint: disable=exec-used
+    return namespace["validate"]
+
+
+class CompiledSchemas:
+    """Generated validate functions keyed by schema hash, optionally cached as source files in ``cache_dir``.
+
+    ``get`` returns None for schemas that cannot be translated.
+    """
+
+    def __init__(self, cache_dir=None):
+        """Create an empty cache, optionally backed by ``cache_dir``."""
+        self.cache_dir = cache_dir
+        self._functions = {}
+
+    def _path(self, digest, suffix):
+        return os.path.join(self.cache_dir, "{0}.v{1}.{2}".format(digest, GENERATOR_VERSION, suffix))
+
+    def get(self, schema, digest):
+        """Validate function for ``schema`` whose hash is ``digest``, or None."""
+        if digest in self._functions:
+            return self._functions[digest]
+        function = None
+        if self.cache_dir and os.path.exists(self._path(digest, "py")):
+            path = self._path(digest, "py")
+            with open(path, "r") as source_file:
+                function = load(source_file.read(), path)
+        elif not (self.cache_dir and os.path.exists(self._path(digest, "unsupported"))):
+            try:
+                source = generate(schema)
+            except UnsupportedSchema as err:
+                if self.cache_dir:
+                    with open(self._path(digest, "unsupported"), "w") as marker:
+                        marker.write(str(err))
+            else:
+                path = self._path(digest, "py") if self.cache_dir else "<schema {0}>".format(digest[:12])
+                function = load(source, path)
+                if self.cache_dir:
+                    tmp_path = "{0}.{1}.tmp".format(path, os.getpid())
+                    with open(tmp_path, "w") as source_file:
+                        source_file.write(source)
+                    os.replace(tmp_path, path)
+        self._functions[digest] = function
+        return function
@@ -0,0 +1,137 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Local directory of JSON schemas resolving ``$ref`` without network access."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import hashlib
+import json
+import os
+
+try:
+    import yaml
+
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+try:
+    from referencing import Registry, Resource
+    from referencing.exceptions import Unresolvable
+    from referencing.jsonschema import DRAFT202012
+
+    HAS_REFERENCING = True
+except ImportError:
+    HAS_REFERENCING = False
+    try:
+        from jsonschema import RefResolutionError as Unresolvable
+        from jsonschema import RefResolver
+    except ImportError:
+
+        class Unresolvable(Exception):
+            """Stand-in when jsonschema is not installed."""
+
+
+JSON_EXTENSIONS = (".json",)
+YAML_EXTENSIONS = (".yml", ".yaml")
+
+
+def _no_remote(uri):
+    raise Unresolvable("Remote reference {0} is not in the schema directory".format(uri))
+
+
+class SchemaRegistry:
+    """Every schema file under ``path``, by path relative to it and by ``$id``.
+
+    A ``$ref`` such as ``common/vlan.json#/definitions/id`` is resolved against these files
+    only; references to anything else fail instead of being fetched.
+    """
+
+    def __init__(self, path):
+        """Load every JSON and YAML schema under ``path``."""
+        self.path = path
+        self.schemas = {}
+        self.features = {}
+        for relpath in sorted(schema_files(path)):
+            contents = _load(os.path.join(path, relpath))
+            uri = relpath.replace(os.sep, "/")
+            self.schemas[uri] = contents
+            if isinstance(contents, dict) and isinstance(contents.get("$id"), str):
+                self.schemas.setdefault(contents["$id"], contents)
+            if os.sep not in relpath:
+                self.features.setdefault(os.path.splitext(relpath)[0], uri)
+        text = json.dumps(self.schemas, sort_keys=True, default=str)
+        self.digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if HAS_REFERENCING:
+            resources = [
+                (uri, Resource.from_contents(contents, default_specification=DRAFT202012))
+                for uri, contents in self.schemas.items()
+            ]
+            self._registry = Registry(retrieve=_no_remote).with_resources(resources).crawl()
+
+    def complete(self, schema, scope):
+        """``schema`` with a ``$ref`` to ``<feature>.json`` (or ``.yml``) for each scoped feature it lacks."""
+        schema = dict(schema or {})
+        for item in scope:
+            feature = item.get("name") if isinstance(item, dict) else None
+            if feature is not None and feature not in schema and feature in self.features:
+                schema[feature] = {"$ref": self.features[feature]}
+        return schema
+
+    def validator_kwargs(self, schema):
+        """Keyword arguments making a jsonschema validator of ``schema`` resolve references here."""
+        if HAS_REFERENCING:
+            return dict(registry=self._registry)
+        handlers = dict(http=_no_remote, https=_no_remote)
+        return dict(resolver=RefResolver("", schema, store=dict(self.schemas), handlers=handlers))
+
+
+def schema_files(path):
+    """Paths, relative to ``path``, of the schema files under it."""
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            if name.endswith(JSON_EXTENSIONS) or name.endswith(YAML_EXTENSIONS) and HAS_YAML:
+                yield os.path.relpath(os.path.join(root, name), path)
+
+
+def _load(path):
+    with open(path, "r") as handle:
+        if path.endswith(YAML_EXTENSIONS):
+            return yaml.safe_load(handle)
+        return json.load(handle)
+
+
+def _signature(path):
+    files = []
+    for relpath in sorted(schema_files(path)):
+        stat = os.stat(os.path.join(path, relpath))
+        files.append((relpath, stat.st_mtime, stat.st_size))
+    return tuple(files)
+
+
+# Registries of this process, with the signature of the files they were loaded from, by path.
+_REGISTRIES = {}
+
+
+def load_registry(path):
+    """Registry of ``path``, loaded again only when its files changed."""
+    path = os.path.abspath(path)
+    signature = _signature(path)
+    cached = _REGISTRIES.get(path)
+    if cached is None or cached[0] != signature:
+        cached = _REGISTRIES[path] = (signature, SchemaRegistry(path))
+    return cached[1]
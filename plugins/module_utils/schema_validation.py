@@ -0,0 +1,556 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""JSON schema validators compiled once per distinct schema and reused."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .backup_store import write_atomic
+from .schema_codegen import CompiledSchemas
+from .schema_registry import Unresolvable, load_registry
+
+try:
+    from jsonschema import FormatChecker, SchemaError, ValidationError
+    from jsonschema.validators import validator_for
+
+    HAS_JSONSCHEMA = True
+except ImportError:
+    HAS_JSONSCHEMA = False
+
+
+def canonical_json(value):
+    """JSON text of ``value`` that is identical for equal values, whatever the key order."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def schema_hash(schema):
+    """SHA-256 of the canonical JSON of ``schema``."""
+    return hashlib.sha256(canonical_json(schema).encode("utf-8")).hexdigest()
+
+
+class ValidatorCache:
+    """Validators keyed by schema hash, so each distinct schema is checked and compiled once.
+
+    With ``cache_dir``, schemas that passed the metaschema check are remembered on disk and
+    are not checked again by later runs.
+
+    With the ``codegen`` engine, schemas are also translated into Python code (cached in
+    ``cache_dir`` as well) that quickly accepts valid data; jsonschema then only runs to report
+    the errors of invalid data, and for schemas using keywords the generator does not translate.
+
+    With a ``registry`` (a ``SchemaRegistry``), ``$ref`` is resolved against its schema files.
+    """
+
+    def __init__(self, cache_dir=None, engine="jsonschema", registry=None):
+        """Create an empty cache, optionally backed by ``cache_dir``."""
+        self.cache_dir = cache_dir
+        self.registry = registry
+        self._validators = {}
+        self.compiled = CompiledSchemas(cache_dir) if engine == "codegen" else None
+        if cache_dir and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _checked_path(self, digest):
+        return os.path.join(self.cache_dir, "{0}.checked".format(digest))
+
+    def _validator(self, schema, digest):
+        validator = self._validators.get(digest)
+        if validator is None:
+            cls = validator_for(schema)
+            if not (self.cache_dir and os.path.exists(self._checked_path(digest))):
+                cls.check_schema(schema)
+                if self.cache_dir:
+                    with open(self._checked_path(digest), "w"):
+                        pass
+            kwargs = self.registry.validator_kwargs(schema) if self.registry is not None else {}
+            validator = cls(schema, format_checker=FormatChecker(), **kwargs)
+            self._validators[digest] = validator
+        return validator
+
+    def validator(self, schema):
+        """Validator for ``schema``, raising ``SchemaError`` when the schema itself is invalid."""
+        return self._validator(schema, schema_hash(schema))
+
+    def accepts(self, schema, data):
+        """Whether the generated code of ``schema`` accepts ``data``.
+
+        False means unknown: the data is invalid, or there is no generated code for the schema
+        (``jsonschema`` engine or untranslated keywords). Raises ``SchemaError`` like ``validator``.
+        """
+        function = self.generated(schema)
+        return function is not None and function(data)
+
+    def generated(self, schema):
+        """Generated validate function of ``schema``, or None without one. Raises ``SchemaError``."""
+        if self.compiled is None:
+            return None
+        digest = schema_hash(schema)
+        self._validator(schema, digest)
+        return self.compiled.get(schema, digest)
+
+    def __len__(self):
+        """Number of compiled validators."""
+        return len(self._validators)
+
+
+# Shared by every validation in this process.
+VALIDATORS = ValidatorCache()
+
+
+def validate_schema(schema, data, cache=None):
+    """Validate ``data`` against ``schema`` and return the status with the first error message."""
+    cache = VALIDATORS if cache is None else cache
+    try:
+        if cache.accepts(schema, data):
+            return True, ""
+        cache.validator(schema).validate(data)
+    except ValidationError as err:
+        return False, "ValidationError: {0}".format(err.message)
+    except SchemaError as err:
+        return False, "SchemaError: {0}".format(err.message)
+    except Unresolvable as err:
+        return False, "RefResolutionError: {0}".format(err)
+    except Exception as err:  # pylint: disable=broad-except
+        return False, "UnknownError: {0}".format(err)
+    return True, ""
+
+
+def json_path(feature, path):
+    """JSON path such as ``$.interfaces[2].mtu`` of ``path`` (a sequence of keys) inside ``feature``."""
+    parts = ["$"]
+    for key in [feature] + list(path):
+        if isinstance(key, int):
+            parts.append("[{0}]".format(key))
+        elif key.isidentifier():
+            parts.append(".{0}".format(key))
+        else:
+            parts.append("[{0}]".format(json.dumps(key)))
+    return "".join(parts)
+
+
+def _errors(feature, validator, data, path=()):
+    return [
+        dict(
+            feature=feature,
+            path=json_path(feature, list(path) + list(err.absolute_path)),
+            message=err.message,
+            validator=err.validator,
+        )
+        for err in validator.iter_errors(data)
+    ]
+
+
+def feature_errors(feature, entry_schema, entry_data, required=False, cache=None):
+    """Every violation of one scoped feature, as dicts with ``feature``, ``path`` and ``message``."""
+    root = json_path(feature, [])
+    if entry_data is None:
+        if required:
+            return [dict(feature=feature, path=root, message="Feature {0} required, but not found".format(feature))]
+        return []
+    if entry_schema is None:
+        message = "Schema was not defined for feature {0}. Schema key must match data key".format(feature)
+        return [dict(feature=feature, path=root, message=message)]
+
+    cache = VALIDATORS if cache is None else cache
+    try:
+        if cache.accepts(entry_schema, entry_data):
+            return []
+        validator = cache.validator(entry_schema)
+    except SchemaError as err:
+        return [dict(feature=feature, path=root, message="SchemaError: {0}".format(err.message))]
+    try:
+        return _errors(feature, validator, entry_data)
+    except Unresolvable as err:
+        return [dict(feature=feature, path=root, message="RefResolutionError: {0}".format(err))]
+
+
+NUMBER = (int, float)
+DELIMITERS = frozenset([",", "]", " ", "\t", "\r", "\n"])
+
+
+def iter_items(handle, chunk_size=1 << 16):
+    """Yield the elements of a JSON array, or of JSON lines, read incrementally from ``handle``.
+
+    A file whose first character is ``[`` holds a JSON array; anything else is one JSON value
+    per line. Only the element being decoded is kept in memory.
+
+    Raises:
+        ValueError: When the content is not valid JSON.
+    """
+    buf = handle.read(chunk_size).lstrip()
+    if not buf.startswith("["):
+        if buf:
+            lines = itertools.chain((buf + handle.readline()).splitlines(), handle)
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    decoder = json.JSONDecoder()
+    pos = 1
+    eof = False
+    expecting = "first"
+    while True:
+        while pos == len(buf) or buf[pos].isspace():
+            if pos == len(buf):
+                if eof:
+                    raise ValueError("Unterminated JSON array")
+                buf, pos, eof = _refill(handle, buf, pos, chunk_size)
+            else:
+                pos += 1
+        if expecting != "value" and buf[pos] == "]":
+            return
+        if expecting == "delimiter":
+            if buf[pos] != ",":
+                raise ValueError("Expecting ',' delimiter in JSON array")
+            pos += 1
+            expecting = "value"
+            continue
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                end = None
+            # A number may continue in the next chunk unless a delimiter follows it.
+            if end is not None and (eof or end < len(buf) and (not isinstance(item, NUMBER) or buf[end] in DELIMITERS)):
+                break
+            buf, pos, eof = _refill(handle, buf, pos, chunk_size)
+        yield item
+        pos = end
+        expecting = "delimiter"
+
+
+def _refill(handle, buf, pos, chunk_size):
+    # Reading at least as much as is buffered keeps decoding large elements linear.
+    more = handle.read(max(chunk_size, len(buf) - pos))
+    return buf[pos:] + more, 0, not more
+
+
+# Keywords of a feature schema that ``stream_errors`` enforces, or that do not constrain the array.
+STREAMED_KEYWORDS = frozenset(
+    [
+        "$schema",
+        "$id",
+        "id",
+        "$comment",
+        "definitions",
+        "$defs",
+        "title",
+        "description",
+        "default",
+        "examples",
+        "type",
+        "items",
+        "minItems",
+        "maxItems",
+        "uniqueItems",
+        "contains",
+    ]
+)
+
+
+def unstreamed_keywords(feature_schema):
+    """Keywords of ``feature_schema`` that ``stream_errors`` cannot enforce, sorted."""
+    unstreamed = set(feature_schema) - STREAMED_KEYWORDS
+    if not isinstance(feature_schema.get("items"), (dict, bool)):
+        unstreamed.add("items")
+    return sorted(unstreamed)
+
+
+def _normalized(value):
+    # Equal numbers such as 1 and 1.0 are the same item for uniqueItems, while True and 1 are not.
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {key: _normalized(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalized(item) for item in value]
+    return value
+
+
+def _unique_key(value):
+    return hashlib.sha256(canonical_json(_normalized(value)).encode("utf-8")).digest()
+
+
+def stream_errors(feature, feature_schema, items, cache=None):  # pylint: disable=too-many-locals,too-many-branches
+    """Violations of ``items``, the elements of ``feature``, against ``feature_schema``, element after element.
+
+    Each element is validated against the ``items`` schema in the scope of the whole feature
+    schema, so local ``$ref`` resolve. Of the array keywords, ``minItems``, ``maxItems``,
+    ``uniqueItems`` (which keeps a digest of every element) and ``contains`` are enforced; callers
+    reject the others with ``unstreamed_keywords``.
+
+    Yields:
+        tuple: The number of elements checked so far and the list of violations of the last one,
+        then once more the count with the violations of the array as a whole.
+    """
+    cache = VALIDATORS if cache is None else cache
+    root = json_path(feature, [])
+    item_schema = feature_schema.get("items", True)
+    try:
+        validator = cache.validator(feature_schema)
+        generated = cache.generated(item_schema) if isinstance(item_schema, dict) else None
+    except SchemaError as err:
+        yield 0, [dict(feature=feature, path=root, message="SchemaError: {0}".format(err.message))]
+        return
+    max_items = feature_schema.get("maxItems")
+    seen = {} if feature_schema.get("uniqueItems") else None
+    contains = feature_schema.get("contains")
+    count = 0
+    for index, item in enumerate(items):
+        count = index + 1
+        errors = []
+        if max_items is not None and count == max_items + 1:
+            message = "Expected at most {0} items".format(max_items)
+            errors.append(dict(feature=feature, path=root, message=message, validator="maxItems"))
+        try:
+            if contains is not None and next(validator.descend(item, contains), None) is None:
+                contains = None
+            if seen is not None:
+                first = seen.setdefault(_unique_key(item), index)
+                if first != index:
+                    message = "Item {0} is not unique, it equals item {1}".format(index, first)
+                    path = json_path(feature, [index])
+                    errors.append(dict(feature=feature, path=path, message=message, validator="uniqueItems"))
+            if generated is None or not generated(item):
+                errors.extend(
+                    dict(
+                        feature=feature,
+                        path=json_path(feature, list(err.absolute_path)),
+                        message=err.message,
+                        validator=err.validator,
+                    )
+                    for err in validator.descend(item, item_schema, path=index)
+                )
+        except Unresolvable as err:
+            yield count, [dict(feature=feature, path=root, message="RefResolutionError: {0}".format(err))]
+            return
+        yield count, errors
+
+    errors = []
+    min_items = feature_schema.get("minItems")
+    if min_items is not None and count < min_items:
+        message = "Expected at least {0} items, found {1}".format(min_items, count)
+        errors.append(dict(feature=feature, path=root, message=message, validator="minItems"))
+    if contains is not None:
+        message = "None of the {0} items is valid under the contains schema".format(count)
+        errors.append(dict(feature=feature, path=root, message=message, validator="contains"))
+    yield count, errors
+
+
+MALFORMED_SCOPE = 'Malformed list item {0}, should be in format similar to {{"name": "feature", "required": True}}'
+
+
+def malformed_scope_item(scope):
+    """First item of ``scope`` without a ``name`` key, or None when every item is well formed."""
+    for item in scope:
+        if not isinstance(item, dict) or "name" not in item:
+            return item
+    return None
+
+
+def host_errors(schema, scope, data, cache=None, skip=()):
+    """Every violation of the features in ``scope``, except those in ``skip``, for the data of one host."""
+    errors = []
+    for item in scope:
+        feature = item["name"]
+        if feature in skip:
+            continue
+        errors.extend(feature_errors(feature, schema.get(feature), data.get(feature), item.get("required"), cache))
+    return errors
+
+
+# Validator caches of this process, by cache_dir, engine and schema registry.
+_WORKER_CACHES = {}
+
+
+def shared_cache(cache_dir=None, engine="jsonschema", schema_dir=None):
+    """Validator cache of this process for ``cache_dir``, ``engine`` and ``schema_dir``, created on first use."""
+    if not cache_dir and engine == "jsonschema" and not schema_dir:
+        return VALIDATORS
+    registry = load_registry(schema_dir) if schema_dir else None
+    cache = _WORKER_CACHES.get((cache_dir, engine, registry))
+    if cache is None:
+        cache = _WORKER_CACHES[(cache_dir, engine, registry)] = ValidatorCache(cache_dir, engine, registry)
+    return cache
+
+
+def _validate_chunk(args):
+    schema, scope, cache_dir, engine, schema_dir, chunk = args
+    cache = shared_cache(cache_dir, engine, schema_dir)
+    return [(host, host_errors(schema, scope, data, cache, skip)) for host, data, skip in chunk]
+
+
+def _fork_context():
+    # Workers must inherit the already imported modules: under Ansible they live in a zip the
+    # spawn and forkserver start methods could not import from.
+    try:
+        return multiprocessing.get_context("fork")
+    except ValueError:
+        return None
+
+
+def validate_hosts(
+    schema,
+    scope,
+    hosts,
+    workers=None,
+    cache_dir=None,
+    chunk_size=50,
+    engine="jsonschema",
+    result_cache=None,
+    schema_dir=None,
+):  # pylint: disable=too-many-arguments
+    """Validate the data of many hosts, spread over a pool of ``workers`` processes.
+
+    Hosts are sent to the workers in chunks of ``chunk_size``, and every worker compiles each
+    schema once for all the hosts it validates. Features ``result_cache`` knows as valid are
+    skipped, and the features found valid are added to it.
+
+    Returns:
+        dict: Every violation found, as returned by ``host_errors``, keyed by host.
+    """
+    keys = {}
+    items = []
+    digests = result_cache.digests(schema, scope) if result_cache is not None else {}
+    for host, data in hosts.items():
+        skip = set()
+        if result_cache is not None:
+            for feature, key in result_cache.feature_keys(digests, data).items():
+                if result_cache.validated(key):
+                    skip.add(feature)
+                else:
+                    keys[(host, feature)] = key
+        items.append((host, data, skip))
+    results = _run_chunks(schema, scope, items, workers, chunk_size, (cache_dir, engine, schema_dir))
+    if result_cache is not None:
+        for (host, feature), key in keys.items():
+            if not any(error["feature"] == feature for error in results[host]):
+                result_cache.add(key)
+    return results
+
+
+def _run_chunks(schema, scope, items, workers, chunk_size, cache_args):  # pylint: disable=too-many-arguments
+    chunks = []
+    for start in range(0, len(items), chunk_size):
+        end = start + chunk_size
+        chunks.append((schema, scope) + cache_args + (items[start:end],))
+    context = _fork_context()
+    results = {}
+    if workers == 1 or context is None or len(chunks) <= 1:
+        for chunk in chunks:
+            results.update(_validate_chunk(chunk))
+        return results
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        for chunk_results in pool.map(_validate_chunk, chunks):
+            results.update(chunk_results)
+    return results
+
+
+class ResultCache:
+    """Features already found valid, keyed by the hashes of their schema and data, in a local JSON file.
+
+    Entries not used for ``max_age`` seconds are dropped when the file is saved. ``salt`` is a hash
+    of anything else the schemas depend on, such as the files of the schema registry.
+    """
+
+    def __init__(self, path, max_age=30 * 86400, clock=time.time, salt=""):
+        """Load the results recorded in ``path``, if any."""
+        self.path = path
+        self.salt = salt
+        self.max_age = max_age
+        self.clock = clock
+        self.hits = 0
+        self._entries = self._load()
+        self._used = {}
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as handle:
+                return json.load(handle)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def key(digest, feature, data):
+        """Key of ``data`` for ``feature``, validated against the schema whose hash is ``digest``."""
+        text = "\0".join([digest, feature, canonical_json(data)])
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def schema_digest(self, entry_schema):
+        """Hash of ``entry_schema`` and ``salt``."""
+        return schema_hash([entry_schema, self.salt]) if self.salt else schema_hash(entry_schema)
+
+    def digests(self, schema, scope):
+        """Hash of the schema of each feature in ``scope`` that has one."""
+        features = (item["name"] for item in scope)
+        return {feature: self.schema_digest(schema[feature]) for feature in features if schema.get(feature) is not None}
+
+    def feature_keys(self, digests, data):
+        """Keys of the features of ``digests``, as returned by ``digests``, that have data."""
+        return {
+            feature: self.key(digest, feature, data[feature])
+            for feature, digest in digests.items()
+            if data.get(feature) is not None
+        }
+
+    def validated(self, key):
+        """Whether ``key`` was found valid before."""
+        if key in self._entries or key in self._used:
+            self.hits += 1
+            self._used[key] = self.clock()
+            return True
+        return False
+
+    def add(self, key):
+        """Record ``key`` as valid."""
+        self._used[key] = self.clock()
+
+    def save(self):
+        """Write the results to disk, merged with those saved meanwhile by other runs."""
+        now = self.clock()
+        entries = self._load()
+        entries.update(self._used)
+        entries = {key: used for key, used in entries.items() if now - used <= self.max_age}
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        write_atomic(self.path, json.dumps(entries, sort_keys=True).encode("utf-8"))
+        self._entries = entries
+
+
+def summarize_hosts(results, errors_file=None):
+    """Compact pass/fail summary of ``validate_hosts`` results; every violation goes to ``errors_file``.
+
+    The errors file holds one JSON object per line: the violation with its ``host``.
+    """
+    if errors_file:
+        with open(errors_file, "w") as handle:
+            for host in sorted(results):
+                for error in results[host]:
+                    handle.write(canonical_json(dict(error, host=host)) + "\n")
+    failed = {host: len(errors) for host, errors in results.items() if errors}
+    return dict(hosts=len(results), passed=len(results) - len(failed), failed_hosts=failed)
@@ -0,0 +1,174 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Named snapshots of show command output stored on local disk by device, command and label."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import time
+
+from .backup_store import write_atomic
+
+SUFFIX = ".jsonl.gz"
+HASHES_SUFFIX = ".hashes.json.gz"
+
+# First segment of a jmespath that is a plain top-level key, such as ``interfaces`` in ``interfaces.*.status``.
+TOP_KEY = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*)(?=[.\[|]|$)")
+
+
+def command_slug(command):
+    """Directory name of ``command``: readable, and distinct for distinct commands."""
+    words = re.sub(r"[^A-Za-z0-9]+", "_", command).strip("_")[:60]
+    return "{0}-{1}".format(words, hashlib.sha256(command.encode("utf-8")).hexdigest()[:8])
+
+
+def file_digest(path):
+    """SHA-256 hex digest of the file at ``path``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def top_keys(paths):
+    """Top-level keys selected by every jmespath of ``paths``, or None when one may select any key."""
+    keys = set()
+    for path in paths:
+        match = TOP_KEY.match(path or "*")
+        if match is None:
+            return None
+        keys.add(match.group(1))
+    return keys
+
+
+class SnapshotStore:
+    """Snapshots under ``root``, as ``<device>/<command slug>/<label>.jsonl.gz``.
+
+    A snapshot file starts with a JSON header line (device, command, label, timestamp). For a
+    dict output, each following line holds one top-level key, as its JSON key and JSON value
+    separated by a tab, so a reader can decode only the keys it needs. Other outputs are
+    stored whole on a single line with a ``null`` key.
+    """
+
+    def __init__(self, root):
+        """Open the store under ``root``."""
+        self.root = root
+
+    def path(self, device, command, label):
+        """Path of the snapshot of ``command`` on ``device`` labelled ``label``."""
+        for name in (device, label):
+            if not name or "/" in name or os.sep in name or name.startswith("."):
+                raise ValueError("Invalid snapshot device or label: {0!r}".format(name))
+        return os.path.join(self.root, device, command_slug(command), label + SUFFIX)
+
+    def save(self, device, command, label, output, timestamp=None):
+        """Store ``output`` as the ``label`` snapshot of ``command`` on ``device``, replacing any previous one."""
+        header = dict(device=device, command=command, label=label, timestamp=timestamp or time.time())
+        lines = [json.dumps(header)]
+        if isinstance(output, dict):
+            for key, value in output.items():
+                lines.append("{0}\t{1}".format(json.dumps(key), json.dumps(value)))
+        else:
+            lines.append("null\t{0}".format(json.dumps(output)))
+        buf = io.BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode="wb", mtime=0) as gz_file:
+            gz_file.write(("\n".join(lines) + "\n").encode("utf-8"))
+        path = self.path(device, command, label)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        hashes_path = self._hashes_path(path)
+        if os.path.exists(hashes_path):
+            os.remove(hashes_path)
+        write_atomic(path, buf.getvalue())
+        return path
+
+    def load_hashes(self, device, command, label):
+        """Hashes saved with a snapshot by ``save_hashes``, or an empty dict.
+
+        Hashes saved for another content of the snapshot, such as one replaced by a concurrent save, are ignored.
+        """
+        path = self.path(device, command, label)
+        hashes_path = self._hashes_path(path)
+        if not os.path.exists(hashes_path):
+            return {}
+        try:
+            with gzip.open(hashes_path, "rb") as handle:
+                saved = json.loads(handle.read().decode("utf-8"))
+            if not isinstance(saved, dict) or saved.get("snapshot") != file_digest(path):
+                return {}
+        except (IOError, OSError, ValueError):
+            return {}
+        hashes = saved.get("hashes")
+        return hashes if isinstance(hashes, dict) else {}
+
+    def save_hashes(self, device, command, label, hashes):
+        """Keep the JSON serializable ``hashes`` of a snapshot's data with it, until the snapshot is saved again."""
+        path = self.path(device, command, label)
+        buf = io.BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode="wb", mtime=0) as gz_file:
+            gz_file.write(json.dumps({"snapshot": file_digest(path), "hashes": hashes}).encode("utf-8"))
+        write_atomic(self._hashes_path(path), buf.getvalue())
+
+    def header(self, device, command, label):
+        """Header of a snapshot, raising ``KeyError`` when it does not exist."""
+        with self._open(device, command, label) as handle:
+            return json.loads(handle.readline())
+
+    def load(self, device, command, label, keys=None):
+        """Output stored in a snapshot, limited to the top-level ``keys`` when given.
+
+        Raises:
+            KeyError: When the snapshot does not exist.
+        """
+        with self._open(device, command, label) as handle:
+            handle.readline()
+            output = {}
+            for line in handle:
+                raw_key, _sep, raw_value = line.rstrip("\n").partition("\t")
+                key = json.loads(raw_key)
+                if key is None:
+                    return json.loads(raw_value)
+                if keys is None or key in keys:
+                    output[key] = json.loads(raw_value)
+            return output
+
+    def load_selected(self, device, command, label, paths):
+        """Output stored in a snapshot, limited to the top-level keys the jmespath ``paths`` can select."""
+        return self.load(device, command, label, top_keys(paths))
+
+    def labels(self, device, command):
+        """Labels of the snapshots of ``command`` on ``device``."""
+        directory = os.path.dirname(self.path(device, command, "x"))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[: -len(SUFFIX)] for name in os.listdir(directory) if name.endswith(SUFFIX))
+
+    @staticmethod
+    def _hashes_path(path):
+        return path[: -len(SUFFIX)] + HASHES_SUFFIX
+
+    def _open(self, device, command, label):
+        path = self.path(device, command, label)
+        if not os.path.exists(path):
+            raise KeyError("No snapshot {0} of '{1}' for {2}".format(label, command, device))
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8")
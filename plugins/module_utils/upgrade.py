@@ -0,0 +1,131 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Scheduling and checkpointing for rolling OS upgrades."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import os
+import threading
+
+PHASE_STAGED = "staged"
+PHASE_INSTALLED = "installed"
+PHASE_VERIFIED = "verified"
+PHASE_FAILED = "failed"
+PHASE_BLOCKED = "blocked"
+
+# Order in which a device moves through the upgrade; used to decide what a resumed run can skip.
+PHASES = [PHASE_STAGED, PHASE_INSTALLED, PHASE_VERIFIED]
+
+
+def reached(phase, wanted):
+    """Whether ``phase`` is at or past ``wanted`` in the upgrade sequence."""
+    if phase not in PHASES:
+        return False
+    return PHASES.index(phase) >= PHASES.index(wanted)
+
+
+class UpgradeCheckpoint:
+    """Per-device upgrade progress persisted as JSON so an interrupted run can resume.
+
+    Every update rewrites the file through a temporary file and ``os.replace`` so a crash
+    never leaves a truncated checkpoint behind. The file records the ``image`` being installed;
+    progress recorded for another image is discarded, so reusing a file never skips a device.
+    """
+
+    def __init__(self, path=None, image=None):
+        """Load ``path`` when it exists for ``image``; without a path progress is only kept in memory."""
+        self.path = path
+        self.image = image
+        self.devices = {}
+        self._lock = threading.Lock()
+        if path and os.path.isfile(path):
+            with open(path, "r") as checkpoint:
+                state = json.load(checkpoint)
+            if state.get("image") == image:
+                self.devices = state.get("devices", {})
+
+    def phase(self, name):
+        """Last recorded phase for device ``name``."""
+        return self.devices.get(name, {}).get("phase")
+
+    def update(self, name, phase, **details):
+        """Record that device ``name`` reached ``phase`` and persist the checkpoint."""
+        with self._lock:
+            entry = {"phase": phase}
+            entry.update(details)
+            self.devices[name] = entry
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = "{0}.tmp".format(self.path)
+        with open(tmp_path, "w") as checkpoint:
+            json.dump({"image": self.image, "devices": self.devices}, checkpoint, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class RollingScheduler:
+    """Hand out devices so no redundancy group has more than ``group_limit`` members down at once.
+
+    Devices without a redundancy group are only bound by ``max_parallel``. When a device fails,
+    the rest of its group is blocked so a broken upgrade never takes down the surviving peer.
+    """
+
+    def __init__(self, devices, max_parallel, group_limit=1):
+        """Create a scheduler over ``devices``, a list of ``(name, redundancy_group)`` tuples."""
+        self.pending = list(devices)
+        self.max_parallel = max_parallel
+        self.group_limit = group_limit
+        self.running = {}
+        self.blocked = []
+
+    def _group_running(self, group):
+        return sum(1 for running_group in self.running.values() if running_group == group)
+
+    def ready(self):
+        """Remove and return every pending device that may start now."""
+        started = []
+        for name, group in list(self.pending):
+            if len(self.running) >= self.max_parallel:
+                break
+            if group is not None and self._group_running(group) >= self.group_limit:
+                continue
+            self.pending.remove((name, group))
+            self.running[name] = group
+            started.append(name)
+        return started
+
+    def finish(self, name, success=True):
+        """Mark device ``name`` as done, blocking its group when it failed."""
+        group = self.running.pop(name)
+        if not success:
+            self.block(group)
+
+    def block(self, group):
+        """Block the pending devices of ``group``, as after one of its members failed."""
+        if group is None:
+            return
+        for pending_name, pending_group in list(self.pending):
+            if pending_group == group:
+                self.pending.remove((pending_name, pending_group))
+                self.blocked.append(pending_name)
+
+    def done(self):
+        """Whether every device has been handed out and finished."""
+        return not self.pending and not self.running
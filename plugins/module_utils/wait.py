@@ -0,0 +1,136 @@
+# Copyright 2022
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Deadline, backoff and reachability helpers for modules that wait on devices."""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import random
+import socket
+import time
+from contextlib import contextmanager
+
+# Port probed before attempting a full login, keyed by platform then transport.
+DEFAULT_PORTS = {
+    "arista_eos_eapi": {None: 80, "http": 80, "https": 443},
+    "cisco_aireos_ssh": {None: 22},
+    "cisco_asa_ssh": {None: 22},
+    "cisco_ios_ssh": {None: 22},
+    "cisco_nxos_nxapi": {None: 80, "http": 80, "https": 443},
+    "f5_tmos_icontrol": {None: 443},
+    "juniper_junos_netconf": {None: 22},
+}
+
+BACKOFF_INITIAL = 1.0
+BACKOFF_MAXIMUM = 10.0
+BACKOFF_FACTOR = 2.0
+BACKOFF_JITTER = 0.25
+
+
+def probe_port(platform, transport=None, port=None):
+    """Return the TCP port to probe for a platform, preferring an explicit port."""
+    if port:
+        return int(port)
+    ports = DEFAULT_PORTS.get(platform, {})
+    return ports.get(transport, ports.get(None))
+
+
+class Deadline:
+    """Fixed point in time measured on the monotonic clock."""
+
+    def __init__(self, timeout, clock=time.monotonic):
+        """Start the deadline ``timeout`` seconds from now."""
+        self._clock = clock
+        self.start = clock()
+        self.timeout = timeout
+        self.end = self.start + timeout
+
+    def elapsed(self):
+        """Seconds since the deadline was started."""
+        return self._clock() - self.start
+
+    def remaining(self):
+        """Seconds left before the deadline, never negative."""
+        return max(0.0, self.end - self._clock())
+
+    def expired(self):
+        """Whether the deadline has passed."""
+        return self.remaining() <= 0
+
+
+def backoff(initial=BACKOFF_INITIAL, maximum=BACKOFF_MAXIMUM, factor=BACKOFF_FACTOR, jitter=BACKOFF_JITTER):
+    """Yield exponentially growing delays capped at ``maximum``, each spread by +/- ``jitter``.
+
+    Jitter keeps many hosts rebooted at the same time from polling in lockstep.
+    """
+    delay = initial
+    while True:
+        spread = delay * jitter
+        yield max(0.0, delay + random.uniform(-spread, spread))  # nosec
+        delay = min(maximum, delay * factor)
+
+
+def port_open(host, port, timeout=2.0):
+    """Return True when a TCP connection to ``host``:``port`` can be established."""
+    if not host or not port:
+        return True
+    try:
+        sock = socket.create_connection((host, int(port)), timeout=timeout)
+    except (OSError, ValueError):
+        return False
+    sock.close()
+    return True
+
+
+def wait_until(check, deadline, delays=None, sleep=time.sleep):
+    """Call ``check`` until it returns a truthy value or ``deadline`` expires.
+
+    Args:
+        check (callable): Function called without arguments on every attempt.
+        deadline (Deadline): Deadline bounding the whole wait.
+        delays (iterator): Delays between attempts. Defaults to ``backoff()``.
+        sleep (callable): Sleep function, replaceable in tests.
+
+    Returns:
+        The last value returned by ``check``.
+    """
+    delays = delays or backoff()
+    while True:
+        result = check()
+        if result:
+            return result
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            return result
+        sleep(min(next(delays), remaining))
+
+
+class PhaseTimer:
+    """Record how long each named phase of an operation takes."""
+
+    def __init__(self, clock=time.monotonic):
+        """Create an empty timer."""
+        self._clock = clock
+        self.timings = {}
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block and store it under ``name`` in seconds."""
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(self._clock() - start, 3)
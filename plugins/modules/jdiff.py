@@ -15,20 +15,61 @@ short_description: Ansible module for jdiff.
 version_added: '1.1.0'
 description:
     - Ansible module wrapper on jdiff python library.
+    - Numeric C(operator) checks (C(is-gt), C(is-ge), C(is-lt), C(is-le), C(in-range), C(not-in-range)) are
+      evaluated in bulk as float arrays, with NumPy when it is installed, with the same result as jdiff.
 requirements:
     - jdiff
+    - numpy (optional, faster numeric checks)
 author: Patryk Szulczewski (@pszulczewski)
 options:
     check_type:
         description:
             - Check type supported by jdiff
-        required: true
+            - Required unless C(checks) is set.
         type: str
     evaluate_args:
         description:
             - arguments for evaluate() method
-        required: true
+            - Required unless C(value_file) is set.
         type: dict
+    value_file:
+        description:
+            - JSON file on the controller loaded as the C(value_to_compare) of C(evaluate_args).
+            - The file is parsed directly by the action plugin, with orjson when it is installed, so large
+              snapshots are not templated nor copied through task variables. Files of 64MB or more are
+              memory-mapped when parsed by orjson.
+            - Relative paths are searched like C(src) of the copy module, in the C(files) directories.
+        type: path
+    reference_file:
+        description:
+            - JSON file on the controller loaded as the C(reference_data) of C(evaluate_args), like C(value_file).
+        type: path
+    snapshot_dir:
+        description:
+            - Local snapshot store written by M(networktocode.netauto.ntc_show_command) with C(snapshot_dir).
+            - Required with C(reference_snapshot) or C(value_snapshot).
+        type: path
+    snapshot_command:
+        description:
+            - Command whose snapshots are loaded from C(snapshot_dir).
+        type: str
+    snapshot_device:
+        description:
+            - Device whose snapshots are loaded from C(snapshot_dir), as set by C(snapshot_device) of
+              M(networktocode.netauto.ntc_show_command).
+            - Required with C(reference_snapshot) or C(value_snapshot).
+        type: str
+    reference_snapshot:
+        description:
+            - Label of the snapshot loaded as the C(reference_data) of C(evaluate_args), such as C(pre_change).
+            - Only the top-level keys C(jmespath) can select are decoded, when it starts with a plain key.
+            - For C(exact_match) and C(tolerance), the subtree hashes of the extracted reference data are saved
+              next to the snapshot, so later comparisons against it only hash C(value_to_compare).
+        type: str
+    value_snapshot:
+        description:
+            - Label of the snapshot loaded as the C(value_to_compare) of C(evaluate_args), like C(reference_snapshot).
+        type: str
     jmespath:
         description:
             - JMESPath to extract specific values
@@ -39,6 +80,48 @@ options:
             - list of keys to exclude
         type: list
         elements: str
+    list_key:
+        description:
+            - Key identifying the items of lists of dicts, such as C(ip) or the C($ip$) anchor.
+            - For C(exact_match) and C(tolerance), lists in which every dict holds this key are turned into
+              dicts by its value, on both sides, before they are compared. Items are then matched by key,
+              so a change of order is not reported and added or removed items are reported by key.
+            - Ignored by other check types.
+        type: str
+    checks:
+        description:
+            - Many checks evaluated in one task against the C(value_to_compare) and C(reference_data)
+              of C(evaluate_args).
+            - Data selected by the same C(jmespath) and C(exclude) is extracted once for all the checks using it.
+        type: list
+        elements: dict
+        suboptions:
+            name:
+                description:
+                    - Name of the check in the C(checks) result. Defaults to its position and check type.
+                type: str
+            check_type:
+                description:
+                    - Check type supported by jdiff
+                required: true
+                type: str
+            evaluate_args:
+                description:
+                    - Arguments of the check for evaluate(), other than C(value_to_compare) and C(reference_data).
+                type: dict
+            jmespath:
+                description:
+                    - JMESPath to extract specific values. Defaults to the task C(jmespath).
+                type: str
+            exclude:
+                description:
+                    - list of keys to exclude. Defaults to the task C(exclude).
+                type: list
+                elements: str
+            list_key:
+                description:
+                    - Key identifying the items of lists of dicts. Defaults to the task C(list_key).
+                type: str
 """
 
 EXAMPLES = """
@@ -188,6 +271,51 @@ EXAMPLES = """
               }
           ]
       }
+
+- name: "EXACT_MATCH - COMPARE SNAPSHOT FILES WITHOUT TEMPLATING THEM"
+  networktocode.netauto.jdiff:
+    check_type: "exact_match"
+    reference_file: "snapshots/{{ inventory_hostname }}/pre.json"
+    value_file: "snapshots/{{ inventory_hostname }}/post.json"
+    jmespath: "interfaces.*.[$name$,status]"
+  register: result
+
+- name: "EXACT_MATCH - COMPARE WITH THE PRE-CHANGE SNAPSHOT"
+  networktocode.netauto.jdiff:
+    check_type: "exact_match"
+    snapshot_dir: snapshots
+    snapshot_command: show ip bgp neighbors
+    snapshot_device: "{{ inventory_hostname }}"
+    reference_snapshot: pre_change
+    value_snapshot: post_change
+    jmespath: "peers[*].[$ip$,state]"
+  register: result
+
+- name: "EXACT_MATCH - COMPARE PEERS WHATEVER THEIR ORDER"
+  networktocode.netauto.jdiff:
+    check_type: "exact_match"
+    evaluate_args:
+      reference_data: "{{ pre_change }}"
+      value_to_compare: "{{ post_change }}"
+    jmespath: "peers"
+    list_key: ip
+  register: result
+
+- name: "POST-CHANGE VALIDATION - MANY CHECKS IN ONE TASK"
+  networktocode.netauto.jdiff:
+    evaluate_args:
+      reference_data: "{{ pre_change }}"
+      value_to_compare: "{{ post_change }}"
+    checks:
+      - name: bgp_state
+        check_type: exact_match
+        jmespath: "*.*.ipv4.[state]"
+      - name: bgp_prefixes
+        check_type: tolerance
+        evaluate_args:
+          tolerance: 10
+        jmespath: "*.*.ipv4.[accepted_prefixes]"
+  register: result
 """
 
 RETURN = """
@@ -200,9 +328,14 @@ fail_details:
     returned: success
     type: dict
 success:
-    description: Indicates if the check was successful.
+    description: Indicates if the check was successful, or if every check was with C(checks).
     returned: success
     type: bool
+checks:
+    description: C(success) and C(fail_details) of each check, by name.
+    returned: when checks is set
+    type: dict
+    sample: {"bgp_state": {"success": true, "fail_details": {}}}
 """
 
 from ansible.module_utils.basic import AnsibleModule
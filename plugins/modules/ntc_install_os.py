@@ -79,6 +79,16 @@ options:
         required: false
         default: false
         type: bool
+    state_file:
+        description:
+            - Local file recording the progress and final result of the install. When it already holds the
+              result of the same install, that result is returned without connecting to the device.
+            - Useful with C(async), so a lost or repeated job does not start the install over. When the
+              recorded install was interrupted, the device is polled until it answers with the image installed,
+              for up to an hour after the install started, and the install is not sent again.
+            - A failed install clears the file, so the next run sends the install again.
+        required: false
+        type: str
 """
 
 EXAMPLES = r"""
@@ -114,6 +124,16 @@ EXAMPLES = r"""
     provider: "{{ ios_provider }}"
     system_image_file: c2800nm-adventerprisek9_ivs_li-mz.151-3.T4.bin
     reboot: yes
+
+- name: "INSTALL OS ON NEXUS 9K WITHOUT HOLDING A FORK"
+  networktocode.netauto.ntc_install_os:
+    ntc_host: n9k1
+    system_image_file: n9000-dk9.6.1.2.I3.1.bin
+    reboot: yes
+    state_file: "/tmp/install-n9k1.json"
+  async: 1200
+  poll: 0
+  register: install_job
 """
 
 RETURN = r"""
@@ -132,6 +152,11 @@ install_state:
             Supervisor non-disruptive upgrade successful.\n
             Install has been successful.\n",
     }
+timings:
+    returned: always
+    type: dict
+    description: Seconds spent in each phase of the install.
+    sample: {"connect": 2.1, "install": 412.6}
 """
 
 import time  # noqa E402
@@ -142,6 +167,12 @@ from ansible_collections.networktocode.netauto.plugins.module_utils.args_common
     MUTUALLY_EXCLUSIVE,
     REQUIRED_ONE_OF,
 )
+from ansible_collections.networktocode.netauto.plugins.module_utils.progress import ProgressFile
+from ansible_collections.networktocode.netauto.plugins.module_utils.wait import (
+    Deadline,
+    PhaseTimer,
+    wait_until,
+)
 
 try:
     from pyntc import ntc_device, ntc_device_by_name  # noqa E402
@@ -174,6 +205,11 @@ except ImportError:
 PLATFORM_F5 = "f5_tmos_icontrol"
 # PLATFORM_ASA = "cisco_asa_ssh"
 
+PHASE_INSTALLING = "installing"
+
+# Upper bound on an install resumed from the state file, counted from when it was started.
+INSTALL_TIMEOUT = 3600
+
 
 # TODO: Remove when deprecating older pyntc
 def already_set(boot_options, system_image_file, kickstart_image_file, **kwargs):
@@ -186,6 +222,33 @@ def already_set(boot_options, system_image_file, kickstart_image_file, **kwargs)
     return boot_options.get("sys") == system_image_file and boot_options.get("kick") == kickstart_image_file
 
 
+def installed_boot_options(connect, system_image_file, kickstart_image_file, volume, booted):
+    """Boot options of the device once it answers with the image installed, otherwise None.
+
+    ``booted`` tells whether the install reboots into the image; otherwise only the boot options are checked.
+    """
+    try:
+        device = connect()
+        device.open()
+        boot_options = device.get_boot_options()
+        if HAS_PYNTC_VERSION and booted:
+            installed = device._image_booted(  # pylint: disable=protected-access
+                image_name=system_image_file, kickstart=kickstart_image_file, volume=volume
+            )
+        else:
+            installed = already_set(
+                boot_options=boot_options,
+                system_image_file=system_image_file,
+                kickstart_image_file=kickstart_image_file,
+                volume=volume,
+                device=device,
+            )
+        device.close()
+    except Exception:  # pylint: disable=broad-except
+        return None
+    return boot_options if installed else None
+
+
 def main():  # pylint: disable=too-many-statements,too-many-branches,too-many-locals
     """Main execution."""
     base_argument_spec = dict(
@@ -194,6 +257,7 @@ def main():  # pylint: disable=too-many-statements,too-many-branches,too-many-lo
         volume=dict(required=False, type="str"),
         reboot=dict(required=False, type="bool", default=False),
         install_mode=dict(required=False, type="bool", default=None),
+        state_file=dict(required=False, type="str"),
     )
     argument_spec = base_argument_spec
     argument_spec.update(CONNECTION_ARGUMENT_SPEC)
@@ -253,9 +317,25 @@ def main():  # pylint: disable=too-many-statements,too-many-branches,too-many-lo
         if val is None:
             module.fail_json(msg=str(key) + " is required")
 
-    if ntc_host is not None:
-        device = ntc_device_by_name(ntc_host, ntc_conf_file)
-    else:
+    # A completed install recorded in the state file is returned without connecting to the device.
+    progress = ProgressFile(
+        None if module.check_mode else module.params["state_file"],
+        {
+            "host": host,
+            "ntc_host": ntc_host,
+            "platform": platform,
+            "system_image_file": module.params["system_image_file"],
+            "kickstart_image_file": module.params["kickstart_image_file"],
+            "volume": module.params["volume"],
+            "reboot": reboot,
+        },
+    )
+    if progress.result is not None:
+        module.exit_json(**progress.result)
+
+    def connect():
+        if ntc_host is not None:
+            return ntc_device_by_name(ntc_host, ntc_conf_file)
         kwargs = {}
         if transport is not None:
             kwargs["transport"] = transport
@@ -265,7 +345,7 @@ def main():  # pylint: disable=too-many-statements,too-many-branches,too-many-lo
             kwargs["secret"] = secret
 
         device_type = platform
-        device = ntc_device(device_type, host, username, password, **kwargs)
+        return ntc_device(device_type, host, username, password, **kwargs)
 
     system_image_file = module.params["system_image_file"]
     kickstart_image_file = module.params["kickstart_image_file"]
@@ -281,24 +361,50 @@ def main():  # pylint: disable=too-many-statements,too-many-branches,too-many-lo
     if kickstart_image_file == "null":
         kickstart_image_file = None
 
-    device.open()
-    pre_install_boot_options = device.get_boot_options()
+    def fail(**kwargs):
+        # A failed install must not be waited for again by the next run.
+        progress.reset()
+        module.fail_json(**kwargs)
+
+    phases = PhaseTimer()
+    if progress.phase == PHASE_INSTALLING and not module.check_mode:
+        # The run that sent the install was lost: wait for its outcome instead of installing again.
+        deadline = Deadline(max(0, INSTALL_TIMEOUT - (time.time() - progress.get("started_at"))))
+        with phases.phase("wait"):
+            install_state = wait_until(
+                lambda: installed_boot_options(connect, system_image_file, kickstart_image_file, volume, reboot),
+                deadline,
+            )
+        if not install_state:
+            fail(msg="Install not successful", started_at=progress.get("started_at"))
+        result = dict(
+            changed=install_state != progress.get("boot_options"), install_state=install_state, timings=phases.timings
+        )
+        progress.finish(result)
+        module.exit_json(**result)
+
+    with phases.phase("connect"):
+        device = connect()
+        device.open()
+        pre_install_boot_options = device.get_boot_options()
 
     if not module.check_mode:  # pylint: disable=too-many-nested-blocks
+        progress.update(PHASE_INSTALLING, started_at=time.time(), boot_options=pre_install_boot_options)
         # TODO: Remove conditional when deprecating older pyntc
         if HAS_PYNTC_VERSION:
             try:
                 # TODO: Remove conditional if we require reboot for non-F5 devices
-                if reboot or device.device_type == "f5_tmos_icontrol":
-                    changed = device.install_os(
-                        image_name=system_image_file,
-                        kickstart=kickstart_image_file,
-                        volume=volume,
-                        install_mode=install_mode,
-                    )
-                else:
-                    # TODO: Remove support if we require reboot for non-F5 devices
-                    changed = device.set_boot_options(system_image_file)
+                with phases.phase("install"):
+                    if reboot or device.device_type == "f5_tmos_icontrol":
+                        changed = device.install_os(
+                            image_name=system_image_file,
+                            kickstart=kickstart_image_file,
+                            volume=volume,
+                            install_mode=install_mode,
+                        )
+                    else:
+                        # TODO: Remove support if we require reboot for non-F5 devices
+                        changed = device.set_boot_options(system_image_file)
             except (
                 CommandError,
                 CommandListError,
@@ -308,9 +414,9 @@ def main():  # pylint: disable=too-many-statements,too-many-branches,too-many-lo
                 OSInstallError,
                 RebootTimeoutError,
             ) as e:
-                module.fail_json(msg=e.message)
+                fail(msg=e.message)
             except Exception as e:  # pylint: disable=broad-except
-                module.fail_json(msg=str(e))
+                fail(msg=str(e))
 
             if (
                 reboot
@@ -321,7 +427,7 @@ def main():  # pylint: disable=too-many-statements,too-many-branches,too-many-lo
                     changed = True
                     device.reboot(confirm=True, volume=volume)
                 except RuntimeError:
-                    module.fail_json(
+                    fail(
                         msg="Attempted reboot but did not boot to desired volume",
                         original_volume=pre_install_boot_options["active_volume"],
                         expected_volume=volume,
@@ -345,26 +451,24 @@ def main():  # pylint: disable=too-many-statements,too-many-branches,too-many-lo
 
                 if device.device_type == "nxos":
                     timeout = 600
+                    deadline = Deadline(timeout)
                     device.set_timeout(timeout)
-                    try:
-                        start_time = time.time()
-                        device.set_boot_options(system_image_file, kickstart=kickstart_image_file)
-                    except:  # nosec  # noqa
-                        pass
-                    elapsed_time = time.time() - start_time
+                    with phases.phase("install"):
+                        try:
+                            device.set_boot_options(system_image_file, kickstart=kickstart_image_file)
+                        except:  # nosec  # noqa
+                            pass
 
                     device.set_timeout(30)
-                    try:
-                        install_state = device.get_boot_options()
-                    except:  # noqa
-                        install_state = {}
 
-                    while elapsed_time < timeout and not install_state:
+                    def _boot_options():
                         try:
-                            install_state = device.get_boot_options()
+                            return device.get_boot_options()
                         except:  # noqa
-                            time.sleep(10)
-                            elapsed_time += 10
+                            return {}
+
+                    with phases.phase("wait"):
+                        install_state = wait_until(_boot_options, deadline)
                 else:
                     device.set_boot_options(system_image_file, kickstart=kickstart_image_file, volume=volume)
                     install_state = device.get_boot_options()
@@ -376,7 +480,7 @@ def main():  # pylint: disable=too-many-statements,too-many-branches,too-many-lo
                         volume=volume,
                         device=device,
                     ):
-                        module.fail_json(msg="Install not successful", install_state=install_state)
+                        fail(msg="Install not successful", install_state=install_state)
 
     else:
         if HAS_PYNTC_VERSION:
@@ -396,7 +500,10 @@ def main():  # pylint: disable=too-many-statements,too-many-branches,too-many-lo
         install_state = pre_install_boot_options
 
     device.close()
-    module.exit_json(changed=changed, install_state=install_state)
+    result = dict(changed=changed, install_state=install_state, timings=phases.timings)
+    if not module.check_mode:
+        progress.finish(result)
+    module.exit_json(**result)
 
 
 if __name__ == "__main__":
@@ -27,6 +27,14 @@ description:
     - Reboot a network device, optionally on a timer.
 notes:
     - The timer is only supported for IOS devices.
+    - With C(state_file), the module records its progress in a local file. Running the module again with the
+      same file resumes waiting without sending another reboot, and once the device is back it returns the
+      recorded result without connecting. Use a new file (or delete it) to reboot the device again.
+    - Together with C(async) and C(poll), or with C(wait=false) followed by a second task, this lets a few
+      forks drive reboots of many devices.
+    - With C(devices), a single task reboots a whole fleet in waves of C(wave_size) devices. The next wave
+      starts once C(wave_ready_fraction) of the current one is back and accepts logins, and the remaining
+      waves are cancelled when that can no longer happen before C(timeout). Run it with C(run_once).
 author: Jason Edelman (@jedelman8)
 version_added: 1.9.2
 requirements:
@@ -58,6 +66,83 @@ options:
             - Volume name - required argument for F5 platform.
         required: false
         type: str
+    wait:
+        description:
+            - Wait for the device to come back after sending the reboot. When false, the module returns right
+              after the reboot is sent; run it again with the same C(state_file) to wait for the device.
+        required: false
+        default: true
+        type: bool
+    state_file:
+        description:
+            - Local file used to record progress and the final result, so the reboot can be resumed or polled.
+        required: false
+        type: str
+    ready_listener:
+        description:
+            - Listen for syslog messages (and optionally SNMP traps) from the device instead of polling it.
+              The wait ends as soon as the device logs its platform "system ready" message or sends a
+              coldStart/warmStart trap, and a single login then verifies it.
+            - The device must send syslog (or SNMPv2c traps) to the host running the module.
+            - If no message arrives before C(timeout), one login attempt is made when the timeout expires.
+        required: false
+        type: dict
+        suboptions:
+            bind:
+                description:
+                    - Local address to listen on.
+                required: false
+                default: 0.0.0.0
+                type: str
+            syslog_port:
+                description:
+                    - UDP port to receive syslog messages on.
+                required: false
+                default: 514
+                type: int
+            trap_port:
+                description:
+                    - UDP port to receive SNMP traps on. Traps are not received if omitted.
+                required: false
+                type: int
+            source:
+                description:
+                    - Address the device sends messages from, when it differs from C(host).
+                required: false
+                type: str
+            pattern:
+                description:
+                    - Regular expression matching the ready message, overriding the platform default.
+                      Defaults are C(%SYS-5-RESTART) for IOS, C(%VDC_MGR-2-VDC_ONLINE) for NX-OS,
+                      C(%SYS-5-SYSTEM_RESTARTED) for EOS, C(%ASA-x-199002) for ASA and
+                      C(SNMPD_TRAP_COLD_START) for Junos.
+                required: false
+                type: str
+    devices:
+        description:
+            - Devices to reboot in waves. Each entry takes the same connection options as the module,
+              plus C(name) and C(source).
+            - C(name) defaults to C(ntc_host) or C(host) and is used as key in the results.
+            - C(source) is the address the device sends syslog messages from, when it differs from C(host)
+              and C(ready_listener) is set.
+            - Connection options given at the module level are used as defaults for every entry.
+            - Mutually exclusive with C(host) and C(ntc_host), and not supported with C(timer), C(wait=false)
+              or C(state_file).
+        required: false
+        type: list
+        elements: dict
+    wave_size:
+        description:
+            - Number of devices rebooted together when C(devices) is set.
+        required: false
+        default: 50
+        type: int
+    wave_ready_fraction:
+        description:
+            - Share of a wave, between 0 and 1, that must be back before the next wave is rebooted.
+        required: false
+        default: 1.0
+        type: float
 """
 
 EXAMPLES = r"""
@@ -102,6 +187,41 @@ EXAMPLES = r"""
     username: "{{ username }}"
     password: "{{ password }}"
     secret: "{{ secret }}"
+
+- name: "SEND THE REBOOT AND RELEASE THE FORK"
+  networktocode.netauto.ntc_reboot:
+    provider: "{{ nxos_provider }}"
+    wait: false
+    state_file: "/tmp/reboot-{{ inventory_hostname }}.json"
+
+- name: "WAIT FOR THE DEVICE TO COME BACK"
+  networktocode.netauto.ntc_reboot:
+    provider: "{{ nxos_provider }}"
+    state_file: "/tmp/reboot-{{ inventory_hostname }}.json"
+  async: 600
+  poll: 15
+
+- name: "REBOOT AND WAIT FOR THE DEVICE TO LOG THAT IT IS READY"
+  networktocode.netauto.ntc_reboot:
+    provider: "{{ ios_provider }}"
+    ready_listener:
+      syslog_port: 5514
+      trap_port: 5162
+
+- name: "REBOOT THE ACCESS LAYER 100 SWITCHES AT A TIME"
+  networktocode.netauto.ntc_reboot:
+    platform: cisco_ios_ssh
+    username: "{{ username }}"
+    password: "{{ password }}"
+    wave_size: 100
+    wave_ready_fraction: 0.95
+    timeout: 600
+    devices:
+      - host: access01
+      - host: access02
+      - host: access03
+        source: 10.0.3.1
+  run_once: true
 """
 
 RETURN = r"""
@@ -112,7 +232,7 @@ rebooted:
     sample: true
 reachable:
     description: Whether the device is reachable on specified port
-                 after rebooting.
+                 after rebooting. Always false when C(wait) is false.
     returned: always
     type: bool
     sample: true
@@ -123,7 +243,38 @@ atomic:
     returned: always
     type: bool
     sample: true
+timings:
+    description: Seconds spent in each phase of the reboot. C(shutdown) is omitted
+                 when the reboot is scheduled with a timer.
+    returned: always
+    type: dict
+    sample: {"reboot": 1.2, "shutdown": 4.1, "boot": 92.7, "login": 3.3}
+ready_message:
+    description: The syslog message or trap that reported the device ready, null if none arrived.
+    returned: when ready_listener is set
+    type: str
+    sample: "<189>42: *Mar  1 00:00:41.123: %SYS-5-RESTART: System restarted --"
+devices:
+    description: Result of every device when C(devices) is set, with the seconds from reboot to successful
+                 login as C(downtime) and the error when the reboot could not be sent.
+    returned: when devices is set
+    type: dict
+    sample: {
+        "access01": {"rebooted": true, "reachable": true, "downtime": 184.2},
+        "access02": {"rebooted": false, "reachable": false, "error": "Authentication failed."},
+    }
+waves:
+    description: Number of waves started.
+    returned: when devices is set
+    type: int
+    sample: 3
+unreachable:
+    description: Devices that were rebooted but did not come back before C(timeout).
+    returned: when devices is set
+    type: list
+    sample: ["access17"]
 """
+import functools
 import time
 
 from ansible.module_utils.basic import AnsibleModule
@@ -132,6 +283,21 @@ from ansible_collections.networktocode.netauto.plugins.module_utils.args_common
     MUTUALLY_EXCLUSIVE,
     REQUIRED_ONE_OF,
 )
+from ansible_collections.networktocode.netauto.plugins.module_utils.fleet import device_from_params, device_params
+from ansible_collections.networktocode.netauto.plugins.module_utils.progress import ProgressFile
+from ansible_collections.networktocode.netauto.plugins.module_utils.ready_listener import ReadyListener
+from ansible_collections.networktocode.netauto.plugins.module_utils.reboot_waves import (
+    ReadinessTracker,
+    run_waves,
+    wave_device,
+)
+from ansible_collections.networktocode.netauto.plugins.module_utils.wait import (
+    Deadline,
+    PhaseTimer,
+    port_open,
+    probe_port,
+    wait_until,
+)
 
 try:
     HAS_PYNTC = True
@@ -147,29 +313,151 @@ PLATFORM_F5 = "f5_tmos_icontrol"
 # PLATFORM_ASA = "cisco_asa_ssh"
 
 
-def check_device(module, username, password, host, timeout, kwargs):  # pylint: disable=too-many-arguments
-    """Simple check of the device."""
-    success = False
-    attempts = timeout / 30
-    counter = 0
-    atomic = False
-    while counter < attempts and not success:
+PHASE_REBOOTED = "rebooted"
+PHASE_DOWN = "down"
+
+# Upper bound on waiting for the device to stop answering after the reboot command.
+SHUTDOWN_TIMEOUT = 60
+
+# Threads sending reboots and verifying logins in wave mode; readiness itself is tracked in one loop.
+WAVE_WORKERS = 32
+
+
+def check_device(  # pylint: disable=too-many-arguments
+    module, username, password, host, deadline, kwargs, phases, listener=None, address=None
+):
+    """Wait for the device to come back, probing its port before each login attempt.
+
+    With a ``listener``, the boot phase ends as soon as the device announces it is ready
+    instead of polling its port.
+    """
+    port = probe_port(module.params["platform"], kwargs.get("transport"), kwargs.get("port"))
+    state = {"atomic": False}
+
+    def _login():
+        if not port_open(host, port):
+            return False
         try:
             if module.params["ntc_host"] is not None:
                 device = ntc_device_by_name(module.params["ntc_host"], module.params["ntc_conf_file"])
             else:
                 device_type = module.params["platform"]
                 device = ntc_device(device_type, host, username, password, **kwargs)
-            success = True
-            atomic = True
-            try:
-                device.close()
-            except:  # noqa
-                atomic = False
         except:  # noqa
-            time.sleep(30)
-            counter += 1
-    return success, atomic
+            return False
+        state["atomic"] = True
+        try:
+            device.close()
+        except:  # noqa
+            state["atomic"] = False
+        return True
+
+    with phases.phase("boot"):
+        if listener is not None:
+            listener.wait(address, deadline.remaining())
+        else:
+            wait_until(lambda: port_open(host, port), deadline)
+    with phases.phase("login"):
+        success = wait_until(_login, deadline)
+    return success, state["atomic"]
+
+
+def reboot_in_waves(module):  # pylint: disable=too-many-locals
+    """Reboot every entry of ``devices`` in waves and exit with per-device results."""
+    if module.params["timer"] is not None:
+        module.fail_json(msg="timer is not supported together with devices.")
+    if module.params["state_file"] or not module.params["wait"]:
+        module.fail_json(msg="state_file and wait=false are not supported together with devices.")
+
+    wave_size = module.params["wave_size"]
+    ready_fraction = module.params["wave_ready_fraction"]
+    volume = module.params["volume"]
+    if wave_size < 1:
+        module.fail_json(msg="wave_size must be at least 1.")
+    if not 0 <= ready_fraction <= 1:
+        module.fail_json(msg="wave_ready_fraction must be between 0 and 1.")
+
+    entries = {}
+    for entry in module.params["devices"]:
+        params = device_params(entry, module.params)
+        if params["name"] is None:
+            module.fail_json(msg="Every device requires one of name, host or ntc_host.", device=entry)
+        if params["name"] in entries:
+            module.fail_json(msg="Device {0} is listed more than once.".format(params["name"]))
+        entries[params["name"]] = params
+
+    # One listener serves every device, so the syslog port is only bound once.
+    listener = None
+    listener_params = module.params["ready_listener"]
+    addresses = {}
+    devices = []
+    try:
+        if listener_params:
+            listener = ReadyListener(
+                bind=listener_params["bind"],
+                syslog_port=listener_params["syslog_port"],
+                trap_port=listener_params["trap_port"],
+            )
+        for name, params in entries.items():
+            ready = None
+            source = params.get("source") or params["host"]
+            if listener is not None and source:
+                addresses[name] = listener.watch(
+                    source, platform=params["platform"], pattern=listener_params["pattern"]
+                )
+                ready = functools.partial(listener.ready, addresses[name])
+            port = probe_port(params["platform"], params["transport"], params["port"])
+            devices.append(wave_device(name, params["host"], port, ready=ready))
+        if listener is not None:
+            listener.start()
+    except OSError as err:
+        module.fail_json(msg="Unable to start the ready listener: {0}".format(err))
+
+    def reboot(name):
+        device = device_from_params(entries[name])
+        device.open()
+        if volume:
+            device.reboot(confirm=True, volume=volume)
+        else:
+            device.reboot(confirm=True)
+
+    def verify(name):
+        try:
+            device = device_from_params(entries[name])
+        except:  # noqa
+            return False
+        try:
+            device.close()
+        except:  # noqa
+            pass
+        return True
+
+    results, waves, aborted = run_waves(
+        devices,
+        reboot,
+        verify,
+        ReadinessTracker(shutdown_timeout=SHUTDOWN_TIMEOUT),
+        wave_size=wave_size,
+        ready_fraction=ready_fraction,
+        timeout=module.params["timeout"],
+        workers=min(wave_size, WAVE_WORKERS),
+    )
+    if listener is not None:
+        for name, address in addresses.items():
+            results[name]["ready_message"] = listener.message(address)
+        listener.stop()
+
+    changed = any(result["rebooted"] for result in results.values())
+    unreachable = sorted(name for name, result in results.items() if result["rebooted"] and not result["reachable"])
+    if aborted:
+        module.fail_json(
+            msg="Stopped after wave {0}: fewer than {1:.0%} of its devices came back.".format(waves, ready_fraction),
+            changed=changed,
+            devices=results,
+            waves=waves,
+            unreachable=unreachable,
+        )
+    module.exit_json(changed=changed, devices=results, waves=waves, unreachable=unreachable)
 
 
 def main():  # pylint: disable=too-many-arguments,too-many-branches,too-many-statements,too-many-locals
@@ -179,6 +467,29 @@ def main():  # pylint: disable=too-many-arguments,too-many-branches,too-many-sta
         timer=dict(requred=False, type="int"),
         timeout=dict(required=False, type="int", default=240),
         volume=dict(required=False, type="str"),
+        wait=dict(required=False, type="bool", default=True),
+        state_file=dict(required=False, type="str"),
+        ready_listener=dict(
+            required=False,
+            type="dict",
+            options=dict(
+                bind=dict(required=False, type="str", default="0.0.0.0"),  # nosec
+                syslog_port=dict(required=False, type="int", default=514),
+                trap_port=dict(required=False, type="int"),
+                source=dict(required=False, type="str"),
+                pattern=dict(required=False, type="str"),
+            ),
+        ),
+    )
+    device_spec = dict(
+        name=dict(required=False, type="str"),
+        source=dict(required=False, type="str"),
+    )
+    device_spec.update(CONNECTION_ARGUMENT_SPEC)
+    base_argument_spec.update(
+        devices=dict(required=False, type="list", elements="dict", options=device_spec),
+        wave_size=dict(required=False, type="int", default=50),
+        wave_ready_fraction=dict(required=False, type="float", default=1.0),
     )
     argument_spec = base_argument_spec
     argument_spec.update(CONNECTION_ARGUMENT_SPEC)
@@ -186,8 +497,8 @@ def main():  # pylint: disable=too-many-arguments,too-many-branches,too-many-sta
 
     module = AnsibleModule(
         argument_spec=argument_spec,
-        mutually_exclusive=MUTUALLY_EXCLUSIVE,
-        required_one_of=[REQUIRED_ONE_OF],
+        mutually_exclusive=MUTUALLY_EXCLUSIVE + [["devices", "host"], ["devices", "ntc_host"]],
+        required_one_of=[REQUIRED_ONE_OF + ["devices"]],
         required_if=[["platform", PLATFORM_F5, ["volume"]]],
         supports_check_mode=False,
     )
@@ -202,6 +513,11 @@ def main():  # pylint: disable=too-many-arguments,too-many-branches,too-many-sta
         if module.params.get(param) is not False:
             module.params[param] = module.params.get(param) or pvalue
 
+    if module.params["devices"]:
+        if not module.params["confirm"]:
+            module.fail_json(msg="confirm must be set to true for this module to work.")
+        reboot_in_waves(module)
+
     platform = module.params["platform"]
     host = module.params["host"]
     username = module.params["username"]
@@ -220,9 +536,7 @@ def main():  # pylint: disable=too-many-arguments,too-many-branches,too-many-sta
             module.fail_json(msg=str(key) + " is required")
 
     kwargs = {}
-    if ntc_host is not None:
-        device = ntc_device_by_name(ntc_host, ntc_conf_file)
-    else:
+    if ntc_host is None:
         if transport is not None:
             kwargs["transport"] = transport
         if port is not None:
@@ -230,44 +544,93 @@ def main():  # pylint: disable=too-many-arguments,too-many-branches,too-many-sta
         if secret is not None:
             kwargs["secret"] = secret
 
-        device_type = platform
-        device = ntc_device(device_type, host, username, password, **kwargs)
-
     confirm = module.params["confirm"]
     timer = module.params["timer"]
     timeout = module.params["timeout"]
     volume = module.params["volume"]
+    wait = module.params["wait"]
 
     if not confirm:
         module.fail_json(msg="confirm must be set to true for this module to work.")
 
-    supported_timer_platforms = [PLATFORM_IOS, PLATFORM_JUNOS]
-
-    if timer is not None and device.device_type not in supported_timer_platforms:
-        module.fail_json(msg=f"Timer parameter not supported on platform {platform}.")
+    progress = ProgressFile(
+        module.params["state_file"],
+        {"host": host, "ntc_host": ntc_host, "platform": platform, "timer": timer, "volume": volume},
+    )
+    if progress.result is not None:
+        module.exit_json(**progress.result)
+
+    phases = PhaseTimer()
+    phases.timings.update(progress.get("timings", {}))
+
+    # Start listening before the reboot is sent so a bind failure leaves the device untouched.
+    listener = None
+    listener_address = None
+    listener_params = module.params["ready_listener"]
+    if listener_params and wait:
+        listener = ReadyListener(
+            bind=listener_params["bind"],
+            syslog_port=listener_params["syslog_port"],
+            trap_port=listener_params["trap_port"],
+        )
+        try:
+            listener_address = listener.watch(
+                listener_params["source"] or host, platform=platform, pattern=listener_params["pattern"]
+            )
+            listener.start()
+        except OSError as err:
+            module.fail_json(msg="Unable to start the ready listener: {0}".format(err))
+
+    if progress.phase is None:
+        if ntc_host is not None:
+            device = ntc_device_by_name(ntc_host, ntc_conf_file)
+        else:
+            device_type = platform
+            device = ntc_device(device_type, host, username, password, **kwargs)
+
+        supported_timer_platforms = [PLATFORM_IOS, PLATFORM_JUNOS]
+
+        if timer is not None and device.device_type not in supported_timer_platforms:
+            module.fail_json(msg=f"Timer parameter not supported on platform {platform}.")
+
+        with phases.phase("reboot"):
+            device.open()
+
+            if volume:
+                device.reboot(confirm=True, volume=volume)
+            elif timer is not None:
+                device.reboot(confirm=True, timer=timer)
+            else:
+                device.reboot(confirm=True)
 
-    argument_check = {"host": host, "username": username, "platform": platform, "password": password}
+        progress.update(PHASE_REBOOTED, rebooted_at=time.time(), timings=phases.timings)
 
-    for key, val in argument_check.items():
-        if val is None:
-            module.fail_json(msg=str(key) + " is required")
+    changed = True
+    rebooted = True
 
-    device.open()
+    if not wait:
+        module.exit_json(changed=changed, rebooted=rebooted, reachable=False, atomic=False, timings=phases.timings)
 
-    if volume:
-        device.reboot(confirm=True, volume=volume)
-    elif timer is not None:
-        device.reboot(confirm=True, timer=timer)
-    else:
-        device.reboot(confirm=True)
+    # The deadline counts from the reboot command, which may have been sent by an earlier task.
+    deadline = Deadline(max(0, timeout - (time.time() - progress.get("rebooted_at"))))
 
-    time.sleep(10)
-    reachable, atomic = check_device(module, username, password, host, timeout, kwargs)
+    # A ready message can only be sent after the reboot, so there is no need to see the device go down first.
+    if timer is None and progress.phase == PHASE_REBOOTED and listener is None:
+        probe = probe_port(platform, transport, port)
+        with phases.phase("shutdown"):
+            wait_until(lambda: not port_open(host, probe), Deadline(min(deadline.remaining(), SHUTDOWN_TIMEOUT)))
+        progress.update(PHASE_DOWN, timings=phases.timings)
 
-    changed = True
-    rebooted = True
+    reachable, atomic = check_device(
+        module, username, password, host, deadline, kwargs, phases, listener=listener, address=listener_address
+    )
 
-    module.exit_json(changed=changed, rebooted=rebooted, reachable=reachable, atomic=atomic)
+    result = dict(changed=changed, rebooted=rebooted, reachable=reachable, atomic=atomic, timings=phases.timings)
+    if listener is not None:
+        result["ready_message"] = listener.message(listener_address)
+        listener.stop()
+    progress.finish(result)
+    module.exit_json(**result)
 
 
 if __name__ == "__main__":
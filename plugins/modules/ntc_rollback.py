@@ -28,6 +28,10 @@ description:
       to a configuration checkpoint file on supported Cisco or Arista switches.
 notes:
     - This module is not idempotent.
+    - In check mode, a rollback is previewed by diffing the running configuration against the snapshot of the
+      checkpoint in C(catalog_dir), and C(rollback_diff) (and C(--diff) output) shows what it would change.
+      Without that snapshot, the rollback is reported as a change with a warning.
+      Creating a checkpoint and pruning only report what would happen.
 author: Jason Edelman (@jedelman8)
 requirements:
     - pyntc
@@ -46,6 +50,39 @@ options:
         required: false
         default: null
         type: str
+    catalog_dir:
+        description:
+            - Local directory of a checkpoint catalog. Every checkpoint created is recorded with a snapshot
+              of the running configuration and its diff against the previous checkpoint of the device.
+            - With C(rollback_to), the module fails without connecting when the checkpoint is not in the catalog,
+              and returns the difference between the latest checkpoint and the target as C(impact).
+            - May be the C(backup_dir) of M(networktocode.netauto.ntc_save_config), sharing its snapshots.
+        required: false
+        type: str
+    catalog_name:
+        description:
+            - Name of the device in the catalog. Defaults to C(ntc_host) or C(host).
+        required: false
+        type: str
+    verify:
+        description:
+            - After a rollback, read the running configuration again in the same session and return what the
+              rollback changed as C(rollback_diff).
+            - When the catalog has a snapshot of the checkpoint, the module fails unless the running configuration
+              matches it, and returns the difference as C(remaining_diff).
+        required: false
+        default: false
+        type: bool
+    prune_keep:
+        description:
+            - Forget all but the given number of newest checkpoints of the device in the catalog.
+        required: false
+        type: int
+    prune_older_than:
+        description:
+            - Forget the checkpoints of the device taken more than the given number of days ago.
+        required: false
+        type: int
 """
 
 EXAMPLES = r"""
@@ -69,6 +106,32 @@ EXAMPLES = r"""
 - networktocode.netoauto.ntc_rollback:
     ntc_host: eos1
     rollback_to: backup.cfg
+
+- name: "CHECKPOINT AND RECORD IT IN THE LOCAL CATALOG"
+  networktocode.netauto.ntc_rollback:
+    provider: "{{ nxos_provider }}"
+    checkpoint_file: "pre-change-{{ change_id }}.cfg"
+    catalog_dir: /srv/checkpoints
+
+- name: "ROLL BACK, FAILING EARLY IF THE CHECKPOINT WAS NEVER TAKEN"
+  networktocode.netauto.ntc_rollback:
+    provider: "{{ nxos_provider }}"
+    rollback_to: "pre-change-{{ change_id }}.cfg"
+    catalog_dir: /srv/checkpoints
+
+- name: "KEEP THE LAST 10 CHECKPOINTS IN THE CATALOG, WITHOUT CONNECTING"
+  networktocode.netauto.ntc_rollback:
+    ntc_host: eos1
+    catalog_dir: /srv/checkpoints
+    prune_keep: 10
+
+- name: "PREVIEW, THEN ROLL BACK AND VERIFY IN ONE SESSION"
+  networktocode.netauto.ntc_rollback:
+    provider: "{{ nxos_provider }}"
+    rollback_to: "pre-change-{{ change_id }}.cfg"
+    catalog_dir: /srv/checkpoints
+    verify: true
+  check_mode: "{{ preview | default(false) }}"
 """
 
 RETURN = r"""
@@ -82,6 +145,40 @@ status:
     returned: success
     type: str
     sample: 'rollback executed'
+checkpoint:
+    description: Catalog entry of the checkpoint created, with its diff against the previous checkpoint.
+    returned: when checkpoint_file and catalog_dir are set
+    type: dict
+    sample: {"name": "pre-change-42.cfg", "timestamp": 1665990000.0, "previous": "pre-change-41.cfg",
+             "hash": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+             "diff_hash": "2c26b46b68ffc68ff99b453c1d30413413422d706483bfa0f98a5e886266e7ae",
+             "diff": "--- pre-change-41.cfg\n+++ pre-change-42.cfg\n..."}
+impact:
+    description: Diff from the configuration of the latest checkpoint to the one rolled back to, from the catalog.
+    returned: when rollback_to and catalog_dir are set
+    type: str
+    sample: "--- pre-change-42.cfg\n+++ pre-change-41.cfg\n@@ -4,1 +4,0 @@\n-ntp server 10.0.0.1\n"
+rollback_diff:
+    description: Diff of the running configuration before and after the rollback, or in check mode
+                 between the running configuration and the checkpoint snapshot.
+    returned: when verify is set, in check mode or with --diff
+    type: str
+    sample: "--- running-config\n+++ pre-change-41.cfg\n@@ -4,1 +4,0 @@\n-ntp server 10.0.0.1\n"
+verified:
+    description: Whether the running configuration matches the checkpoint snapshot after the rollback.
+    returned: when verify is set and the catalog has a snapshot of the checkpoint
+    type: bool
+    sample: true
+remaining_diff:
+    description: Diff between the running configuration after the rollback and the checkpoint snapshot.
+    returned: when verify is set and the catalog has a snapshot of the checkpoint
+    type: str
+    sample: ""
+pruned:
+    description: Names of the checkpoints removed from the catalog.
+    returned: when catalog_dir is set
+    type: list
+    sample: ["pre-change-30.cfg"]
 """
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.networktocode.netauto.plugins.module_utils.args_common import (
@@ -89,6 +186,11 @@ from ansible_collections.networktocode.netauto.plugins.module_utils.args_common
     MUTUALLY_EXCLUSIVE,
     REQUIRED_ONE_OF,
 )
+from ansible_collections.networktocode.netauto.plugins.module_utils.backup_store import normalize_config
+from ansible_collections.networktocode.netauto.plugins.module_utils.checkpoint_catalog import (
+    CheckpointCatalog,
+    config_diff,
+)
 
 try:
     HAS_PYNTC = True
@@ -104,6 +206,11 @@ def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statem
     base_argument_spec = dict(
         checkpoint_file=dict(required=False, type="str"),
         rollback_to=dict(required=False, type="str"),
+        catalog_dir=dict(required=False, type="str"),
+        catalog_name=dict(required=False, type="str"),
+        prune_keep=dict(required=False, type="int"),
+        prune_older_than=dict(required=False, type="int"),
+        verify=dict(required=False, type="bool", default=False),
     )
 
     argument_spec = base_argument_spec
@@ -114,7 +221,7 @@ def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statem
         argument_spec=argument_spec,
         mutually_exclusive=MUTUALLY_EXCLUSIVE,
         required_one_of=[REQUIRED_ONE_OF],
-        supports_check_mode=False,
+        supports_check_mode=True,
     )
 
     if not HAS_PYNTC:
@@ -142,6 +249,47 @@ def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statem
     if platform in UNSUPPORTED_PLATFORMS:
         module.fail_json(msg=f"ntc_rollback is not implemented for this platform type {platform}.")
 
+    checkpoint_file = module.params["checkpoint_file"]
+    rollback_to = module.params["rollback_to"]
+    catalog_dir = module.params["catalog_dir"]
+    catalog_name = module.params["catalog_name"] or ntc_host or host
+    prune_keep = module.params["prune_keep"]
+    prune_older_than = module.params["prune_older_than"]
+    verify = module.params["verify"]
+
+    catalog = None
+    target = None
+    results = {}
+    if catalog_dir:
+        catalog = CheckpointCatalog(catalog_dir)
+        if rollback_to:
+            target = catalog.get(catalog_name, rollback_to)
+            if target is None:
+                module.fail_json(msg=f"Checkpoint {rollback_to} of {catalog_name} is not in the catalog.")
+            latest = catalog.checkpoints(catalog_name)[-1]
+            results["impact"] = config_diff(
+                catalog.config(latest), catalog.config(target), latest["name"], target["name"]
+            )
+    if module.check_mode and rollback_to and target is None:
+        module.warn("Without a snapshot of the checkpoint in catalog_dir, the rollback cannot be previewed.")
+        module.exit_json(changed=True, status="rollback would be executed", filename=rollback_to, **results)
+
+    def prune():
+        if catalog is None:
+            return
+        older_than = prune_older_than * 86400 if prune_older_than is not None else None
+        pruned = catalog.prune(catalog_name, keep=prune_keep, older_than=older_than, dry_run=module.check_mode)
+        results["pruned"] = [checkpoint["name"] for checkpoint in pruned]
+
+    if not checkpoint_file and not rollback_to:
+        # Only catalog maintenance, no need to connect.
+        prune()
+        module.exit_json(changed=bool(results.get("pruned")), status=None, filename=None, **results)
+
+    if module.check_mode and checkpoint_file:
+        prune()
+        module.exit_json(changed=True, status="checkpoint file would be created", filename=checkpoint_file, **results)
+
     if ntc_host is not None:
         device = ntc_device_by_name(ntc_host, ntc_conf_file)
     else:
@@ -156,9 +304,6 @@ def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statem
         device_type = platform
         device = ntc_device(device_type, host, username, password, **kwargs)
 
-    checkpoint_file = module.params["checkpoint_file"]
-    rollback_to = module.params["rollback_to"]
-
     argument_check = {"host": host, "username": username, "platform": platform, "password": password}
     for key, val in argument_check.items():
         if val is None:
@@ -169,20 +314,55 @@ def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statem
     status = None
     filename = None
     changed = False
+    diff = None
     try:
         if checkpoint_file:
             device.checkpoint(checkpoint_file)
             status = "checkpoint file created"
-        elif rollback_to:
+            if catalog is not None:
+                entry = catalog.record(catalog_name, checkpoint_file, normalize_config(device.running_config))
+                results["checkpoint"] = dict(entry, diff=catalog.diff(entry))
+            changed = True
+        elif module.check_mode:
+            before = normalize_config(device.running_config)
+            after = catalog.config(target)
+            results["rollback_diff"] = config_diff(before, after, "running-config", rollback_to)
+            diff = dict(before=before, after=after, before_header="running-config", after_header=rollback_to)
+            status = "rollback would be executed"
+            changed = bool(results["rollback_diff"])
+        else:
+            read_back = verify or module._diff  # pylint: disable=protected-access
+            if read_back:
+                before = normalize_config(device.running_config)
             device.rollback(rollback_to)
             status = "rollback executed"
-        changed = True
+            changed = True
+            if read_back:
+                after = normalize_config(device.running_config)
+                results["rollback_diff"] = config_diff(before, after, "running-config", rollback_to)
+                diff = dict(before=before, after=after, before_header="running-config", after_header=rollback_to)
+                changed = before != after
+            if verify and target is not None:
+                expected = catalog.config(target)
+                results["verified"] = after == expected
+                results["remaining_diff"] = config_diff(after, expected, "running-config", rollback_to)
         filename = rollback_to or checkpoint_file
     except Exception as e:  # pylint: disable=broad-except
         module.fail_json(msg=str(e))
 
     device.close()
-    module.exit_json(changed=changed, status=status, filename=filename)
+    if results.get("verified") is False:
+        module.fail_json(
+            msg=f"Running configuration does not match checkpoint {rollback_to} after the rollback.",
+            changed=changed,
+            status=status,
+            filename=filename,
+            **results,
+        )
+    prune()
+    if diff is not None:
+        results["diff"] = diff
+    module.exit_json(changed=changed, status=status, filename=filename, **results)
 
 
 if __name__ == "__main__":
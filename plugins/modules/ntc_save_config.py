@@ -28,7 +28,7 @@ description:
       Optionally, save the running configuration to this computer.
     - Supported platforms include Cisco Nexus switches with NX-API, Cisco IOS switches or routers, Arista switches with eAPI.
 notes:
-    - This module is not idempotent.
+    - This module is not idempotent, unless C(skip_unchanged) is set.
 author: Jason Edelman (@jedelman8)
 version_added: 1.9.2
 requirements:
@@ -49,6 +49,61 @@ options:
         required: false
         default: null
         type: str
+    skip_unchanged:
+        description:
+            - Compare the running and startup configuration first, and skip saving when they match.
+              Both are read in the same session and compared without volatile header lines.
+            - Only applies when saving to the startup configuration, not with C(remote_file).
+            - If the startup configuration cannot be read, the configuration is saved.
+        required: false
+        default: false
+        type: bool
+    backup_dir:
+        description:
+            - Local directory of a backup store to save the running configuration in.
+              Each distinct configuration is stored once, compressed and named by its SHA-256,
+              and a per-device index records when the configuration changed.
+            - Volatile header lines such as C(! Last configuration change at) are removed before hashing,
+              so an unchanged configuration does not create a new backup.
+        required: false
+        type: str
+    backup_name:
+        description:
+            - Name of the device in the backup store index. Defaults to C(ntc_host) or C(host).
+        required: false
+        type: str
+    devices:
+        description:
+            - Devices to save and back up from a single task, with at most C(workers) devices at a time.
+              Each entry takes the same connection options as the module, plus C(name), which defaults to
+              C(ntc_host) or C(host) and is used as the device name in the backup store and manifest.
+            - Connection options given at the module level are used as defaults for every entry.
+            - Requires C(backup_dir). Mutually exclusive with C(host), C(ntc_host) and C(local_file).
+        required: false
+        type: list
+        elements: dict
+    manifest_file:
+        description:
+            - Local file the result of every device is appended to as a JSON line as soon as it finishes,
+              with its status, duration and backup hash.
+            - Devices already recorded as successful are skipped, so running the task again after an
+              interruption only backs up the rest. Use a new file for every backup run.
+        required: false
+        type: str
+    workers:
+        description:
+            - Maximum number of devices backed up at the same time when C(devices) is set.
+        required: false
+        default: 20
+        type: int
+    device_timeout:
+        description:
+            - Seconds after which a device that is still being backed up is recorded as timed out. Its
+              worker slot is only given to the next device once the hung connection gives up; when no slot
+              frees up for as long again, the devices left are recorded as timed out too.
+        required: false
+        default: 300
+        type: int
     global_delay_factor:
         description:
             - Sets delay between operations.
@@ -95,6 +150,34 @@ EXAMPLES = r"""
 - networktocode.netauto.ntc_save_config:
     provider: "{{ nxos_provider }}"
     local_file: config_{{ inventory_hostname }}_{{ ansible_date_time.date | replace('-','_') }}.cfg
+
+- name: "SAVE ONLY WHEN THE RUNNING CONFIG DIFFERS FROM STARTUP"
+  networktocode.netauto.ntc_save_config:
+    provider: "{{ nxos_provider }}"
+    skip_unchanged: true
+
+- name: "NIGHTLY BACKUP, ONLY CHANGED CONFIGURATIONS TAKE SPACE"
+  networktocode.netauto.ntc_save_config:
+    provider: "{{ nxos_provider }}"
+    backup_dir: /srv/backups
+    backup_name: "{{ inventory_hostname }}"
+
+- name: "BACK UP THE WHOLE ESTATE, RESUMING IF THE PREVIOUS RUN WAS INTERRUPTED"
+  networktocode.netauto.ntc_save_config:
+    platform: cisco_ios_ssh
+    username: "{{ username }}"
+    password: "{{ password }}"
+    skip_unchanged: true
+    backup_dir: /srv/backups
+    manifest_file: "/srv/backups/runs/{{ ansible_date_time.date }}.jsonl"
+    workers: 50
+    device_timeout: 120
+    devices:
+      - host: access01
+      - host: access02
+      - name: core01
+        host: 10.0.0.1
+  run_once: true
 """
 
 RETURN = r"""
@@ -114,7 +197,50 @@ remote_save_successful:
     returned: success
     type: bool
     sample: true
+save_skipped:
+    description: Whether saving was skipped because the running and startup configuration already matched.
+    returned: success
+    type: bool
+    sample: false
+backup_hash:
+    description: SHA-256 of the backed up running configuration.
+    returned: when backup_dir is set
+    type: str
+    sample: '9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08'
+backup_new:
+    description: Whether the running configuration differs from the previous backup of the device.
+    returned: when backup_dir is set
+    type: bool
+    sample: false
+backup_file:
+    description: Path of the compressed blob holding the backup.
+    returned: when backup_dir is set
+    type: str
+    sample: '/srv/backups/objects/9f/86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08.gz'
+devices:
+    description: Manifest record of every device backed up in this run.
+    returned: when devices is set
+    type: dict
+    sample: {
+        "access01": {"device": "access01", "status": "ok", "duration": 8.412, "timestamp": 1665990000.0,
+                     "changed": false, "hash": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+                     "new": false, "save_skipped": true},
+        "access02": {"device": "access02", "status": "timeout", "duration": 120.0, "timestamp": 1665990121.0,
+                     "error": "Timed out after 120 seconds"},
+    }
+skipped:
+    description: Devices skipped because C(manifest_file) already recorded them as successful.
+    returned: when devices is set
+    type: list
+    sample: ["core01"]
+failed:
+    description: Devices that failed or timed out.
+    returned: when devices is set
+    type: list
+    sample: ["access02"]
 """
+import time
+
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.networktocode.netauto.plugins.module_utils.args_common import (
     CONNECTION_ARGUMENT_SPEC,
@@ -122,6 +248,9 @@ from ansible_collections.networktocode.netauto.plugins.module_utils.args_common
     NETMIKO_BACKEND,
     REQUIRED_ONE_OF,
 )
+from ansible_collections.networktocode.netauto.plugins.module_utils.backup_store import BackupStore, normalize_config
+from ansible_collections.networktocode.netauto.plugins.module_utils.bulk import STATUS_OK, Manifest, run_pool
+from ansible_collections.networktocode.netauto.plugins.module_utils.fleet import device_from_params, device_params
 
 try:
     HAS_PYNTC = True
@@ -130,13 +259,131 @@ except ImportError:
     HAS_PYNTC = False
 
 
+def save_device(
+    device, remote_file, skip_unchanged, store, backup_name, local_file=None
+):  # pylint: disable=too-many-arguments
+    """Save the configuration of an open device and back it up, returning the module result keys."""
+    running_config = None
+    if store is not None or (skip_unchanged and not remote_file):
+        running_config = normalize_config(device.running_config)
+
+    save_skipped = False
+    if skip_unchanged and not remote_file:
+        try:
+            save_skipped = normalize_config(device.startup_config) == running_config
+        except Exception:  # pylint: disable=broad-except
+            # Without a readable startup config, saving is the safe choice.
+            save_skipped = False
+
+    if save_skipped:
+        remote_save_successful = True
+        changed = False
+    else:
+        if remote_file:
+            remote_save_successful = device.save(remote_file)
+        else:
+            remote_save_successful = device.save()
+        changed = remote_save_successful
+
+    if local_file:
+        device.backup_running_config(local_file)
+        changed = True
+
+    result = dict(remote_save_successful=remote_save_successful, save_skipped=save_skipped)
+    if store is not None:
+        digest, new = store.put(backup_name, running_config)
+        result.update(backup_hash=digest, backup_new=new, backup_file=store.blob_path(digest))
+        changed = changed or new
+    result["changed"] = changed
+    return result
+
+
+def backup_devices(module):  # pylint: disable=too-many-locals
+    """Save and back up every entry of ``devices`` with a bounded pool and exit with per-device results."""
+    if not module.params["backup_dir"]:
+        module.fail_json(msg="backup_dir is required together with devices.")
+    if module.params["local_file"]:
+        module.fail_json(msg="local_file is not supported together with devices, use backup_dir.")
+    if module.params["workers"] < 1:
+        module.fail_json(msg="workers must be at least 1.")
+
+    entries = {}
+    for entry in module.params["devices"]:
+        params = device_params(entry, module.params)
+        if params["name"] is None:
+            module.fail_json(msg="Every device requires one of name, host or ntc_host.", device=entry)
+        if params["name"] in entries:
+            module.fail_json(msg="Device {0} is listed more than once.".format(params["name"]))
+        entries[params["name"]] = params
+
+    remote_file = module.params["remote_file"]
+    skip_unchanged = module.params["skip_unchanged"]
+    store = BackupStore(module.params["backup_dir"])
+    manifest = Manifest(module.params["manifest_file"])
+    delay_kwargs = dict(
+        global_delay_factor=int(module.params["global_delay_factor"]),
+        delay_factor=int(module.params["delay_factor"]),
+    )
+
+    def backup(name):
+        params = entries[name]
+        extra = delay_kwargs if params["platform"] in NETMIKO_BACKEND else {}
+        device = device_from_params(params, **extra)
+        device.open()
+        try:
+            return save_device(device, remote_file, skip_unchanged, store, name)
+        finally:
+            device.close()
+
+    results = {}
+
+    def record(name, status, value, duration):
+        entry = {"device": name, "status": status, "duration": round(duration, 3), "timestamp": time.time()}
+        if status == STATUS_OK:
+            entry.update(
+                changed=value["changed"],
+                hash=value["backup_hash"],
+                new=value["backup_new"],
+                save_skipped=value["save_skipped"],
+            )
+        else:
+            entry["error"] = value
+        manifest.append(entry)
+        results[name] = entry
+
+    skipped = [name for name in entries if manifest.done(name)]
+    todo = [name for name in entries if not manifest.done(name)]
+    run_pool(todo, backup, module.params["workers"], module.params["device_timeout"], record)
+
+    changed = any(result.get("changed") for result in results.values())
+    failed = sorted(name for name, result in results.items() if result["status"] != STATUS_OK)
+    if failed:
+        module.fail_json(
+            msg="Backup failed on {0} of {1} devices".format(len(failed), len(todo)),
+            changed=changed,
+            devices=results,
+            skipped=skipped,
+            failed=failed,
+        )
+    module.exit_json(changed=changed, devices=results, skipped=skipped, failed=failed)
+
+
 def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statements
     """Main execution."""
+    device_spec = dict(name=dict(required=False, type="str"))
+    device_spec.update(CONNECTION_ARGUMENT_SPEC)
     base_argument_spec = dict(
         global_delay_factor=dict(default=1, required=False, type="int"),
         delay_factor=dict(default=1, required=False, type="int"),
         remote_file=dict(required=False, type="str"),
         local_file=dict(required=False, type="str"),
+        backup_dir=dict(required=False, type="str"),
+        backup_name=dict(required=False, type="str"),
+        skip_unchanged=dict(required=False, type="bool", default=False),
+        devices=dict(required=False, type="list", elements="dict", options=device_spec),
+        manifest_file=dict(required=False, type="str"),
+        workers=dict(required=False, type="int", default=20),
+        device_timeout=dict(required=False, type="int", default=300),
     )
     argument_spec = base_argument_spec
     argument_spec.update(CONNECTION_ARGUMENT_SPEC)
@@ -144,8 +391,8 @@ def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statem
 
     module = AnsibleModule(
         argument_spec=argument_spec,
-        mutually_exclusive=MUTUALLY_EXCLUSIVE,
-        required_one_of=[REQUIRED_ONE_OF],
+        mutually_exclusive=MUTUALLY_EXCLUSIVE + [["devices", "host"], ["devices", "ntc_host"]],
+        required_one_of=[REQUIRED_ONE_OF + ["devices"]],
         supports_check_mode=False,
     )
 
@@ -159,6 +406,9 @@ def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statem
         if module.params.get(param) is not False:
             module.params[param] = module.params.get(param) or pvalue
 
+    if module.params["devices"]:
+        backup_devices(module)
+
     platform = module.params["platform"]
     host = module.params["host"]
     username = module.params["username"]
@@ -194,6 +444,10 @@ def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statem
 
     remote_file = module.params["remote_file"]
     local_file = module.params["local_file"]
+    backup_dir = module.params["backup_dir"]
+    backup_name = module.params["backup_name"] or ntc_host or host
+    skip_unchanged = module.params["skip_unchanged"]
+    store = BackupStore(backup_dir) if backup_dir else None
 
     argument_check = {"host": host, "username": username, "platform": platform, "password": password}
     for key, val in argument_check.items():
@@ -201,23 +455,11 @@ def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statem
             module.fail_json(msg=str(key) + " is required")
 
     device.open()
-
-    if remote_file:
-        remote_save_successful = device.save(remote_file)
-    else:
-        remote_save_successful = device.save()
-
-    changed = remote_save_successful
-    if local_file:
-        device.backup_running_config(local_file)
-        changed = True
-
+    result = save_device(device, remote_file, skip_unchanged, store, backup_name, local_file=local_file)
     device.close()
 
     remote_file = remote_file or "(Startup Config)"
-    module.exit_json(
-        changed=changed, remote_save_successful=remote_save_successful, remote_file=remote_file, local_file=local_file
-    )
+    module.exit_json(remote_file=remote_file, local_file=local_file, **result)
 
 
 if __name__ == "__main__":
@@ -32,7 +32,26 @@ requirements:
 extends_documentation_fragment:
   - networktocode.netauto.netauto
   - networktocode.netauto.netauto.command_option
-
+options:
+  snapshot_dir:
+    description:
+      - Local directory of the snapshot store receiving the output of each command, compressed and indexed
+        by device, command and C(snapshot_label). The jdiff action plugin reads it with C(reference_snapshot).
+    required: false
+    type: path
+  snapshot_label:
+    description:
+      - Name of the snapshots written to C(snapshot_dir), such as C(pre_change). A snapshot with the same
+        device, command and label is replaced.
+    required: false
+    default: latest
+    type: str
+  snapshot_device:
+    description:
+      - Device name of the snapshots written to C(snapshot_dir), required with it. Use the same value as
+        C(snapshot_device) of the jdiff action reading them, such as C(inventory_hostname).
+    required: false
+    type: str
 """
 EXAMPLES = r"""
 - hosts: all
@@ -65,6 +84,27 @@ EXAMPLES = r"""
   networktocode.netauto.ntc_show_command:
     commands_file: "list_of_cmds.txt"
     provider: "{{ nxos_provider }}"
+
+- name: Snapshot BGP Neighbors Before The Change
+  networktocode.netauto.ntc_show_command:
+    commands:
+      - show ip bgp neighbors
+    provider: "{{ nxos_provider }}"
+    snapshot_dir: snapshots
+    snapshot_label: pre_change
+    snapshot_device: "{{ inventory_hostname }}"
+"""
+
+RETURN = r"""
+results:
+    description: Output of each command.
+    returned: success
+    type: list
+snapshots:
+    description: Snapshot files written, one per command.
+    returned: when snapshot_dir is set
+    type: list
+    sample: ["snapshots/nxos-spine1/show_ip_bgp_neighbors-2f1c07a3/pre_change.jsonl.gz"]
 """
 
 from ansible.module_utils.basic import AnsibleModule
@@ -73,6 +113,7 @@ from ansible_collections.networktocode.netauto.plugins.module_utils.args_common
     MUTUALLY_EXCLUSIVE,
     REQUIRED_ONE_OF,
 )
+from ansible_collections.networktocode.netauto.plugins.module_utils.snapshot_store import SnapshotStore
 
 try:
     HAS_PYNTC = True
@@ -86,6 +127,9 @@ def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statem
     base_argument_spec = dict(
         commands=dict(required=False, type="list"),
         commands_file=dict(required=False, default=None, type="str"),
+        snapshot_dir=dict(required=False, type="path"),
+        snapshot_label=dict(required=False, type="str", default="latest"),
+        snapshot_device=dict(required=False, type="str"),
     )
     argument_spec = base_argument_spec
     argument_spec.update(CONNECTION_ARGUMENT_SPEC)
@@ -95,6 +139,7 @@ def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statem
         argument_spec=argument_spec,
         supports_check_mode=False,
         mutually_exclusive=MUTUALLY_EXCLUSIVE,
+        required_by={"snapshot_dir": "snapshot_device"},
         required_one_of=[REQUIRED_ONE_OF],
     )
 
@@ -158,9 +203,24 @@ def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statem
     result = device.show(commands)
     device.close()
 
+    snapshots = {}
+    if module.params["snapshot_dir"]:
+        store = SnapshotStore(module.params["snapshot_dir"])
+        snapshot_device = module.params["snapshot_device"]
+        outputs = result if isinstance(result, list) and len(result) == len(commands) else [result]
+        try:
+            paths = [
+                store.save(snapshot_device, command, module.params["snapshot_label"], output)
+                for command, output in zip(commands, outputs)
+            ]
+        except (IOError, OSError, ValueError) as err:
+            module.fail_json(msg="Unable to write snapshot: {0}".format(err), results=result)
+        snapshots["snapshots"] = paths
+
     module.exit_json(
         changed=False,
         results=result,
+        **snapshots,
     )
 
 
@@ -0,0 +1,366 @@
+#!/usr/bin/python
+
+# Copyright 2022 Network to Code
+# Network to Code, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+DOCUMENTATION = r"""
+---
+module: ntc_upgrade_os
+short_description: Upgrade the operating system of many devices in parallel while respecting redundancy groups
+description:
+    - Stage an image on every device in parallel, then install it and reboot as many devices at once
+      as the redundancy groups allow, and verify each device booted the expected image.
+    - Combines what would otherwise be ntc_file_copy, ntc_install_os and ntc_reboot tasks run with C(serial).
+    - Progress is written to C(checkpoint_file) after every step, so an interrupted run picks up where it stopped.
+notes:
+    - Run this module once for the whole fleet, for example with C(run_once) and C(connection: local).
+    - Connection options given at the module level are used as defaults for every entry in C(devices).
+    - When a device fails, the devices of its redundancy group that have not started yet are not upgraded.
+author: Network to Code (@networktocode)
+requirements:
+    - pyntc
+extends_documentation_fragment:
+  - networktocode.netauto.netauto
+options:
+    devices:
+        description:
+            - Devices to upgrade. Each entry takes the same connection options as the module,
+              plus C(name) and C(redundancy_group).
+            - C(name) defaults to C(ntc_host) or C(host) and is used as key in the results and checkpoint.
+            - Devices that share a C(redundancy_group) are never upgraded more than C(group_parallel) at a time.
+        required: true
+        type: list
+        elements: dict
+    system_image_file:
+        description:
+            - Name of the system (or combined) image file on flash.
+        required: true
+        type: str
+    kickstart_image_file:
+        description:
+            - Name of the kickstart image file on flash.
+        required: false
+        type: str
+    volume:
+        description:
+            - Volume name - required argument for F5 platform.
+        required: false
+        type: str
+    install_mode:
+        description:
+            - Determines whether OS support install mode.
+        required: false
+        type: bool
+    local_file:
+        description:
+            - Path to the local image to stage on every device as C(system_image_file).
+              If omitted, the image must already be on the devices.
+        required: false
+        type: str
+    file_system:
+        description:
+            - The remote file system to stage the image on. If omitted, the device default is used.
+        required: false
+        type: str
+    max_parallel:
+        description:
+            - Maximum number of devices staged or upgraded at the same time.
+        required: false
+        default: 10
+        type: int
+    group_parallel:
+        description:
+            - Maximum number of devices of the same redundancy group upgraded at the same time.
+        required: false
+        default: 1
+        type: int
+    checkpoint_file:
+        description:
+            - Local file recording the progress of every device. Devices already verified are skipped on the next run.
+            - Progress recorded for another image is discarded, so the file may be reused for the next upgrade.
+        required: false
+        type: str
+    timeout:
+        description:
+            - Time in seconds to wait for each device to come back after installing the image.
+        required: false
+        default: 900
+        type: int
+"""
+
+EXAMPLES = r"""
+- name: "ROLLING UPGRADE OF A LEAF FABRIC"
+  networktocode.netauto.ntc_upgrade_os:
+    platform: cisco_nxos_nxapi
+    username: "{{ username }}"
+    password: "{{ password }}"
+    local_file: images/nxos.9.3.10.bin
+    system_image_file: nxos.9.3.10.bin
+    checkpoint_file: upgrade-2022-10.json
+    max_parallel: 20
+    devices:
+      - host: leaf01a
+        redundancy_group: leaf01
+      - host: leaf01b
+        redundancy_group: leaf01
+      - host: leaf02a
+        redundancy_group: leaf02
+      - host: leaf02b
+        redundancy_group: leaf02
+  run_once: true
+"""
+
+RETURN = r"""
+devices:
+    description: Final phase of every device, with timings and error or boot options where available.
+    returned: always
+    type: dict
+    sample: {
+        "leaf01a": {"phase": "verified", "timings": {"stage": 81.2, "install": 402.9, "verify": 12.1},
+                    "boot_options": {"sys": "nxos.9.3.10.bin"}},
+        "leaf01b": {"phase": "failed", "error": "Device did not boot nxos.9.3.10.bin"},
+    }
+blocked:
+    description: Devices not upgraded because another member of their redundancy group failed.
+    returned: always
+    type: list
+    sample: ["leaf02b"]
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait  # noqa E402
+
+from ansible.module_utils.basic import AnsibleModule  # noqa E402
+from ansible_collections.networktocode.netauto.plugins.module_utils.args_common import (
+    CONNECTION_ARGUMENT_SPEC,
+    MUTUALLY_EXCLUSIVE,
+)
+from ansible_collections.networktocode.netauto.plugins.module_utils.fleet import (
+    DEVICE_ERRORS,
+    HAS_PYNTC,
+    device_from_params,
+    device_params,
+)
+from ansible_collections.networktocode.netauto.plugins.module_utils.upgrade import (
+    PHASE_FAILED,
+    PHASE_INSTALLED,
+    PHASE_STAGED,
+    PHASE_VERIFIED,
+    RollingScheduler,
+    UpgradeCheckpoint,
+    reached,
+)
+from ansible_collections.networktocode.netauto.plugins.module_utils.wait import (
+    Deadline,
+    PhaseTimer,
+    wait_until,
+)
+
+
+def stage_image(params, local_file, remote_file, file_system):
+    """Copy the image to the device unless it is already there."""
+    phases = PhaseTimer()
+    fs_kwargs = {"file_system": file_system} if file_system else {}
+    with phases.phase("stage"):
+        device = device_from_params(params)
+        device.open()
+        if not device.file_copy_remote_exists(local_file, remote_file, **fs_kwargs):
+            device.file_copy(local_file, remote_file, **fs_kwargs)
+        device.close()
+    return phases.timings
+
+
+def image_status(params, image):
+    """Return whether the device booted ``image`` and its boot options, or None when unreachable."""
+    try:
+        device = device_from_params(params)
+        device.open()
+        boot_options = device.get_boot_options()
+        if hasattr(device, "_image_booted"):
+            booted = device._image_booted(  # pylint: disable=protected-access
+                image_name=image["image_name"], kickstart=image["kickstart"], volume=image["volume"]
+            )
+        else:
+            booted = boot_options.get("sys") == image["image_name"]
+        device.close()
+    except DEVICE_ERRORS:
+        return None
+    return {"booted": booted, "boot_options": boot_options}
+
+
+def upgrade_device(name, params, image, checkpoint, timeout):
+    """Install, reboot and verify one device, recording progress in ``checkpoint``."""
+    phases = PhaseTimer()
+    try:
+        if not reached(checkpoint.phase(name), PHASE_INSTALLED):
+            with phases.phase("install"):
+                device = device_from_params(params)
+                device.open()
+                device.install_os(**image)
+                try:
+                    device.close()
+                except Exception:  # pylint: disable=broad-except
+                    pass
+            checkpoint.update(name, PHASE_INSTALLED)
+
+        with phases.phase("verify"):
+            status = wait_until(lambda: image_status(params, image), Deadline(timeout))
+        if status is None:
+            raise RuntimeError("Device did not come back within {0} seconds".format(timeout))
+        if not status["booted"]:
+            raise RuntimeError("Device did not boot {0}".format(image["image_name"]))
+    except Exception as err:  # pylint: disable=broad-except
+        checkpoint.update(name, PHASE_FAILED, error=getattr(err, "message", str(err)))
+        return False, phases.timings
+
+    checkpoint.update(name, PHASE_VERIFIED, boot_options=status["boot_options"])
+    return True, phases.timings
+
+
+def main():  # pylint: disable=too-many-locals,too-many-branches,too-many-statements
+    """Main execution."""
+    device_spec = dict(
+        name=dict(required=False, type="str"),
+        redundancy_group=dict(required=False, type="str"),
+    )
+    device_spec.update(CONNECTION_ARGUMENT_SPEC)
+    base_argument_spec = dict(
+        devices=dict(required=True, type="list", elements="dict", options=device_spec),
+        system_image_file=dict(required=True, type="str"),
+        kickstart_image_file=dict(required=False, type="str"),
+        volume=dict(required=False, type="str"),
+        install_mode=dict(required=False, type="bool", default=None),
+        local_file=dict(required=False, type="str"),
+        file_system=dict(required=False, type="str"),
+        max_parallel=dict(required=False, type="int", default=10),
+        group_parallel=dict(required=False, type="int", default=1),
+        checkpoint_file=dict(required=False, type="str"),
+        timeout=dict(required=False, type="int", default=900),
+    )
+    argument_spec = base_argument_spec
+    argument_spec.update(CONNECTION_ARGUMENT_SPEC)
+    argument_spec["provider"] = dict(required=False, type="dict", options=CONNECTION_ARGUMENT_SPEC)
+
+    module = AnsibleModule(
+        argument_spec=argument_spec,
+        mutually_exclusive=MUTUALLY_EXCLUSIVE,
+        supports_check_mode=False,
+    )
+
+    if not HAS_PYNTC:
+        module.fail_json(msg="pyntc is required for this module.")
+
+    provider = module.params["provider"] or {}
+
+    # allow local params to override provider
+    for param, pvalue in provider.items():
+        if module.params.get(param) is not False:
+            module.params[param] = module.params.get(param) or pvalue
+
+    max_parallel = module.params["max_parallel"]
+    group_parallel = module.params["group_parallel"]
+    local_file = module.params["local_file"]
+    file_system = module.params["file_system"]
+    timeout = module.params["timeout"]
+    image = {
+        "image_name": module.params["system_image_file"],
+        "kickstart": module.params["kickstart_image_file"],
+        "volume": module.params["volume"],
+    }
+    if module.params["install_mode"] is not None:
+        image["install_mode"] = module.params["install_mode"]
+
+    if max_parallel < 1 or group_parallel < 1:
+        module.fail_json(msg="max_parallel and group_parallel must be at least 1.")
+
+    entries = {}
+    for entry in module.params["devices"]:
+        params = device_params(entry, module.params)
+        if params["name"] is None:
+            module.fail_json(msg="Every device requires one of name, host or ntc_host.", device=entry)
+        if params["name"] in entries:
+            module.fail_json(msg="Device {0} is listed more than once.".format(params["name"]))
+        entries[params["name"]] = params
+
+    checkpoint = UpgradeCheckpoint(module.params["checkpoint_file"], image)
+    timings = {name: {} for name in entries}
+
+    if local_file:
+        with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+            futures = {}
+            for name, params in entries.items():
+                if not reached(checkpoint.phase(name), PHASE_STAGED):
+                    futures[pool.submit(stage_image, params, local_file, image["image_name"], file_system)] = name
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    timings[name].update(future.result())
+                except Exception as err:  # pylint: disable=broad-except
+                    checkpoint.update(name, PHASE_FAILED, error=getattr(err, "message", str(err)))
+                else:
+                    checkpoint.update(name, PHASE_STAGED)
+
+    # Devices whose image could not be staged are left out, and block their group like a failed upgrade:
+    # a member that may be down must not lose its peer too.
+    to_upgrade = []
+    unstaged = []
+    for name, params in entries.items():
+        phase = checkpoint.phase(name)
+        if phase == PHASE_VERIFIED:
+            continue
+        if local_file and not reached(phase, PHASE_STAGED):
+            unstaged.append(params.get("redundancy_group"))
+            continue
+        to_upgrade.append((name, params.get("redundancy_group")))
+    scheduler = RollingScheduler(to_upgrade, max_parallel=max_parallel, group_limit=group_parallel)
+    for group in unstaged:
+        scheduler.block(group)
+    changed = False
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        running = {}
+        while not scheduler.done():
+            for name in scheduler.ready():
+                running[pool.submit(upgrade_device, name, entries[name], image, checkpoint, timeout)] = name
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                success, device_timings = future.result()
+                timings[name].update(device_timings)
+                changed = True
+                scheduler.finish(name, success)
+
+    results = {}
+    for name in entries:
+        results[name] = dict(checkpoint.devices.get(name, {"phase": None}))
+        if timings[name]:
+            results[name]["timings"] = timings[name]
+
+    failed = [name for name, result in results.items() if result["phase"] != PHASE_VERIFIED]
+    if failed:
+        module.fail_json(
+            msg="Upgrade did not complete on {0}".format(", ".join(sorted(failed))),
+            changed=changed,
+            devices=results,
+            blocked=scheduler.blocked,
+        )
+
+    module.exit_json(changed=changed, devices=results, blocked=scheduler.blocked)
+
+
+if __name__ == "__main__":
+    main()
@@ -38,16 +38,44 @@ options:
       - Each key that requires validation mush also be the value for the "name" key in one of the
         C(scope) dictionaries.
       - A good strategy would be to use hostvars[inventory_hostname] to get all vars for the host
-    required: true
+      - One of C(data), C(data_file), C(batch_data) or C(batch_hosts) is required.
+    required: false
     type: dict
+  data_file:
+    description:
+      - Local JSON file holding a very large array, the value of the single feature in C(scope), such as a
+        routing or MAC table export. A file of JSON lines, one element per line, is also accepted.
+      - Elements are read incrementally and validated one by one against the C(items) schema of the
+        feature, so memory stays bounded and validation stops after C(max_errors) violations.
+      - Of the keywords applying to the array as a whole, C(minItems), C(maxItems), C(uniqueItems) and
+        C(contains) are enforced, C(uniqueItems) keeping a digest of every element. A feature schema using
+        any other, such as C(allOf) or C(prefixItems), is rejected.
+    required: false
+    type: path
+  max_errors:
+    description:
+      - Number of violations after which validation of C(data_file) stops.
+    required: false
+    default: 100
+    type: int
   schema:
     description:
       - The schema that the C(data) must adhere to.
       - Each key should have another dictionary as its value.
       - The dictionary defined for each schema requires a 'type' key defining the expected data type.
       - Valid data types are defined by jsonschema L($Find link for data types)
-    required: true
+      - Required unless C(schema_dir) is set.
+    required: false
     type: dict
+  schema_dir:
+    description:
+      - Local directory of JSON and YAML schema files, loaded once per run into a registry that resolves
+        C($ref) by path relative to the directory (for example C(common/vlan.json#/definitions/id)) or by
+        C($id). References outside the directory fail, nothing is fetched from the network.
+      - A scoped feature without an entry in C(schema) is validated against the file of the directory
+        named after it, such as C(vlans.json) or C(vlans.yml).
+    required: false
+    type: path
   scope:
     description:
       - The features in C(data) which should be validated against the defined C(schema).
@@ -55,6 +83,66 @@ options:
       - The "required" key is used to validate whether the C(data) must be present.
     required: true
     type: list
+  cache_dir:
+    description:
+      - Local directory remembering which schemas already passed the metaschema check, so later runs skip it.
+        With C(engine=codegen), it also keeps the code generated for each schema.
+      - Independently of this option, each distinct schema is checked and compiled once per run and the
+        validator is reused for every feature sharing it.
+    required: false
+    type: path
+  engine:
+    description:
+      - With C(codegen), each schema is translated into specialized Python code, cached in C(cache_dir) by
+        schema hash, that accepts valid data much faster than the jsonschema validator on large lists.
+      - Invalid data is validated again with jsonschema, so error messages are identical with both engines.
+      - Schemas using keywords the generator does not translate, such as C($ref), C(format), C(anyOf) or
+        C(patternProperties), are validated with jsonschema.
+    required: false
+    default: jsonschema
+    choices: [jsonschema, codegen]
+    type: str
+  result_cache:
+    description:
+      - Local file recording the features found valid, keyed by the hashes of their schema, name and data.
+      - Features whose schema and data did not change since they were found valid are not validated
+        again, and are reported in C(previously_validated) (C(skipped_features) in batch mode).
+      - Entries unused for 30 days are dropped.
+    required: false
+    type: path
+  collect_errors:
+    description:
+      - Validate every feature in C(scope) and report all violations at once in C(errors), each with the
+        JSON path of the offending value, instead of failing on the first invalid feature.
+    required: false
+    default: false
+    type: bool
+  batch_data:
+    description:
+      - Data of many hosts to validate in one task, as a mapping of host name to the data of that host.
+      - Hosts are validated by a pool of C(workers) processes, each compiling every schema once. The result
+        is a compact pass/fail summary; every violation is written to C(errors_file).
+    required: false
+    type: dict
+  batch_hosts:
+    description:
+      - Inventory hosts to validate in one task, for example C({{ ansible_play_hosts }}) with C(run_once).
+      - The scoped features are read from C(hostvars) by the action plugin and validated on the controller
+        like C(batch_data), without passing the data of every host through the module arguments.
+    required: false
+    type: list
+    elements: str
+  workers:
+    description:
+      - Number of processes validating C(batch_data) or C(batch_hosts). Defaults to the number of CPUs.
+    required: false
+    type: int
+  errors_file:
+    description:
+      - Local file receiving every violation found in batch mode, one JSON object per line with its host.
+      - With C(data_file), violations are written as they are found.
+    required: false
+    type: path
 """
 
 EXAMPLES = r"""
@@ -80,70 +168,284 @@ EXAMPLES = r"""
       - name: "hostname"
         required: true
       - name: "vlans"
+
+- name: "REPORT EVERY VIOLATION IN ONE RUN"
+  networktocode.netauto.ntc_validate_schema:
+    schema: "{{ my_schema }}"
+    data: "{{ hostvars[inventory_hostname] }}"
+    scope: "{{ scope }}"
+    collect_errors: true
+
+- name: "VALIDATE EVERY HOST OF THE PLAY IN ONE TASK"
+  networktocode.netauto.ntc_validate_schema:
+    schema: "{{ my_schema }}"
+    scope: "{{ scope }}"
+    batch_hosts: "{{ ansible_play_hosts }}"
+    errors_file: schema-errors.jsonl
+  run_once: true
+
+- name: "VALIDATE A LARGE ROUTING TABLE EXPORT"
+  networktocode.netauto.ntc_validate_schema:
+    schema:
+      routes:
+        type: array
+        items: "{{ route_schema }}"
+    scope:
+      - name: routes
+    data_file: exports/rib.jsonl
+    errors_file: rib-errors.jsonl
+
+- name: "VALIDATE AGAINST A DIRECTORY OF SCHEMAS USING $ref"
+  networktocode.netauto.ntc_validate_schema:
+    schema_dir: schemas/
+    data: "{{ hostvars[inventory_hostname] }}"
+    scope:
+      - name: interfaces
+      - name: vlans
+
+- name: "ONLY VALIDATE FEATURES CHANGED SINCE THE LAST RUN"
+  networktocode.netauto.ntc_validate_schema:
+    schema: "{{ my_schema }}"
+    scope: "{{ scope }}"
+    batch_hosts: "{{ ansible_play_hosts }}"
+    result_cache: ~/.cache/ntc_schemas/results.json
+  run_once: true
+
+- name: "VALIDATE LARGE INTERFACE LISTS WITH GENERATED CODE"
+  networktocode.netauto.ntc_validate_schema:
+    schema: "{{ my_schema }}"
+    data: "{{ hostvars[inventory_hostname] }}"
+    scope: "{{ scope }}"
+    engine: codegen
+    cache_dir: ~/.cache/ntc_schemas
 """
 
 RETURN = r"""
-# Default return values
+errors:
+    description: Every violation found, with the feature, the JSON path of the value and the error message.
+    returned: when collect_errors or data_file is set
+    type: list
+    sample: [
+        {"feature": "vlans", "path": "$.vlans[1]", "message": "5000 is greater than the maximum of 4094",
+         "validator": "maximum"},
+        {"feature": "hostname", "path": "$.hostname", "message": "Feature hostname required, but not found"},
+    ]
+items:
+    description: Number of elements of C(data_file) validated.
+    returned: when data_file is set
+    type: int
+    sample: 912345
+truncated:
+    description: Whether validation of C(data_file) stopped after C(max_errors) violations.
+    returned: when data_file is set
+    type: bool
+    sample: false
+previously_validated:
+    description: Features not validated again because their schema and data were found valid before.
+    returned: when result_cache is set
+    type: list
+    sample: ["hostname", "vlans"]
+skipped_features:
+    description: Number of host features not validated again because they were found valid before.
+    returned: in batch mode, when result_cache is set
+    type: int
+    sample: 31994
+hosts:
+    description: Number of hosts validated.
+    returned: in batch mode
+    type: int
+    sample: 8000
+passed:
+    description: Number of hosts without violations.
+    returned: in batch mode
+    type: int
+    sample: 7998
+failed_hosts:
+    description: Number of violations of every host that failed validation.
+    returned: in batch mode
+    type: dict
+    sample: {"leaf17": 3, "spine02": 1}
 """
 
-from ansible.module_utils.basic import AnsibleModule
+import os
 
-try:
-    from jsonschema import FormatChecker, SchemaError, validate, ValidationError
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.networktocode.netauto.plugins.module_utils.schema_registry import load_registry
+from ansible_collections.networktocode.netauto.plugins.module_utils.schema_validation import (
+    HAS_JSONSCHEMA,
+    MALFORMED_SCOPE,
+    ResultCache,
+    canonical_json,
+    feature_errors,
+    iter_items,
+    malformed_scope_item,
+    shared_cache,
+    stream_errors,
+    unstreamed_keywords,
+    summarize_hosts,
+    validate_hosts,
+    validate_schema,
+)
 
-    HAS_LIB = True
-except ImportError:
-    HAS_LIB = False
 
+def validate_file(module, schema, scope, cache):
+    """Validate the elements of ``data_file`` one by one and exit the module."""
+    malformed = malformed_scope_item(scope)
+    if malformed is not None:
+        module.fail_json(msg=MALFORMED_SCOPE.format(malformed))
+    if len(scope) != 1:
+        module.fail_json(msg="data_file holds the data of a single feature, scope must have exactly one item.")
+    feature = scope[0]["name"]
+    feature_schema = schema.get(feature)
+    if not isinstance(feature_schema, dict) or not isinstance(feature_schema.get("items"), dict):
+        module.fail_json(msg="data_file requires the schema of feature {0} to define its items.".format(feature))
+    unstreamed = unstreamed_keywords(feature_schema)
+    if unstreamed:
+        module.fail_json(
+            msg="The schema of feature {0} uses keywords data_file cannot enforce: {1}".format(
+                feature, ", ".join(unstreamed)
+            )
+        )
 
-def validate_schema(schema, data):
-    """Validate schema is correct."""
+    max_errors = module.params["max_errors"]
+    errors_file = module.params["errors_file"]
+    errors = []
+    count = 0
+    truncated = False
+    handle = open(errors_file, "w") if errors_file else None
     try:
-        validate(data, schema, format_checker=FormatChecker())
-    except ValidationError as err:
-        return False, "ValidationError: {0}".format(err.message)
-    except SchemaError as err:
-        return False, "SchemaError: {0}".format(err.message)
-    except Exception as err:  # pylint: disable=broad-except
-        return False, "UnknownError: {0}".format(err)
-    return True, ""
+        with open(module.params["data_file"], "r") as data_file:
+            for count, found in stream_errors(feature, feature_schema, iter_items(data_file), cache):
+                for error in found:
+                    errors.append(error)
+                    if handle is not None:
+                        handle.write(canonical_json(error) + "\n")
+                if len(errors) >= max_errors:
+                    truncated = True
+                    break
+    except (IOError, OSError) as err:
+        module.fail_json(msg="Unable to read data_file: {0}".format(err))
+    except ValueError as err:
+        module.fail_json(msg="Invalid JSON in data_file after {0} items: {1}".format(count, err), errors=errors)
+    finally:
+        if handle is not None:
+            handle.close()
+
+    result = dict(items=count, errors=errors, truncated=truncated)
+    if errors:
+        module.fail_json(
+            msg="{0} schema violations in the first {1} items of {2}".format(len(errors), count, feature), **result
+        )
+    module.exit_json(changed=False, **result)
 
 
 def main():
     """Main execution."""
     argument_spec = dict(
-        schema=dict(required=True, type="dict"),
-        data=dict(required=True, type="dict"),
+        schema=dict(required=False, type="dict"),
+        schema_dir=dict(required=False, type="path"),
+        data=dict(required=False, type="dict"),
+        data_file=dict(required=False, type="path"),
+        max_errors=dict(required=False, type="int", default=100),
         scope=dict(required=True, type="list"),
+        cache_dir=dict(required=False, type="path"),
+        engine=dict(required=False, type="str", default="jsonschema", choices=["jsonschema", "codegen"]),
+        result_cache=dict(required=False, type="path"),
+        collect_errors=dict(required=False, type="bool", default=False),
+        batch_data=dict(required=False, type="dict"),
+        batch_hosts=dict(required=False, type="list", elements="str"),
+        workers=dict(required=False, type="int"),
+        errors_file=dict(required=False, type="path"),
     )
 
-    module = AnsibleModule(argument_spec=argument_spec, supports_check_mode=False)
+    module = AnsibleModule(
+        argument_spec=argument_spec,
+        mutually_exclusive=[["data", "data_file", "batch_data", "batch_hosts"]],
+        required_one_of=[["data", "data_file", "batch_data", "batch_hosts"], ["schema", "schema_dir"]],
+        supports_check_mode=False,
+    )
 
-    if not HAS_LIB:
+    if not HAS_JSONSCHEMA:
         module.fail_json(msg="jsonschema is required for this module.")
 
-    schema = module.params["schema"]
+    if module.params["batch_hosts"] is not None:
+        module.fail_json(msg="batch_hosts is handled by the ntc_validate_schema action plugin on the controller.")
+
+    schema = module.params["schema"] or {}
     data = module.params["data"]
     scope = module.params["scope"]
+    schema_dir = module.params["schema_dir"]
+    salt = ""
+    if schema_dir:
+        if not os.path.isdir(schema_dir):
+            module.fail_json(msg="schema_dir {0} is not a directory.".format(schema_dir))
+        registry = load_registry(schema_dir)
+        schema = registry.complete(schema, scope)
+        salt = registry.digest
+    results = ResultCache(module.params["result_cache"], salt=salt) if module.params["result_cache"] else None
+
+    if module.params["batch_data"] is not None:
+        malformed = malformed_scope_item(scope)
+        if malformed is not None:
+            module.fail_json(msg=MALFORMED_SCOPE.format(malformed))
+        host_results = validate_hosts(
+            schema,
+            scope,
+            module.params["batch_data"],
+            workers=module.params["workers"],
+            cache_dir=module.params["cache_dir"],
+            engine=module.params["engine"],
+            result_cache=results,
+            schema_dir=schema_dir,
+        )
+        summary = summarize_hosts(host_results, module.params["errors_file"])
+        if results is not None:
+            results.save()
+            summary["skipped_features"] = results.hits
+        if summary["failed_hosts"]:
+            module.fail_json(
+                msg="{0} of {1} hosts failed schema validation".format(len(summary["failed_hosts"]), summary["hosts"]),
+                **summary,
+            )
+        module.exit_json(changed=False, **summary)
+
+    cache = shared_cache(module.params["cache_dir"], module.params["engine"], schema_dir)
+    if module.params["data_file"] is not None:
+        validate_file(module, schema, scope, cache)
+
+    collect_errors = module.params["collect_errors"]
+    errors = []
+    previously_validated = []
 
     for item in scope:
         # Make sure scope had a "name" key
         try:
             feature = item["name"]
         except KeyError:
-            module.fail_json(
-                msg="Malformed list item {0}, "  # noqa  # pylint: disable=missing-format-argument-key
-                'should be in format similar to {"name": "feature", "required": True}'.format(item)
-            )
+            module.fail_json(msg=MALFORMED_SCOPE.format(item))
         required = item.get("required")
         entry_data = data.get(feature)
 
+        key = None
+        if results is not None and entry_data is not None and schema.get(feature) is not None:
+            key = results.key(results.schema_digest(schema[feature]), feature, entry_data)
+            if results.validated(key):
+                previously_validated.append(feature)
+                continue
+
+        if collect_errors:
+            found = feature_errors(feature, schema.get(feature), entry_data, required, cache)
+            if key and not found:
+                results.add(key)
+            errors.extend(found)
+            continue
+
         # Provide schema validation against data when data is present
         if entry_data is not None:
             entry_schema = schema.get(feature)
             # Validate the data against the schema when data is propely defined
             if entry_schema is not None:
-                status, msg = validate_schema(entry_schema, entry_data)
+                status, msg = validate_schema(entry_schema, entry_data, cache)
             # Provide module.fail_json data when there is no schema defined for current required feature
             else:
                 status = False
@@ -156,8 +458,13 @@ def main():
         else:
             status = True
 
+        if key and status:
+            results.add(key)
+
         # Fail the module when it did not pass validation or data/schema data was invalid
         if not status:
+            if results is not None:
+                results.save()
             resp = {
                 "data": entry_data,
                 "schema": entry_schema,
@@ -166,7 +473,16 @@ def main():
             }
             module.fail_json(**resp)
 
-    module.exit_json(changed=False)
+    extra = {}
+    if collect_errors:
+        extra["errors"] = errors
+    if results is not None:
+        results.save()
+        extra["previously_validated"] = previously_validated
+    if errors:
+        features = sorted(set(error["feature"] for error in errors))
+        module.fail_json(msg="{0} schema violations in {1}".format(len(errors), ", ".join(features)), **extra)
+    module.exit_json(changed=False, **extra)
 
 
 if __name__ == "__main__":
@@ -61,3 +61,321 @@ def test_invalid_args_no_value_to_compare():
     with pytest.raises(AnsibleError) as exc:
         main(args)
     assert str(exc.value) == "Key 'value_to_compare' missing in 'evaluate_arguments'."
+
+
+def test_checks_batch():
+    pre = {"10.1.0.0": {"ipv4": {"state": "up", "accepted_prefixes": 100}, "uptime": 10}}
+    post = {"10.1.0.0": {"ipv4": {"state": "up", "accepted_prefixes": 80}, "uptime": 20}}
+    args = {
+        "evaluate_args": {"reference_data": pre, "value_to_compare": post},
+        "checks": [
+            {"name": "state", "check_type": "exact_match", "jmespath": "*.ipv4.[state]"},
+            {"name": "prefixes", "check_type": "tolerance", "jmespath": "*.ipv4.[accepted_prefixes]",
+             "evaluate_args": {"tolerance": 10}},
+            {"check_type": "exact_match", "exclude": ["uptime"]},
+            {"check_type": "exact_match"},
+        ],
+    }
+    result = main(args)
+    assert result["success"] is False
+    assert result["checks"]["state"] == {"success": True, "fail_details": {}}
+    assert result["checks"]["prefixes"]["success"] is False
+    assert result["checks"]["2_exact_match"]["success"] is False
+    assert sorted(result["fail_details"]) == ["2_exact_match", "3_exact_match", "prefixes"]
+    # exclude only applies to its own check
+    assert "uptime" in str(result["fail_details"]["3_exact_match"])
+    assert "uptime" in post["10.1.0.0"]
+
+
+def test_checks_mix_check_types():
+    pre = {"10.1.0.0": {"ipv4": {"state": "up", "accepted_prefixes": 100}}}
+    post = {"10.1.0.0": {"ipv4": {"state": "up", "accepted_prefixes": 80}}}
+    args = {
+        "evaluate_args": {"reference_data": pre, "value_to_compare": post},
+        "checks": [
+            {"name": "state", "check_type": "exact_match", "jmespath": "*.ipv4.[state]"},
+            {"name": "prefixes", "check_type": "operator", "jmespath": "$*$.ipv4.[accepted_prefixes]",
+             "evaluate_args": {"params": {"params": {"mode": "is-gt", "operator_data": 50}}}},
+            {"name": "state_regex", "check_type": "regex", "jmespath": "$*$.ipv4.[state]",
+             "evaluate_args": {"regex": "^up$", "mode": "match"}},
+            {"name": "peer", "check_type": "parameter_match", "jmespath": "$*$.ipv4.[state]",
+             "evaluate_args": {"mode": "match", "params": {"state": "down"}}},
+        ],
+    }
+    result = main(args)
+    assert {name: check["success"] for name, check in result["checks"].items()} == {
+        "state": True, "prefixes": True, "state_regex": True, "peer": False,
+    }
+
+
+def test_checks_invalid_check():
+    args = {"evaluate_args": {"value_to_compare": {}}, "checks": [{"jmespath": "*"}]}
+    with pytest.raises(AnsibleError) as exc:
+        main(args)
+    assert str(exc.value) == "Check 0 must be a dict with a 'check_type' key."
+
+
+BGP = {
+    "global": {
+        "peers": {
+            "10.1.0.0": {"address_family": {"ipv4": {"accepted_prefixes": 100}}},
+            "10.2.0.0": {"address_family": {"ipv4": {"accepted_prefixes": 7}}},
+        }
+    },
+    "vpn": {"peers": {"10.1.0.0": {"address_family": {"ipv4": {"accepted_prefixes": 3}}}}},
+}
+PEERS = {"peers": [{"ip": "10.2.0.0", "linkType": "external"}, {"ip": "10.1.0.0", "linkType": "internal"}]}
+
+
+@pytest.mark.parametrize(
+    "data, path",
+    [
+        (BGP, "*.peers.*.*.ipv4.[accepted_prefixes]"),
+        (BGP, "$*$.peers.$*$.*.ipv4.[accepted_prefixes]"),
+        (BGP["global"], "peers.$*$.*.ipv4.[accepted_prefixes]"),
+        (PEERS, "peers[*].[$ip$,linkType]"),
+        (PEERS, "peers[*].[ip,linkType]"),
+    ],
+)
+def test_compiled_paths_extract_like_jdiff(data, path):
+    from jdiff import extract_data_from_json as jdiff_extract
+    from plugins.action.jdiff import CompiledPath
+
+    assert CompiledPath(path).extract(data) == jdiff_extract(data, path)
+
+
+def test_extract_falls_back_to_jdiff_without_its_parsers(monkeypatch):
+    import plugins.action.jdiff as jdiff_plugin
+
+    monkeypatch.setattr(jdiff_plugin, "HAS_JDIFF_PARSERS", False)
+    monkeypatch.setattr(jdiff_plugin, "JMESPATH_CACHE", jdiff_plugin.PathCache())
+    path = "peers[*].[$ip$,linkType]"
+    assert jdiff_plugin.extract_data_from_json(PEERS, path) == jdiff_plugin.jdiff_extract_data_from_json(PEERS, path)
+    assert jdiff_plugin.JMESPATH_CACHE.stats()["misses"] == 0
+
+
+def test_jmespath_cache_counts_and_evicts():
+    from plugins.action.jdiff import PathCache
+
+    cache = PathCache(size=2)
+    first = cache.get("peers[*].[$ip$,linkType]")
+    assert cache.get("peers[*].[$ip$,linkType]") is first
+    cache.get("a")
+    cache.get("b")
+    assert cache.get("peers[*].[$ip$,linkType]") is not first
+    assert cache.stats() == {"hits": 1, "misses": 4, "size": 2}
+
+
+def test_value_and_reference_files(tmp_path):
+    import json
+
+    reference_file = tmp_path / "pre.json"
+    value_file = tmp_path / "post.json"
+    reference_file.write_text(json.dumps(PEERS))
+    value_file.write_text(json.dumps({"peers": list(reversed(PEERS["peers"]))}))
+    args = {
+        "check_type": "exact_match",
+        "value_file": str(value_file),
+        "reference_file": str(reference_file),
+        "jmespath": "peers[*].[$ip$,linkType]",
+    }
+    assert main(args) == {"success": True, "fail_details": {}}
+
+    value_file.write_text("{not json")
+    with pytest.raises(AnsibleError) as exc:
+        main(args)
+    assert str(exc.value).startswith(f"Unable to load JSON from '{value_file}'")
+
+
+def test_reference_snapshot(tmp_path):
+    from plugins.action.jdiff import load_snapshots
+    from plugins.module_utils.snapshot_store import SnapshotStore
+
+    store = SnapshotStore(str(tmp_path))
+    store.save("leaf01", "show bgp", "pre_change", dict(PEERS, uptime=10))
+    args = {
+        "check_type": "exact_match",
+        "snapshot_command": "show bgp",
+        "reference_snapshot": "pre_change",
+        "evaluate_args": {"value_to_compare": PEERS},
+        "jmespath": "peers[*].[$ip$,linkType]",
+    }
+    loaded = load_snapshots(args, store, "leaf01")
+    assert loaded["evaluate_args"]["reference_data"] == PEERS
+    assert main(loaded) == {"success": True, "fail_details": {}}
+
+    with pytest.raises(AnsibleError) as exc:
+        load_snapshots(dict(args, reference_snapshot="post_change"), store, "leaf01")
+    assert str(exc.value).startswith("Unable to load snapshot: ")
+
+
+INTERFACES = {
+    "Ethernet1": {"status": "up", "counters": {"in": 10, "out": 20}, "vlans": [10, 20]},
+    "Ethernet2": {"status": "down", "counters": {"in": 0, "out": 0}, "vlans": []},
+    "Ethernet3": {"status": "up", "counters": {"in": 5.0, "out": 1}, "vlans": [{"id": 30}, {"id": 40}]},
+}
+CHANGED_INTERFACES = {
+    "Ethernet1": {"status": "up", "counters": {"in": 11, "out": 20}, "vlans": [10, 30, 20]},
+    "Ethernet2": {"status": "down", "counters": {"in": 0, "out": 0}, "vlans": []},
+    "Ethernet3": {"status": "up", "counters": {"in": 5, "out": 1}, "vlans": [{"id": 30}, {"id": 41}, {"id": 50}]},
+    "Ethernet4": {"status": "up"},
+}
+
+
+@pytest.mark.parametrize("check_type, evaluate_args", [("exact_match", {}), ("tolerance", {"tolerance": 5})])
+@pytest.mark.parametrize("reference, value", [
+    (INTERFACES, CHANGED_INTERFACES),
+    (CHANGED_INTERFACES, INTERFACES),
+    (INTERFACES, INTERFACES),
+    (list(INTERFACES.values()), list(CHANGED_INTERFACES.values())),
+    ({"Ethernet1": [1, 2]}, {"Ethernet1": {"0": 1}}),
+    # NaN never equals itself, so subtrees holding it are never pruned as equal.
+    ({"Ethernet1": {"counters": {"in": float("nan")}}, "Ethernet2": {"counters": {"in": 1}}},
+     {"Ethernet1": {"counters": {"in": float("nan")}}, "Ethernet2": {"counters": {"in": 1}}}),
+    ({"Ethernet1": {"counters": [float("nan")]}}, {"Ethernet1": {"counters": [float("nan")]}}),
+    # Dropping the equal keys would leave DeepDiff too few common keys to diff the dicts key by key.
+    ({"Ethernet1": {"a": {"x": 1}, "b": {"x": 2}, "c": {"x": 3}, "old": {"x": 4}}},
+     {"Ethernet1": {"a": {"x": 1}, "b": {"x": 2}, "c": {"x": 3}, "new": {"x": 4}}}),
+])
+def test_pruned_diff_matches_jdiff(check_type, evaluate_args, reference, value):
+    from jdiff import CheckType
+
+    expected = CheckType.create(check_type).evaluate(reference_data=reference, value_to_compare=value, **evaluate_args)
+    args = {
+        "check_type": check_type,
+        "evaluate_args": dict(evaluate_args, reference_data=reference, value_to_compare=value),
+    }
+    assert main(args) == {"success": expected[1], "fail_details": expected[0]}
+
+
+def test_subtree_hashes_prune_equal_branches():
+    from plugins.action.jdiff import HashCache, prune_equal_subtrees, subtree_hashes
+
+    reference, value = subtree_hashes(INTERFACES), subtree_hashes(CHANGED_INTERFACES)
+    assert subtree_hashes({"a": [1]}) != subtree_hashes({"a": [1.0]})
+    assert subtree_hashes({"a": 1}) is None
+    assert subtree_hashes([{"a": 1}])[0] == subtree_hashes([{"a": 1}])[0]
+    pruned = prune_equal_subtrees(INTERFACES, CHANGED_INTERFACES, reference, value)
+    assert "Ethernet2" not in pruned[0] and "Ethernet2" not in pruned[1]
+    assert pruned[1]["Ethernet3"] == {"vlans": [{}, {"id": 41}, {"id": 50}]}
+
+    hashes = HashCache({'["*", []]': reference})
+    assert hashes.get("*", None, {}) is reference and not hashes.changed
+    hashes.get("*", ["counters"], INTERFACES)
+    assert hashes.changed
+
+
+def test_reported_whole_follows_deepdiff():
+    from deepdiff import DeepDiff
+    from plugins.action.jdiff import _reported_whole
+
+    for union in range(1, 13):
+        for common in range(union + 1):
+            only = union - common
+            reference = dict({f"c{i}": i for i in range(common)}, **{f"r{i}": i for i in range(only // 2)})
+            value = dict({f"c{i}": i for i in range(common)}, **{f"v{i}": i for i in range(only - only // 2)})
+            diff = DeepDiff({"x": reference}, {"x": value})
+            assert ("root['x']" in diff.get("values_changed", {})) is _reported_whole(common, union), (common, union)
+
+
+def test_reference_snapshot_hashes_are_dropped_with_the_snapshot(tmp_path):
+    from plugins.module_utils.snapshot_store import SnapshotStore
+
+    store = SnapshotStore(str(tmp_path))
+    store.save("leaf01", "show interfaces", "pre_change", INTERFACES)
+    assert store.load_hashes("leaf01", "show interfaces", "pre_change") == {}
+    store.save_hashes("leaf01", "show interfaces", "pre_change", {"*": ["abc", {}]})
+    assert store.load_hashes("leaf01", "show interfaces", "pre_change") == {"*": ["abc", {}]}
+    assert store.labels("leaf01", "show interfaces") == ["pre_change"]
+    store.save("leaf01", "show interfaces", "pre_change", CHANGED_INTERFACES)
+    assert store.load_hashes("leaf01", "show interfaces", "pre_change") == {}
+
+    # Hashes written for an earlier content, as by a run racing with a new save, do not apply.
+    store.save_hashes("leaf01", "show interfaces", "pre_change", {"*": ["abc", {}]})
+    path = store.path("leaf01", "show interfaces", "pre_change")
+    with open(path, "ab") as handle:
+        handle.write(b"\0")
+    assert store.load_hashes("leaf01", "show interfaces", "pre_change") == {}
+
+
+def test_list_key_compares_lists_by_key():
+    reference = {"peers": [{"ip": "10.1.0.0", "state": "up"}, {"ip": "10.2.0.0", "state": "up"}]}
+    value = {"peers": [{"ip": "10.2.0.0", "state": "down"}, {"ip": "10.1.0.0", "state": "up"}, {"ip": "10.3.0.0"}]}
+    args = {"check_type": "exact_match", "evaluate_args": {"reference_data": reference, "value_to_compare": value}}
+    assert main(dict(args, list_key="ip")) == {
+        "success": False,
+        "fail_details": {"peers": {"10.2.0.0": {"state": {"new_value": "down", "old_value": "up"}}, "10.3.0.0": "new"}},
+    }
+    assert main(dict(args, list_key="$ip$")) == main(dict(args, list_key="ip"))
+    assert main({
+        "check_type": "exact_match",
+        "list_key": "ip",
+        "evaluate_args": {"reference_data": {"peers": []}, "value_to_compare": {"peers": [{"ip": "10.1.0.0"}]}},
+    }) == {"success": False, "fail_details": {"peers": {"10.1.0.0": "new"}}}
+
+
+def test_list_key_in_checks_and_errors():
+    reference = [{"name": "Ethernet1", "mtu": 1500}, {"name": "Ethernet2", "mtu": 9000}]
+    value = list(reversed(reference))
+    args = {
+        "evaluate_args": {"reference_data": reference, "value_to_compare": value},
+        "checks": [{"name": "keyed", "check_type": "exact_match", "list_key": "name"},
+                   {"name": "positional", "check_type": "exact_match"}],
+    }
+    result = main(args)
+    assert result["checks"]["keyed"]["success"] and not result["checks"]["positional"]["success"]
+
+    with pytest.raises(AnsibleError) as exc:
+        main({
+            "check_type": "exact_match",
+            "list_key": "name",
+            "evaluate_args": {"reference_data": reference + reference[:1], "value_to_compare": value},
+        })
+    assert str(exc.value) == "Duplicate 'name' 'Ethernet1' in a list indexed by 'list_key'."
+
+
+PORTS = [
+    {"Ethernet1": {"RxPower": -3.5, "TxPower": -2}},
+    {"Ethernet2": {"RxPower": -9.1, "TxPower": -1}},
+    {"Ethernet3": {"RxPower": -12, "TxPower": 0.5}},
+]
+
+
+@pytest.mark.parametrize("mode, operator_data", [
+    ("in-range", [-8, -2]),
+    ("not-in-range", [-8, -2]),
+    ("is-gt", -9),
+    ("is-ge", -2),
+    ("is-lt", 0),
+    ("is-le", -3.5),
+])
+@pytest.mark.parametrize("numpy", [True, False])
+def test_numeric_operator_matches_jdiff(monkeypatch, numpy, mode, operator_data):
+    from jdiff import CheckType
+    import plugins.action.jdiff as jdiff_plugin
+
+    if numpy and not jdiff_plugin.HAS_NUMPY:
+        pytest.skip("NumPy is not installed")
+    monkeypatch.setattr(jdiff_plugin, "HAS_NUMPY", numpy)
+    evaluate_args = {"params": {"params": {"mode": mode, "operator_data": operator_data}}, "value_to_compare": PORTS}
+    expected = CheckType.create("operator").evaluate(**evaluate_args)
+    assert jdiff_plugin.evaluate_numeric_operator(CheckType.create("operator"), evaluate_args) == expected
+    assert main({"check_type": "operator", "evaluate_args": evaluate_args}) == {
+        "success": expected[1],
+        "fail_details": expected[0],
+    }
+
+
+def test_numeric_operator_leaves_other_values_to_jdiff():
+    from jdiff import CheckType
+    from plugins.action.jdiff import evaluate_numeric_operator
+
+    check = CheckType.create("operator")
+    params = {"params": {"mode": "is-gt", "operator_data": 0}}
+    assert evaluate_numeric_operator(check, {"params": params, "value_to_compare": [{"a": {"b": "1"}}]}) is None
+    assert evaluate_numeric_operator(check, {"params": params, "value_to_compare": [{"a": {"b": 2 ** 60}}]}) is None
+    params = {"params": {"mode": "is-in", "operator_data": [1]}}
+    assert evaluate_numeric_operator(check, {"params": params, "value_to_compare": [{"a": {"b": 1}}]}) is None
+    with pytest.raises(AnsibleError) as exc:
+        main({"check_type": "operator", "evaluate_args": {"params": {"params": {"mode": "is-gt"}}, "value_to_compare": []}})
+    assert str(exc.value).startswith("Exception in backend jdiff library: 'mode' and 'operator_data'")
@@ -0,0 +1,77 @@
+"""Tests for backup_index module_utils."""
+import json
+import os
+
+from plugins.module_utils.backup_index import BackupIndex
+from plugins.module_utils.backup_store import BackupStore
+
+BASE = "hostname {0}\nip http server\ninterface Ethernet1\n  description uplink\n"
+
+
+def populate(root):
+    store = BackupStore(root)
+    store.put("leaf01", BASE.format("leaf01"), timestamp=100.0)
+    store.put("leaf02", BASE.format("leaf02"), timestamp=100.0)
+    store.put("leaf01", BASE.format("leaf01").replace("ip http server\n", ""), timestamp=200.0)
+    return store
+
+
+def test_search_point_in_time(tmp_path):
+    populate(str(tmp_path))
+    with BackupIndex(str(tmp_path)) as index:
+        assert index.search("ip http server") == ["leaf02"]
+        assert index.search("ip http server", when=150.0) == ["leaf01", "leaf02"]
+        assert index.search("ip http server", when=50.0) == []
+        assert index.search("description uplink") == ["leaf01", "leaf02"]
+        assert index.search("http", contains=True) == ["leaf02"]
+        assert index.search("100%", contains=True) == []
+
+
+def test_diff_and_history(tmp_path):
+    populate(str(tmp_path))
+    with BackupIndex(str(tmp_path)) as index:
+        assert [entry["timestamp"] for entry in index.history("leaf01")] == [100.0, 200.0]
+        diff = index.diff("leaf01", since=150.0)
+        assert "-ip http server" in diff
+        assert index.diff("leaf02", since=150.0) == ""
+        assert index.config("leaf01", when=150.0) == BASE.format("leaf01")
+        assert index.config("leaf01", when=50.0) is None
+
+
+def test_refresh_is_incremental(tmp_path):
+    store = populate(str(tmp_path))
+    with BackupIndex(str(tmp_path)) as index:
+        assert index.devices() == ["leaf01", "leaf02"]
+
+    store.put("leaf03", BASE.format("leaf03"), timestamp=300.0)
+    with BackupIndex(str(tmp_path)) as index:
+        indexed = index._db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+        assert index.devices() == ["leaf01", "leaf02", "leaf03"]
+        assert index.search("ip http server") == ["leaf02", "leaf03"]
+    assert indexed == 4
+
+
+def test_refresh_only_reads_changed_indexes(tmp_path, monkeypatch):
+    store = populate(str(tmp_path))
+    with BackupIndex(str(tmp_path)):
+        pass
+    leaf02_mtime = os.stat(store.index_path("leaf02")).st_mtime
+    store.put("leaf02", BASE.format("leaf02"), timestamp=300.0)
+    assert os.stat(store.index_path("leaf02")).st_mtime == leaf02_mtime
+    assert store.index("leaf02")["checked_at"] == 300.0
+
+    loaded = []
+    load = json.load
+    monkeypatch.setattr(json, "load", lambda handle: loaded.append(handle.name) or load(handle))
+    with BackupIndex(str(tmp_path)) as index:
+        assert loaded == []
+        store.put("leaf01", BASE.format("leaf01"), timestamp=400.0)
+        del loaded[:]
+        index.refresh()
+        assert loaded == [store.index_path("leaf01")]
+        assert index.search("ip http server") == ["leaf01", "leaf02"]
+
+        os.remove(store.index_path("leaf02"))
+        index.refresh()
+        assert index.devices() == ["leaf01"]
+        assert index.search("ip http server") == ["leaf01"]
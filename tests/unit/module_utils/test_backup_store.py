@@ -0,0 +1,125 @@
+"""Tests for backup_store module_utils."""
+import os
+
+import pytest
+
+from plugins.module_utils.backup_store import BackupStore, content_hash, normalize_config
+
+CONFIG = "hostname leaf01\ninterface Ethernet1\n  description uplink\n"
+
+
+def test_normalize_config_drops_volatile_lines():
+    running = (
+        "Building configuration...\r\n\r\nCurrent configuration : 1234 bytes\r\n"
+        "! Last configuration change at 10:01:02 UTC Mon Oct 3 2022\r\n"
+        "hostname leaf01   \r\n"
+    )
+    startup = "! NVRAM config last updated at 09:00:00 UTC Mon Oct 3 2022\nhostname leaf01\n"
+    assert normalize_config(running) == normalize_config(startup) == "hostname leaf01\n"
+
+
+IOS_RUNNING = """Building configuration...
+
+Current configuration : 1597 bytes
+!
+! Last configuration change at 14:22:19 UTC Thu Mar 3 2022 by cisco
+! NVRAM config last updated at 14:22:24 UTC Thu Mar 3 2022 by cisco
+!
+version 15.9
+hostname csr1
+!
+end
+"""
+
+IOS_STARTUP = """Using 1597 out of 262144 bytes
+!
+! Last configuration change at 14:22:19 UTC Thu Mar 3 2022 by cisco
+! NVRAM config last updated at 14:22:24 UTC Thu Mar 3 2022 by cisco
+!
+version 15.9
+hostname csr1
+!
+end
+"""
+
+NXOS_RUNNING = """
+!Command: show running-config
+!Running configuration last done at: Thu Mar  3 14:22:19 2022
+!Time: Thu Mar  3 14:30:01 2022
+
+version 9.3(8) Bios:version 05.45
+hostname nxos-spine1
+"""
+
+NXOS_STARTUP = """
+!Command: show startup-config
+!Time: Thu Mar  3 14:30:02 2022
+!Startup config saved at: Thu Mar  3 14:22:24 2022
+
+version 9.3(8) Bios:version 05.45
+hostname nxos-spine1
+"""
+
+EOS_RUNNING = """! Command: show running-config
+! device: leaf01 (vEOS-lab, EOS-4.28.0F)
+!
+! boot system flash:/vEOS-lab.swi
+!
+hostname leaf01
+!
+end
+"""
+
+EOS_STARTUP = """! Startup-config last modified at  Thu Mar  3 14:22:24 2022 by admin
+! device: leaf01 (vEOS-lab, EOS-4.28.0F)
+!
+! boot system flash:/vEOS-lab.swi
+!
+hostname leaf01
+!
+end
+"""
+
+
+@pytest.mark.parametrize(
+    "running, startup",
+    [(IOS_RUNNING, IOS_STARTUP), (NXOS_RUNNING, NXOS_STARTUP), (EOS_RUNNING, EOS_STARTUP)],
+    ids=["ios", "nxos", "eos"],
+)
+def test_normalize_config_running_equals_startup(running, startup):
+    assert normalize_config(running) == normalize_config(startup)
+    assert "hostname" in normalize_config(running)
+    assert normalize_config(running) != normalize_config(startup.replace("hostname ", "hostname x"))
+
+
+def test_put_deduplicates_unchanged_config(tmp_path):
+    store = BackupStore(str(tmp_path))
+    digest, new = store.put("leaf01", CONFIG, timestamp=1.0)
+    assert new is True
+    assert digest == content_hash(CONFIG)
+    assert store.read(digest) == CONFIG
+
+    again, new = store.put("leaf01", CONFIG, timestamp=2.0)
+    assert (again, new) == (digest, False)
+    assert store.history("leaf01") == [{"timestamp": 1.0, "hash": digest}]
+    assert store.index("leaf01")["checked_at"] == 2.0
+
+
+def test_put_records_changes_and_shares_blobs(tmp_path):
+    store = BackupStore(str(tmp_path))
+    first, _ = store.put("leaf01", CONFIG, timestamp=1.0)
+    changed, new = store.put("leaf01", CONFIG + "ntp server 10.0.0.1\n", timestamp=2.0)
+    assert new is True
+    assert store.latest("leaf01") == changed
+    assert [entry["hash"] for entry in store.history("leaf01")] == [first, changed]
+
+    shared, new = store.put("leaf02", CONFIG, timestamp=3.0)
+    assert (shared, new) == (first, True)
+    blobs = [name for _, _, names in os.walk(store.objects_dir) for name in names]
+    assert len(blobs) == 2
+
+
+def test_history_of_unknown_device_is_empty(tmp_path):
+    store = BackupStore(str(tmp_path))
+    assert store.history("spine01") == []
+    assert store.latest("spine01") is None
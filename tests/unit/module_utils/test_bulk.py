@@ -0,0 +1,98 @@
+"""Tests for bulk module_utils."""
+import json
+import threading
+
+from plugins.module_utils.bulk import STATUS_FAILED, STATUS_OK, STATUS_TIMEOUT, Manifest, run_pool
+
+
+def test_manifest_appends_and_resumes(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    manifest = Manifest(path)
+    manifest.append({"device": "leaf01", "status": STATUS_OK, "hash": "abc"})
+    manifest.append({"device": "leaf02", "status": STATUS_FAILED, "error": "refused"})
+    with open(path, "a") as handle:
+        handle.write('{"device": "leaf03", "sta')
+
+    resumed = Manifest(path)
+    assert resumed.done("leaf01")
+    assert not resumed.done("leaf02")
+    assert not resumed.done("leaf03")
+
+    resumed.append({"device": "leaf02", "status": STATUS_OK})
+    assert Manifest(path).done("leaf02")
+
+
+def test_manifest_lines_are_json(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    Manifest(path).append({"device": "leaf01", "status": STATUS_OK})
+    with open(path) as handle:
+        assert [json.loads(line)["device"] for line in handle] == ["leaf01"]
+
+
+def test_run_pool_reports_every_outcome():
+    def work(name):
+        if name == "bad":
+            raise ValueError("refused")
+        return name.upper()
+
+    results = {}
+    run_pool(["a", "bad", "c"], work, 2, 5, lambda name, status, value, _: results.update({name: (status, value)}))
+    assert results == {"a": (STATUS_OK, "A"), "bad": (STATUS_FAILED, "refused"), "c": (STATUS_OK, "C")}
+
+
+def test_run_pool_times_out_stragglers_and_bounds_workers():
+    release = threading.Event()
+    lock = threading.Lock()
+    active = {"now": 0, "max": 0}
+
+    def work(name):
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        if name == "hung":
+            release.wait(10)
+        with lock:
+            active["now"] -= 1
+        return name
+
+    results = {}
+    run_pool(["hung", "a", "b", "c"], work, 2, 0.3, lambda name, status, value, _: results.update({name: status}))
+    release.set()
+    assert results == {"hung": STATUS_TIMEOUT, "a": STATUS_OK, "b": STATUS_OK, "c": STATUS_OK}
+    assert active["max"] <= 2
+
+
+def test_run_pool_counts_timed_out_calls_until_they_exit():
+    release = threading.Event()
+    started = []
+
+    def work(name):
+        started.append((name, release.is_set()))
+        if name.startswith("hung"):
+            release.wait(10)
+        return name
+
+    threading.Timer(0.45, release.set).start()
+    results = {}
+    run_pool(["hung1", "hung2", "a"], work, 2, 0.3, lambda name, status, value, _: results.update({name: status}))
+    assert results == {"hung1": STATUS_TIMEOUT, "hung2": STATUS_TIMEOUT, "a": STATUS_OK}
+    assert ("a", True) in started
+
+
+def test_run_pool_gives_up_when_no_worker_frees():
+    release = threading.Event()
+    results = {}
+    run_pool(
+        ["hung", "a", "b"],
+        lambda name: release.wait(10),
+        1,
+        0.2,
+        lambda name, status, value, _: results.update({name: (status, value)}),
+    )
+    release.set()
+    assert results["hung"] == (STATUS_TIMEOUT, "Timed out after 0.2 seconds")
+    assert (
+        results["a"]
+        == results["b"]
+        == (STATUS_TIMEOUT, "No worker free after 0.2 seconds, 1 timed out calls still running")
+    )
@@ -0,0 +1,54 @@
+"""Tests for checkpoint_catalog module_utils."""
+from plugins.module_utils.checkpoint_catalog import CheckpointCatalog, config_diff
+
+BASE = "hostname leaf01\ninterface Ethernet1\n"
+
+
+def test_record_precomputes_diff(tmp_path):
+    catalog = CheckpointCatalog(str(tmp_path))
+    first = catalog.record("leaf01", "cp1", BASE, timestamp=1.0)
+    assert first["previous"] is None
+    assert catalog.diff(first) == ""
+
+    second = catalog.record("leaf01", "cp2", BASE + "ntp server 10.0.0.1\n", timestamp=2.0)
+    assert second["previous"] == "cp1"
+    assert "+ntp server 10.0.0.1" in catalog.diff(second)
+    assert catalog.config(catalog.get("leaf01", "cp1")) == BASE
+    assert catalog.get("leaf01", "cp3") is None
+    assert catalog.get("leaf02", "cp1") is None
+
+
+def test_record_replaces_same_name(tmp_path):
+    catalog = CheckpointCatalog(str(tmp_path))
+    catalog.record("leaf01", "cp1", BASE, timestamp=1.0)
+    catalog.record("leaf01", "cp2", BASE + "a\n", timestamp=2.0)
+    catalog.record("leaf01", "cp1", BASE + "b\n", timestamp=3.0)
+    assert [checkpoint["name"] for checkpoint in catalog.checkpoints("leaf01")] == ["cp2", "cp1"]
+    assert catalog.get("leaf01", "cp1")["previous"] == "cp2"
+
+
+def test_prune_keep_and_age(tmp_path):
+    catalog = CheckpointCatalog(str(tmp_path))
+    for position in range(5):
+        catalog.record("leaf01", "cp{0}".format(position), BASE + str(position), timestamp=float(position * 10))
+
+    pruned = catalog.prune("leaf01", keep=3)
+    assert [checkpoint["name"] for checkpoint in pruned] == ["cp0", "cp1"]
+    pruned = catalog.prune("leaf01", older_than=15, now=40.0)
+    assert [checkpoint["name"] for checkpoint in pruned] == ["cp2"]
+    assert [checkpoint["name"] for checkpoint in catalog.checkpoints("leaf01")] == ["cp3", "cp4"]
+    assert catalog.prune("leaf01", keep=5) == []
+
+
+def test_config_diff():
+    assert config_diff(BASE, BASE) == ""
+    assert "-interface Ethernet1" in config_diff(BASE, "hostname leaf01\n")
+
+
+def test_prune_dry_run_keeps_catalog(tmp_path):
+    catalog = CheckpointCatalog(str(tmp_path))
+    catalog.record("leaf01", "cp1", BASE, timestamp=1.0)
+    catalog.record("leaf01", "cp2", BASE + "a\n", timestamp=2.0)
+    pruned = catalog.prune("leaf01", keep=1, dry_run=True)
+    assert [checkpoint["name"] for checkpoint in pruned] == ["cp1"]
+    assert len(catalog.checkpoints("leaf01")) == 2
@@ -0,0 +1,47 @@
+"""Tests for progress module_utils."""
+from plugins.module_utils.progress import ProgressFile
+
+IDENTITY = {"host": "leaf01", "platform": "cisco_nxos_nxapi", "timer": None}
+
+
+def test_progress_resumes_same_identity(tmp_path):
+    path = str(tmp_path / "reboot.json")
+    progress = ProgressFile(path, IDENTITY)
+    assert progress.phase is None
+    progress.update("rebooted", rebooted_at=100.0)
+
+    resumed = ProgressFile(path, dict(IDENTITY))
+    assert resumed.phase == "rebooted"
+    assert resumed.get("rebooted_at") == 100.0
+    assert resumed.result is None
+
+
+def test_progress_result_after_finish(tmp_path):
+    path = str(tmp_path / "reboot.json")
+    ProgressFile(path, IDENTITY).finish({"changed": True, "reachable": True})
+    assert ProgressFile(path, IDENTITY).result == {"changed": True, "reachable": True}
+
+
+def test_progress_ignores_other_identity(tmp_path):
+    path = str(tmp_path / "reboot.json")
+    ProgressFile(path, IDENTITY).finish({"changed": True})
+    other = ProgressFile(path, dict(IDENTITY, host="leaf02"))
+    assert other.phase is None
+    assert other.result is None
+
+
+def test_progress_without_path_keeps_state_in_memory():
+    progress = ProgressFile(None, IDENTITY)
+    progress.update("rebooted", rebooted_at=1.0)
+    assert progress.phase == "rebooted"
+    assert progress.get("rebooted_at") == 1.0
+
+
+def test_progress_reset_removes_file(tmp_path):
+    path = tmp_path / "install.json"
+    progress = ProgressFile(str(path), IDENTITY)
+    progress.update("installing", started_at=1.0)
+    progress.reset()
+    assert progress.phase is None
+    assert not path.exists()
+    assert ProgressFile(str(path), IDENTITY).phase is None
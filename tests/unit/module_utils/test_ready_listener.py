@@ -0,0 +1,47 @@
+"""Tests for ready_listener module_utils."""
+import socket
+
+from plugins.module_utils.ready_listener import TRAP_OIDS, ReadyListener
+
+# Minimal SNMPv2c trap varbind carrying snmpTrapOID.0 = coldStart.
+COLD_START_VARBIND = b"\x30\x17\x06\x0a\x2b\x06\x01\x06\x03\x01\x01\x04\x01\x00\x06\x09" + list(TRAP_OIDS)[0]
+
+
+def send(address, payload):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.sendto(payload, address)
+    sock.close()
+
+
+def test_syslog_ready_message():
+    with ReadyListener(bind="127.0.0.1", syslog_port=0) as listener:
+        address = listener.watch("127.0.0.1", platform="cisco_ios_ssh")
+        send(listener.addresses["syslog"], b"<189>41: *Mar  1 00:00:40: %LINK-3-UPDOWN: Interface Gi0/1, changed state")
+        assert not listener.wait(address, 0.5)
+        send(listener.addresses["syslog"], b"<189>42: *Mar  1 00:00:41: %SYS-5-RESTART: System restarted --")
+        assert listener.wait(address, 2)
+        assert "%SYS-5-RESTART" in listener.message(address)
+
+
+def test_syslog_custom_pattern():
+    with ReadyListener(bind="127.0.0.1", syslog_port=0) as listener:
+        address = listener.watch("127.0.0.1", platform="cisco_ios_ssh", pattern="LINEPROTO-5-UPDOWN.*Loopback0")
+        send(listener.addresses["syslog"], b"<189>%LINEPROTO-5-UPDOWN: Line protocol on Interface Loopback0, up")
+        assert listener.wait(address, 2)
+
+
+def test_snmp_cold_start_trap():
+    with ReadyListener(bind="127.0.0.1", syslog_port=None, trap_port=0) as listener:
+        address = listener.watch("127.0.0.1", platform="cisco_nxos_nxapi")
+        send(listener.addresses["trap"], COLD_START_VARBIND)
+        assert listener.wait(address, 2)
+        assert listener.message(address) == "coldStart"
+
+
+def test_unwatched_source_is_ignored():
+    listener = ReadyListener()
+    address = listener.watch("127.0.0.1", platform="arista_eos_eapi")
+    listener.handle("syslog", "192.0.2.1", b"%SYS-5-SYSTEM_RESTARTED: System restarted")
+    assert not listener.ready(address)
+    listener.handle("syslog", address, b"%SYS-5-SYSTEM_RESTARTED: System restarted")
+    assert listener.ready(address)
@@ -0,0 +1,129 @@
+"""Tests for reboot_waves module_utils."""
+import socket
+import threading
+
+from plugins.module_utils.reboot_waves import ReadinessTracker, run_waves, wave_device
+
+
+def make_devices(count, ready):
+    return [{"name": "sw{0}".format(i), "ready": (lambda i=i: ready(i))} for i in range(count)]
+
+
+def test_tracker_reports_device_after_port_closes_and_reopens():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(5)
+    port = server.getsockname()[1]
+
+    tracker = ReadinessTracker(connect_timeout=0.5)
+    tracker.add("sw1", "127.0.0.1", port)
+    # Still answering, so the reboot has not taken it down yet.
+    assert tracker.poll(0.3) == []
+    server.close()
+    assert tracker.poll(1.5) == []
+
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", port))
+    server.listen(5)
+    assert tracker.poll(5) == ["sw1"]
+    server.close()
+    tracker.close()
+
+
+def test_tracker_ready_callable():
+    flag = threading.Event()
+    tracker = ReadinessTracker()
+    tracker.add("sw1", None, None, ready=flag.is_set)
+    tracker.add("sw2", "127.0.0.1", 1, wait_down=False, ready=lambda: False)
+    assert tracker.poll(0.1) == []
+    flag.set()
+    assert tracker.poll(0.1) == ["sw1"]
+    assert tracker.poll(0.1) == []
+    tracker.close()
+
+
+def test_run_waves_gates_on_ready_fraction():
+    rebooted = []
+
+    # Only even numbered devices ever come back, and the login at the deadline fails for the others.
+    devices = make_devices(6, lambda i: i % 2 == 0)
+    results, waves, aborted = run_waves(
+        devices,
+        rebooted.append,
+        lambda name: int(name[2:]) % 2 == 0,
+        ReadinessTracker(),
+        wave_size=2,
+        ready_fraction=0.5,
+        timeout=1,
+    )
+    assert waves == 3
+    assert not aborted
+    assert sorted(rebooted) == ["sw0", "sw1", "sw2", "sw3", "sw4", "sw5"]
+    assert [name for name, result in results.items() if result["reachable"]] == ["sw0", "sw2", "sw4"]
+    assert results["sw1"] == {"rebooted": True, "reachable": False}
+    assert "downtime" in results["sw0"]
+
+
+def test_run_waves_aborts_when_wave_does_not_recover():
+    rebooted = []
+    devices = make_devices(4, lambda i: False)
+    results, waves, aborted = run_waves(
+        devices, rebooted.append, lambda name: False, ReadinessTracker(), wave_size=2, ready_fraction=0.5, timeout=0.5
+    )
+    assert aborted
+    assert waves == 1
+    assert sorted(rebooted) == ["sw0", "sw1"]
+    assert results["sw3"] == {"rebooted": False, "reachable": False}
+
+
+def test_run_waves_reboot_failure_counts_against_gate():
+    def reboot(name):
+        if name == "sw0":
+            raise RuntimeError("connection refused")
+
+    devices = make_devices(3, lambda i: True)
+    results, waves, aborted = run_waves(
+        devices, reboot, lambda name: True, ReadinessTracker(), wave_size=1, ready_fraction=1, timeout=1
+    )
+    assert aborted
+    assert results["sw0"]["error"] == "connection refused"
+    assert not results["sw1"]["rebooted"]
+
+
+def test_run_waves_with_ready_listener_ignores_open_port():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(5)
+    port = server.getsockname()[1]
+
+    # The port keeps answering and the listener never fires: only the login at the deadline may run.
+    devices = [wave_device("sw{0}".format(i), "127.0.0.1", port, ready=lambda: False) for i in range(4)]
+    assert devices[0] == {"name": "sw0", "ready": devices[0]["ready"]}
+    verified = []
+    results, waves, aborted = run_waves(
+        devices, lambda name: None, verified.append, ReadinessTracker(), wave_size=2, ready_fraction=0.5, timeout=1
+    )
+    server.close()
+    assert aborted
+    assert waves == 1
+    assert sorted(verified) == ["sw0", "sw1"]
+    assert not any(result["reachable"] for result in results.values())
+    assert wave_device("sw9", "10.0.0.1", 22) == {"name": "sw9", "host": "10.0.0.1", "port": 22, "wait_down": True}
+
+
+def test_run_waves_verifies_listener_devices_once_at_deadline():
+    devices = [wave_device("sw{0}".format(i), None, None, ready=lambda: False) for i in range(4)]
+    verified = []
+
+    def verify(name):
+        verified.append(name)
+        return name != "sw3"
+
+    results, waves, aborted = run_waves(
+        devices, lambda name: None, verify, ReadinessTracker(), wave_size=2, ready_fraction=0.5, timeout=0.3
+    )
+    assert not aborted
+    assert waves == 2
+    assert sorted(verified) == ["sw0", "sw1", "sw2", "sw3"]
+    assert [name for name, result in results.items() if not result["reachable"]] == ["sw3"]
@@ -0,0 +1,147 @@
+"""Tests for schema_codegen module_utils."""
+import os
+
+import pytest
+from jsonschema import Draft7Validator
+
+from plugins.module_utils.schema_codegen import GENERATOR_VERSION, CompiledSchemas, UnsupportedSchema, generate, load
+from plugins.module_utils.schema_validation import ValidatorCache, feature_errors, schema_hash, validate_schema
+
+INTERFACE = {
+    "type": "object",
+    "required": ["name", "mtu"],
+    "additionalProperties": False,
+    "properties": {
+        "name": {"type": "string", "pattern": "^(Ethernet|Loopback)[0-9/]+$", "maxLength": 20},
+        "mtu": {"type": "integer", "minimum": 576, "maximum": 9216},
+        "mode": {"enum": ["access", "trunk"]},
+        "enabled": {"type": "boolean", "default": True},
+        "vlans": {"type": "array", "items": {"type": "integer"}, "uniqueItems": True, "maxItems": 4},
+        "description": {"type": ["string", "null"], "minLength": 1},
+        "speed": {"type": "number", "exclusiveMinimum": 0},
+        "tags": {"type": "object", "additionalProperties": {"type": "string"}, "maxProperties": 2},
+        "vrf": {"const": "default"},
+    },
+}
+
+CASES = [
+    {"name": "Ethernet1/1", "mtu": 1500},
+    {"name": "Ethernet1/1", "mtu": 1500.0},
+    {"name": "Ethernet1/1", "mtu": 1500.5},
+    {"name": "Ethernet1/1", "mtu": True},
+    {"name": "Ethernet1/1", "mtu": 100},
+    {"name": "Ethernet1/1", "mtu": 9217},
+    {"name": "Vlan10", "mtu": 1500},
+    {"name": "Ethernet1/1111111111111111111", "mtu": 1500},
+    {"name": "Ethernet1/1"},
+    {"name": "Ethernet1/1", "mtu": 1500, "extra": 1},
+    {"name": "Ethernet1/1", "mtu": 1500, "mode": "access"},
+    {"name": "Ethernet1/1", "mtu": 1500, "mode": "routed"},
+    {"name": "Ethernet1/1", "mtu": 1500, "enabled": 1},
+    {"name": "Ethernet1/1", "mtu": 1500, "vlans": [1, 2, 3]},
+    {"name": "Ethernet1/1", "mtu": 1500, "vlans": [1, 1.0]},
+    {"name": "Ethernet1/1", "mtu": 1500, "vlans": [1, 2, 3, 4, 5]},
+    {"name": "Ethernet1/1", "mtu": 1500, "vlans": [True]},
+    {"name": "Ethernet1/1", "mtu": 1500, "description": None},
+    {"name": "Ethernet1/1", "mtu": 1500, "description": ""},
+    {"name": "Ethernet1/1", "mtu": 1500, "speed": 0},
+    {"name": "Ethernet1/1", "mtu": 1500, "speed": 0.5},
+    {"name": "Ethernet1/1", "mtu": 1500, "tags": {"a": "x"}},
+    {"name": "Ethernet1/1", "mtu": 1500, "tags": {"a": "x", "b": "y", "c": "z"}},
+    {"name": "Ethernet1/1", "mtu": 1500, "tags": {"a": 1}},
+    {"name": "Ethernet1/1", "mtu": 1500, "vrf": "default"},
+    {"name": "Ethernet1/1", "mtu": 1500, "vrf": "mgmt"},
+    ["not", "an", "object"],
+    None,
+]
+
+
+@pytest.mark.parametrize("data", CASES)
+def test_generated_code_agrees_with_jsonschema(data):
+    validate = load(generate(INTERFACE))
+    assert validate(data) is Draft7Validator(INTERFACE).is_valid(data)
+
+
+def test_enum_and_const_compare_like_jsonschema():
+    schema = {"type": "array", "items": {"enum": [1, "1", False, {"a": [1]}]}}
+    validate = load(generate(schema))
+    for value in (1, 1.0, "1", False, 0, True, {"a": [1]}, {"a": [True]}):
+        assert validate([value]) is Draft7Validator(schema).is_valid([value]), value
+
+
+@pytest.mark.parametrize(
+    "schema",
+    [
+        {"type": "string", "format": "ipv4"},
+        {"$ref": "#/definitions/vlan"},
+        {"anyOf": [{"type": "string"}, {"type": "integer"}]},
+        {"type": "object", "patternProperties": {"^x": {"type": "string"}}},
+        {"type": "array", "items": [{"type": "string"}]},
+        {"type": "array", "items": {"not": {"type": "string"}}},
+    ],
+)
+def test_unsupported_keywords(schema):
+    with pytest.raises(UnsupportedSchema):
+        generate(schema)
+
+
+@pytest.mark.parametrize(
+    "schema, data, message",
+    [
+        (
+            {"$schema": "http://json-schema.org/draft-04/schema#", "type": "integer"},
+            1.0,
+            "ValidationError: 1.0 is not of type 'integer'",
+        ),
+        (
+            {"$schema": "http://json-schema.org/draft-03/schema#", "properties": {"a": {"required": True}}},
+            {},
+            "ValidationError: 'a' is a required property",
+        ),
+    ],
+)
+def test_older_drafts_fall_back_to_jsonschema(schema, data, message):
+    with pytest.raises(UnsupportedSchema):
+        generate(schema)
+    assert validate_schema(schema, data, ValidatorCache(engine="codegen")) == (False, message)
+    assert validate_schema(schema, data, ValidatorCache()) == (False, message)
+
+
+def test_required_must_be_a_list():
+    with pytest.raises(UnsupportedSchema):
+        generate({"properties": {"a": {"required": True}}})
+
+
+@pytest.mark.parametrize(
+    "uri", ["http://json-schema.org/draft-07/schema#", "https://json-schema.org/draft/2020-12/schema"]
+)
+def test_supported_drafts_are_generated(uri):
+    schema = {"$schema": uri, "type": "integer"}
+    assert load(generate(schema))(1.0) is Draft7Validator(schema).is_valid(1.0) is True
+
+
+def test_generated_code_cached_on_disk(tmp_path):
+    digest = schema_hash(INTERFACE)
+    # Code cached by another generator version is ignored.
+    with open(os.path.join(str(tmp_path), "{0}.py".format(digest)), "w") as stale:
+        stale.write("validate = lambda data: True\n")
+    assert CompiledSchemas(str(tmp_path)).get(INTERFACE, digest)(CASES[0]) is True
+    assert os.path.exists(os.path.join(str(tmp_path), "{0}.v{1}.py".format(digest, GENERATOR_VERSION)))
+    assert CompiledSchemas(str(tmp_path)).get(INTERFACE, digest)(CASES[4]) is False
+
+    unsupported = {"type": "string", "format": "ipv4"}
+    assert CompiledSchemas(str(tmp_path)).get(unsupported, schema_hash(unsupported)) is None
+    marker = "{0}.v{1}.unsupported".format(schema_hash(unsupported), GENERATOR_VERSION)
+    assert os.path.exists(os.path.join(str(tmp_path), marker))
+
+
+def test_codegen_engine_keeps_jsonschema_errors():
+    cache = ValidatorCache(engine="codegen")
+    schema = {"type": "array", "items": INTERFACE}
+    assert validate_schema(schema, CASES[:2], cache) == (True, "")
+    assert validate_schema(schema, CASES[:6], cache) == validate_schema(schema, CASES[:6], ValidatorCache())
+    assert feature_errors("interfaces", schema, CASES, cache=cache) == feature_errors(
+        "interfaces", schema, CASES, cache=ValidatorCache()
+    )
+    assert validate_schema({"type": "string", "format": "ipv4"}, "10.0.0.300", cache)[0] is False
+    assert validate_schema({"type": "nope"}, 1, cache)[1].startswith("SchemaError: ")
@@ -0,0 +1,66 @@
+"""Tests for schema_registry module_utils."""
+import json
+
+from plugins.module_utils.schema_registry import load_registry
+from plugins.module_utils.schema_validation import ValidatorCache, feature_errors, validate_hosts, validate_schema
+
+VLAN_ID = {"definitions": {"id": {"type": "integer", "minimum": 1, "maximum": 4094}}}
+VLANS = {
+    "type": "array",
+    "items": {"type": "object", "properties": {"id": {"$ref": "common/vlan.json#/definitions/id"}}},
+}
+
+
+def write_schemas(root):
+    (root / "common").mkdir()
+    (root / "common" / "vlan.json").write_text(json.dumps(VLAN_ID))
+    (root / "vlans.json").write_text(json.dumps(VLANS))
+    (root / "remote.yml").write_text('$ref: "https://example.com/schemas/remote.json"\n')
+
+
+def test_features_resolve_references_between_files(tmp_path):
+    write_schemas(tmp_path)
+    registry = load_registry(str(tmp_path))
+    schema = registry.complete({"hostname": {"type": "string"}}, [{"name": "vlans"}, {"name": "hostname"}])
+    assert schema == {"hostname": {"type": "string"}, "vlans": {"$ref": "vlans.json"}}
+
+    cache = ValidatorCache(registry=registry)
+    assert validate_schema(schema["vlans"], [{"id": 10}], cache) == (True, "")
+    assert [error["path"] for error in feature_errors("vlans", schema["vlans"], [{"id": 0}], cache=cache)] == [
+        "$.vlans[0].id"
+    ]
+    inline = {"$ref": "common/vlan.json#/definitions/id"}
+    assert validate_schema(inline, 5000, cache)[1].startswith("ValidationError: 5000 is greater")
+
+
+def test_references_outside_the_directory_are_not_fetched(tmp_path):
+    write_schemas(tmp_path)
+    cache = ValidatorCache(registry=load_registry(str(tmp_path)))
+    status, msg = validate_schema({"$ref": "remote.yml"}, 1, cache)
+    assert not status
+    assert msg.startswith("RefResolutionError: ")
+    assert feature_errors("vlans", {"$ref": "missing.json"}, [], cache=cache)[0]["message"].startswith(
+        "RefResolutionError: "
+    )
+
+
+def test_registry_reloaded_when_files_change(tmp_path):
+    write_schemas(tmp_path)
+    registry = load_registry(str(tmp_path))
+    assert load_registry(str(tmp_path)) is registry
+
+    (tmp_path / "hostname.json").write_text(json.dumps({"type": "string"}))
+    reloaded = load_registry(str(tmp_path))
+    assert reloaded is not registry
+    assert reloaded.digest != registry.digest
+    assert "hostname" in reloaded.features
+
+
+def test_validate_hosts_with_schema_dir(tmp_path):
+    write_schemas(tmp_path)
+    scope = [{"name": "vlans"}]
+    schema = load_registry(str(tmp_path)).complete({}, scope)
+    hosts = {"leaf01": {"vlans": [{"id": 10}]}, "leaf02": {"vlans": [{"id": 0}]}}
+    results = validate_hosts(schema, scope, hosts, workers=1, schema_dir=str(tmp_path))
+    assert [error["path"] for error in results["leaf02"]] == ["$.vlans[0].id"]
+    assert results["leaf01"] == []
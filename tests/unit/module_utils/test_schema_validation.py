@@ -0,0 +1,222 @@
+"""Tests for schema_validation module_utils."""
+import io
+import json
+import os
+
+import pytest
+
+from plugins.module_utils.schema_validation import (
+    ResultCache,
+    ValidatorCache,
+    feature_errors,
+    iter_items,
+    json_path,
+    malformed_scope_item,
+    schema_hash,
+    stream_errors,
+    summarize_hosts,
+    unstreamed_keywords,
+    validate_hosts,
+    validate_schema,
+)
+
+VLANS = {"type": "array", "items": {"type": "integer", "minimum": 1, "maximum": 4094}}
+
+
+def test_schema_hash_ignores_key_order():
+    assert schema_hash({"type": "string", "minLength": 1}) == schema_hash({"minLength": 1, "type": "string"})
+    assert schema_hash({"type": "string"}) != schema_hash({"type": "integer"})
+
+
+def test_validators_are_reused_per_schema():
+    cache = ValidatorCache()
+    first = cache.validator(VLANS)
+    assert cache.validator(dict(VLANS)) is first
+    cache.validator({"type": "string"})
+    assert len(cache) == 2
+
+
+def test_validate_schema_messages():
+    cache = ValidatorCache()
+    assert validate_schema(VLANS, [10, 20], cache) == (True, "")
+    status, msg = validate_schema(VLANS, [10, 5000], cache)
+    assert not status
+    assert msg.startswith("ValidationError: 5000 is greater than the maximum")
+    status, msg = validate_schema({"type": "nope"}, 1, cache)
+    assert not status
+    assert msg.startswith("SchemaError: ")
+    assert validate_schema({"type": "string", "format": "ipv4"}, "10.0.0.300", cache)[0] is False
+
+
+def test_checked_schemas_are_remembered_on_disk(tmp_path, monkeypatch):
+    ValidatorCache(str(tmp_path)).validator(VLANS)
+    assert os.path.exists(os.path.join(str(tmp_path), "{0}.checked".format(schema_hash(VLANS))))
+
+    cache = ValidatorCache(str(tmp_path))
+    validator = cache.validator({"type": "string"})
+
+    def fail(*args, **kwargs):
+        raise AssertionError("schema checked again")
+
+    monkeypatch.setattr(type(validator), "check_schema", classmethod(fail))
+    cache.validator(VLANS)
+
+
+def test_json_path():
+    assert json_path("interfaces", ["Ethernet1/1", "mtu"]) == '$.interfaces["Ethernet1/1"].mtu'
+    assert json_path("vlans", [2, "id"]) == "$.vlans[2].id"
+
+
+def test_feature_errors_collects_every_violation():
+    item = {"type": "object", "required": ["id"], "properties": {"id": VLANS["items"], "name": {"type": "string"}}}
+    schema = {"type": "array", "items": item}
+    errors = feature_errors("vlans", schema, [{"id": 5000}, {"name": 1}, {"id": 10}], cache=ValidatorCache())
+    assert sorted((error["path"], error["validator"]) for error in errors) == [
+        ("$.vlans[0].id", "maximum"),
+        ("$.vlans[1]", "required"),
+        ("$.vlans[1].name", "type"),
+    ]
+
+
+def test_feature_errors_for_missing_data_or_schema():
+    assert feature_errors("hostname", {"type": "string"}, None) == []
+    assert feature_errors("hostname", {"type": "string"}, None, required=True)[0]["message"] == (
+        "Feature hostname required, but not found"
+    )
+    assert feature_errors("hostname", None, "leaf01")[0]["path"] == "$.hostname"
+    assert feature_errors("hostname", {"type": "nope"}, "leaf01")[0]["message"].startswith("SchemaError: ")
+
+
+def test_validate_hosts_in_process_pool(tmp_path):
+    schema = {"vlans": VLANS, "hostname": {"type": "string"}}
+    scope = [{"name": "hostname", "required": True}, {"name": "vlans"}]
+    hosts = {"leaf{0:02d}".format(index): {"hostname": "leaf", "vlans": [10, 20]} for index in range(120)}
+    hosts["leaf07"] = {"vlans": [0]}
+    hosts["leaf99"] = {"hostname": "leaf", "vlans": [5000, 6000]}
+
+    results = validate_hosts(schema, scope, hosts, workers=2, chunk_size=25)
+    assert sorted(host for host, errors in results.items() if errors) == ["leaf07", "leaf99"]
+
+    errors_file = str(tmp_path / "errors.jsonl")
+    summary = summarize_hosts(results, errors_file)
+    assert summary == {"hosts": 120, "passed": 118, "failed_hosts": {"leaf07": 2, "leaf99": 2}}
+    with open(errors_file) as handle:
+        lines = [json.loads(line) for line in handle]
+    assert [(line["host"], line["path"]) for line in lines] == [
+        ("leaf07", "$.hostname"),
+        ("leaf07", "$.vlans[0]"),
+        ("leaf99", "$.vlans[0]"),
+        ("leaf99", "$.vlans[1]"),
+    ]
+
+
+def test_validate_hosts_serial_matches_pool():
+    schema = {"vlans": VLANS}
+    scope = [{"name": "vlans"}]
+    hosts = {"leaf01": {"vlans": [1]}, "leaf02": {"vlans": ["x"]}}
+    assert validate_hosts(schema, scope, hosts, workers=1) == validate_hosts(schema, scope, hosts, chunk_size=1)
+
+
+def test_malformed_scope_item():
+    assert malformed_scope_item([{"name": "vlans"}]) is None
+    assert malformed_scope_item([{"name": "vlans"}, {"required": True}]) == {"required": True}
+
+
+def test_result_cache_skips_unchanged_features(tmp_path):
+    path = str(tmp_path / "results.json")
+    schema = {"vlans": VLANS, "hostname": {"type": "string"}}
+    scope = [{"name": "hostname", "required": True}, {"name": "vlans"}]
+    hosts = {"leaf01": {"hostname": "leaf01", "vlans": [10]}, "leaf02": {"hostname": "leaf02", "vlans": [0]}}
+
+    results = ResultCache(path)
+    assert sorted(
+        host for host, errors in validate_hosts(schema, scope, hosts, result_cache=results).items() if errors
+    ) == ["leaf02"]
+    assert results.hits == 0
+    results.save()
+
+    hosts["leaf01"]["vlans"] = [10, 20]
+    results = ResultCache(path)
+    found = validate_hosts(schema, scope, hosts, result_cache=results)
+    assert [error["path"] for error in found["leaf02"]] == ["$.vlans[0]"]
+    # Both hostnames and nothing else were found valid before.
+    assert results.hits == 2
+
+
+def test_result_cache_expires_unused_entries(tmp_path):
+    path = str(tmp_path / "results.json")
+    clock = [1000.0]
+    results = ResultCache(path, max_age=100, clock=lambda: clock[0])
+    key = ResultCache.key(schema_hash(VLANS), "vlans", [10])
+    results.add(key)
+    results.save()
+    assert ResultCache(path).validated(key)
+
+    clock[0] = 1200.0
+    results = ResultCache(path, max_age=100, clock=lambda: clock[0])
+    results.save()
+    assert not ResultCache(path).validated(key)
+
+
+ROUTES = [
+    {"prefix": "10.0.{0}.0/24".format(index), "metric": index * 1.5e3, "tags": ["a", "b"]} for index in range(200)
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, 1 << 16])
+def test_iter_items_reads_arrays_and_json_lines_in_chunks(chunk_size):
+    assert list(iter_items(io.StringIO(json.dumps(ROUTES, indent=2)), chunk_size)) == ROUTES
+    lines = "\n".join(json.dumps(route) for route in ROUTES) + "\n"
+    assert list(iter_items(io.StringIO(lines), chunk_size)) == ROUTES
+    assert list(iter_items(io.StringIO(" [ ] "), chunk_size)) == []
+
+
+@pytest.mark.parametrize("text", ["[1, 2", "[1 2]", "[1,]", "[1.5e]"])
+def test_iter_items_rejects_invalid_arrays(text):
+    with pytest.raises(ValueError):
+        list(iter_items(io.StringIO(text), 2))
+
+
+def test_stream_errors_reports_element_paths_lazily():
+    def items():
+        yield 10
+        yield 5000
+        raise AssertionError("read past the first error")
+
+    stream = stream_errors("vlans", VLANS, items())
+    assert next(stream) == (1, [])
+    count, errors = next(stream)
+    assert count == 2
+    assert [(error["path"], error["validator"]) for error in errors] == [("$.vlans[1]", "maximum")]
+
+
+def test_stream_errors_resolves_local_refs():
+    schema = {
+        "type": "array",
+        "definitions": {"vlan_id": {"type": "integer", "maximum": 4094}},
+        "items": {"type": "object", "properties": {"id": {"$ref": "#/definitions/vlan_id"}}},
+    }
+    found = [error for _count, errors in stream_errors("vlans", schema, [{"id": 10}, {"id": 5000}]) for error in errors]
+    assert [(error["path"], error["validator"]) for error in found] == [("$.vlans[1].id", "maximum")]
+
+
+def test_stream_errors_enforces_array_keywords():
+    schema = dict(VLANS, minItems=4, maxItems=2, uniqueItems=True, contains={"const": 1})
+    results = list(stream_errors("vlans", schema, [10, 20, 10.0]))
+    assert [count for count, _errors in results] == [1, 2, 3, 3]
+    found = [(error["path"], error["validator"]) for _count, errors in results for error in errors]
+    assert found == [
+        ("$.vlans", "maxItems"),
+        ("$.vlans[2]", "uniqueItems"),
+        ("$.vlans", "minItems"),
+        ("$.vlans", "contains"),
+    ]
+    # True is not a duplicate of 1, and the first element satisfies contains.
+    results = list(stream_errors("vlans", {"type": "array", "contains": {"const": 1}, "uniqueItems": True}, [1, True]))
+    assert results == [(1, []), (2, []), (2, [])]
+
+
+def test_unstreamed_keywords():
+    assert unstreamed_keywords(dict(VLANS, minItems=1, uniqueItems=True, title="VLANs")) == []
+    assert unstreamed_keywords(dict(VLANS, allOf=[], maxContains=2)) == ["allOf", "maxContains"]
+    assert unstreamed_keywords({"items": [{"type": "integer"}]}) == ["items"]
@@ -0,0 +1,48 @@
+"""Tests for snapshot_store module_utils."""
+import gzip
+
+import pytest
+
+from plugins.module_utils.snapshot_store import SnapshotStore, command_slug, top_keys
+
+BGP = {"peers": [{"ip": "10.1.0.0", "state": "up"}], "router_id": "1.1.1.1", "vrfs": {"default": {}}}
+
+
+def test_save_and_load(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    path = store.save("leaf01", "show ip bgp", "pre_change", BGP, timestamp=1.0)
+    assert path.endswith("pre_change.jsonl.gz")
+    assert store.load("leaf01", "show ip bgp", "pre_change") == BGP
+    assert store.header("leaf01", "show ip bgp", "pre_change")["timestamp"] == 1.0
+    assert store.labels("leaf01", "show ip bgp") == ["pre_change"]
+
+    store.save("leaf01", "show version", "pre_change", "Cisco IOS Software\n")
+    assert store.load("leaf01", "show version", "pre_change") == "Cisco IOS Software\n"
+    with gzip.open(path, "rt") as handle:
+        assert len(handle.readlines()) == 4
+
+
+def test_load_selected_keys(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.save("leaf01", "show ip bgp", "pre_change", BGP)
+    assert store.load_selected("leaf01", "show ip bgp", "pre_change", ["peers[*].[$ip$,state]"]) == {
+        "peers": BGP["peers"]
+    }
+    assert store.load_selected("leaf01", "show ip bgp", "pre_change", ["*.default"]) == BGP
+
+
+def test_missing_and_invalid_snapshots(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    with pytest.raises(KeyError):
+        store.load("leaf01", "show ip bgp", "pre_change")
+    with pytest.raises(ValueError):
+        store.save("../leaf01", "show ip bgp", "pre_change", BGP)
+    assert store.labels("leaf01", "show ip bgp") == []
+
+
+def test_top_keys_and_slugs():
+    assert top_keys(["peers[*].ip", "router_id", "vrfs.default"]) == {"peers", "router_id", "vrfs"}
+    assert top_keys(["peers[*].ip", "$vrfs$.default"]) is None
+    assert top_keys(["*"]) is None
+    assert command_slug("show ip bgp").startswith("show_ip_bgp-")
+    assert command_slug("show ip bgp") != command_slug("show ip-bgp")
@@ -0,0 +1,104 @@
+"""Tests for upgrade module_utils."""
+import json
+
+from plugins.module_utils.upgrade import (
+    PHASE_INSTALLED,
+    PHASE_STAGED,
+    PHASE_VERIFIED,
+    RollingScheduler,
+    UpgradeCheckpoint,
+    reached,
+)
+
+DEVICES = [
+    ("leaf01a", "leaf01"),
+    ("leaf01b", "leaf01"),
+    ("leaf02a", "leaf02"),
+    ("leaf02b", "leaf02"),
+    ("border01", None),
+]
+
+
+def test_scheduler_never_takes_down_both_members():
+    scheduler = RollingScheduler(DEVICES, max_parallel=10)
+    assert scheduler.ready() == ["leaf01a", "leaf02a", "border01"]
+    assert scheduler.ready() == []
+    scheduler.finish("leaf01a")
+    assert scheduler.ready() == ["leaf01b"]
+    scheduler.finish("border01")
+    scheduler.finish("leaf02a")
+    scheduler.finish("leaf01b")
+    assert scheduler.ready() == ["leaf02b"]
+    scheduler.finish("leaf02b")
+    assert scheduler.done()
+
+
+def test_scheduler_respects_max_parallel():
+    scheduler = RollingScheduler(DEVICES, max_parallel=2)
+    assert scheduler.ready() == ["leaf01a", "leaf02a"]
+    scheduler.finish("leaf02a")
+    assert scheduler.ready() == ["leaf02b"]
+
+
+def test_scheduler_group_limit():
+    scheduler = RollingScheduler(DEVICES, max_parallel=10, group_limit=2)
+    assert len(scheduler.ready()) == 5
+
+
+def test_scheduler_blocks_group_on_failure():
+    scheduler = RollingScheduler(DEVICES, max_parallel=10)
+    scheduler.ready()
+    scheduler.finish("leaf01a", success=False)
+    assert scheduler.blocked == ["leaf01b"]
+    assert scheduler.ready() == []
+
+
+def test_scheduler_block_group():
+    scheduler = RollingScheduler(DEVICES[1:], max_parallel=10)
+    scheduler.block("leaf01")
+    scheduler.block(None)
+    assert scheduler.blocked == ["leaf01b"]
+    assert scheduler.ready() == ["leaf02a", "border01"]
+
+
+def test_reached():
+    assert reached(PHASE_VERIFIED, PHASE_STAGED)
+    assert reached(PHASE_INSTALLED, PHASE_INSTALLED)
+    assert not reached(PHASE_STAGED, PHASE_INSTALLED)
+    assert not reached("failed", PHASE_STAGED)
+    assert not reached(None, PHASE_STAGED)
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "upgrade.json")
+    checkpoint = UpgradeCheckpoint(path)
+    checkpoint.update("leaf01a", PHASE_STAGED)
+    checkpoint.update("leaf01a", PHASE_VERIFIED, boot_options={"sys": "nxos.bin"})
+    with open(path) as handle:
+        assert json.load(handle)["devices"]["leaf01a"]["phase"] == PHASE_VERIFIED
+
+    resumed = UpgradeCheckpoint(path)
+    assert resumed.phase("leaf01a") == PHASE_VERIFIED
+    assert resumed.phase("leaf01b") is None
+
+
+def test_checkpoint_discards_progress_of_another_image(tmp_path):
+    path = str(tmp_path / "upgrade.json")
+    checkpoint = UpgradeCheckpoint(path, {"image_name": "nxos.9.3.8.bin"})
+    checkpoint.update("leaf01a", PHASE_VERIFIED)
+
+    assert UpgradeCheckpoint(path, {"image_name": "nxos.9.3.8.bin"}).phase("leaf01a") == PHASE_VERIFIED
+    upgrade = UpgradeCheckpoint(path, {"image_name": "nxos.10.2.3.bin"})
+    assert upgrade.phase("leaf01a") is None
+    upgrade.update("leaf01b", PHASE_STAGED)
+    with open(path) as handle:
+        assert json.load(handle) == {
+            "image": {"image_name": "nxos.10.2.3.bin"},
+            "devices": {"leaf01b": {"phase": PHASE_STAGED}},
+        }
+
+
+def test_checkpoint_in_memory():
+    checkpoint = UpgradeCheckpoint()
+    checkpoint.update("leaf01a", PHASE_STAGED)
+    assert checkpoint.phase("leaf01a") == PHASE_STAGED
@@ -0,0 +1,81 @@
+"""Tests for wait module_utils."""
+import socket
+
+from plugins.module_utils.wait import Deadline, PhaseTimer, backoff, port_open, probe_port, wait_until
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_deadline_uses_clock():
+    clock = FakeClock()
+    deadline = Deadline(30, clock=clock)
+    clock.sleep(10)
+    assert deadline.elapsed() == 10
+    assert deadline.remaining() == 20
+    clock.sleep(25)
+    assert deadline.remaining() == 0
+    assert deadline.expired()
+
+
+def test_backoff_grows_and_caps():
+    delays = backoff(initial=1, maximum=8, factor=2, jitter=0)
+    assert [next(delays) for _ in range(6)] == [1, 2, 4, 8, 8, 8]
+
+
+def test_backoff_jitter_bounds():
+    delays = backoff(initial=4, maximum=4, jitter=0.25)
+    for _ in range(50):
+        assert 3 <= next(delays) <= 5
+
+
+def test_wait_until_returns_first_truthy_result():
+    clock = FakeClock()
+    results = iter([None, {}, {"sys": "image.bin"}])
+    result = wait_until(lambda: next(results), Deadline(60, clock=clock), sleep=clock.sleep)
+    assert result == {"sys": "image.bin"}
+    assert clock.now < 60
+
+
+def test_wait_until_stops_at_deadline():
+    clock = FakeClock()
+    calls = []
+    result = wait_until(lambda: calls.append(1), Deadline(60, clock=clock), sleep=clock.sleep)
+    assert result is None
+    assert clock.now == 60
+    # Backoff capped at 10 seconds, so far fewer attempts than one per second.
+    assert len(calls) < 15
+
+
+def test_phase_timer_records_each_phase():
+    clock = FakeClock()
+    phases = PhaseTimer(clock=clock)
+    with phases.phase("reboot"):
+        clock.sleep(1.5)
+    with phases.phase("boot"):
+        clock.sleep(90)
+    assert phases.timings == {"reboot": 1.5, "boot": 90}
+
+
+def test_probe_port():
+    assert probe_port("cisco_ios_ssh") == 22
+    assert probe_port("arista_eos_eapi", "https") == 443
+    assert probe_port("cisco_nxos_nxapi", port="8443") == 8443
+
+
+def test_port_open():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    port = server.getsockname()[1]
+    assert port_open("127.0.0.1", port)
+    server.close()
+    assert not port_open("127.0.0.1", port)
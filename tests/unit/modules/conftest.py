@@ -0,0 +1,44 @@
+"""Fixtures running the collection modules in process."""
+import importlib
+import json
+import os
+import sys
+
+import pytest
+from ansible.module_utils import basic
+
+try:
+    from ansible.module_utils.testing import patch_module_args
+except ImportError:
+    patch_module_args = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+@pytest.fixture
+def import_module(tmp_path_factory, monkeypatch):
+    """Import a module of the collection by name, through an ``ansible_collections`` tree linking to the repo."""
+    path = tmp_path_factory.mktemp("collections")
+    (path / "ansible_collections" / "networktocode").mkdir(parents=True)
+    (path / "ansible_collections" / "networktocode" / "netauto").symlink_to(ROOT)
+    monkeypatch.syspath_prepend(str(path))
+    for name in [name for name in sys.modules if name.startswith("ansible_collections")]:
+        monkeypatch.delitem(sys.modules, name)
+    return lambda name: importlib.import_module("ansible_collections.networktocode.netauto.plugins.modules." + name)
+
+
+@pytest.fixture
+def run_module(capsys, monkeypatch):
+    """Run the ``main`` of a module with ``args`` and return its JSON result."""
+
+    def run(module, args):
+        if patch_module_args is not None:
+            with patch_module_args(args), pytest.raises(SystemExit):
+                module.main()
+        else:
+            monkeypatch.setattr(basic, "_ANSIBLE_ARGS", json.dumps({"ANSIBLE_MODULE_ARGS": args}).encode("utf-8"))
+            with pytest.raises(SystemExit):
+                module.main()
+        return json.loads(capsys.readouterr().out)
+
+    return run
@@ -0,0 +1,29 @@
+"""Tests for the ntc_rollback module."""
+import pytest
+from ansible.module_utils.basic import AnsibleModule
+
+
+@pytest.fixture
+def ntc_rollback(import_module, monkeypatch):
+    module = import_module("ntc_rollback")
+    monkeypatch.setattr(module, "HAS_PYNTC", True)
+    return module
+
+
+def test_check_mode_rollback_without_catalog_is_reported_as_change(ntc_rollback, run_module, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(AnsibleModule, "warn", lambda self, warning: warnings.append(warning))
+    args = {
+        "platform": "cisco_nxos_nxapi",
+        "host": "n9k1",
+        "username": "admin",
+        "password": "admin",
+        "rollback_to": "pre-change.cfg",
+        "_ansible_check_mode": True,
+    }
+    result = run_module(ntc_rollback, args)
+    assert "failed" not in result
+    assert result["changed"] is True
+    assert result["status"] == "rollback would be executed"
+    assert result["filename"] == "pre-change.cfg"
+    assert warnings == ["Without a snapshot of the checkpoint in catalog_dir, the rollback cannot be previewed."]
@@ -0,0 +1,20 @@
+"""Tests for the ntc_validate_schema module."""
+import pytest
+
+SCHEMA = {"vlans": {"type": "array", "items": {"type": "integer"}}}
+SCOPE = [{"name": "vlans"}]
+
+
+@pytest.fixture
+def ntc_validate_schema(import_module):
+    return import_module("ntc_validate_schema")
+
+
+def test_errors_only_returned_when_collected(ntc_validate_schema, run_module):
+    args = {"schema": SCHEMA, "scope": SCOPE, "data": {"vlans": [10, 20]}}
+    assert "errors" not in run_module(ntc_validate_schema, args)
+    assert run_module(ntc_validate_schema, dict(args, collect_errors=True))["errors"] == []
+
+    result = run_module(ntc_validate_schema, dict(args, data={"vlans": [10, "x"]}, collect_errors=True))
+    assert result["failed"] is True
+    assert [error["feature"] for error in result["errors"]] == ["vlans"]